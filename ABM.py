@@ -23,6 +23,7 @@ through the script there are many 'N.B.:' to check with a simple 'ctrl+f'
 import numpy as np
 from numpy import random #for Normal and Poisson distribution of demand
 import math #for and easier sqrt
+from backlog import Backlog #queue of the backorders, shared with ABM_mesa.py
 #TODO! CHECK THAT THE MATH STICKS TO THE MODEL DEFINED IN THE ARTICLE
 
 #global hyperparameters that must be set
@@ -39,9 +40,13 @@ k = 2.33 #safety factor [1.28; 1.65; 2.33]
 kernel_size = 3 #for calculating the moving averages
 truck_movement = 1.5 #how much the truck moves at each simulation step
 #cost hyperparameters
-p = 1 #unit stockout penalty
+p = 1 #unit stockout penalty, on the unmet demand that is lost
 h = 0.01 #unit holding cost
 c = 0.01 #unit transport cost
+b = 0.05 #unit backorder cost, per step of waiting
+#backlog of the unmet demand: None means unbounded
+backlog_cap = None #maximum quantity waiting, the excess is lost
+max_backorder_age = None #steps after which a backorder is lost
 
 class Factory:
     def __init__(self, warehouse):
@@ -59,10 +64,10 @@ class Truck:
         self.state = state #'idle', 'going', 'returning'
         
 class Customer:
-    def __init__(self, warehouse, demand_history, orders_status):
+    def __init__(self, warehouse, demand_history, backlog):
         self.warehouse = warehouse #number of stocks in the warehouse
         self.demand_history = demand_history #in order to draw statistics  
-        self.orders_status = orders_status #status of all orders
+        self.backlog = backlog #unmet demand, waiting for the next deliveries
     
     def frp(self, Q=mu): #decided fixed quantity to order (hyperparameter)        
         ROP = mu*L_0 + k*sigma #*math.sqrt(L)
@@ -116,7 +121,7 @@ arinox = Factory(warehouse=5
                  )
 thales = Customer(warehouse=mu + sigma*k,
                   demand_history=[],
-                  orders_status={})
+                  backlog=Backlog(cap=backlog_cap, max_age=max_backorder_age))
 truck1 = Truck(maximum_load=20, 
                available=True, 
                position=0,
@@ -200,7 +205,8 @@ lista_trucks = [truck1, truck2, truck3,
 costs = {"times_stockout":0,
          "stockout_cost":0, 
          "hold":0,
-         "transportation":0
+         "transportation":0,
+         "backorder":0
          }
 #simulation model
 step_counter = 0
@@ -214,10 +220,11 @@ while step_counter < temporal_horizon:
           
     #if the warehouse of the Customer is not enough
     if thales.warehouse < external_demand:
-        #we generate a delay, with the gravity of the current demand (stock-out)
-        thales.orders_status[str(step_counter)] = external_demand
-        #in this case we must update the cost due to the stockout
-        costs["stockout_cost"] += p*(external_demand-thales.warehouse)
+        #the unmet demand is backordered, it will be served by the next
+        #deliveries: only what does not fit in the backlog is lost and
+        #charged the stockout penalty (the rest pays the backorder cost)
+        lost = thales.backlog.add(step_counter, external_demand-thales.warehouse)
+        costs["stockout_cost"] += p*lost
         costs["times_stockout"] += 1 #counter of the number of times we stockout
         #in any case we sell what we have, hence we empty the warehouse
         thales.warehouse = 0
@@ -267,7 +274,8 @@ while step_counter < temporal_horizon:
     
             if truck.position >= L:
                 # arrival and unload
-                thales.warehouse += truck.current_load
+                #first the backorders, then the warehouse
+                thales.warehouse += thales.backlog.serve(step_counter, truck.current_load)
                 costs["transportation"] += c * truck.current_load
                 truck.current_load = 0
                 # change the state
@@ -287,5 +295,9 @@ while step_counter < temporal_horizon:
             
     #updating the holding cost
     costs["hold"] += h*thales.warehouse
+    #updating the backlog and its cost
+    lost = thales.backlog.update(step_counter) #too old, lost
+    costs["stockout_cost"] += p*lost
+    costs["backorder"] += b*thales.backlog.size
     
     step_counter += simulation_step #final counter
\ No newline at end of file
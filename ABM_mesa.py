@@ -28,6 +28,7 @@ through the script there are many 'N.B.:' to check with a simple 'ctrl+f'
 import mesa #Python agent based modeling library
 import numpy as np
 from numpy import random #for Normal and Poisson distribution of demand
+from backlog import Backlog #queue of the backorders, shared with ABM.py
 
 #TODO! CHECK THAT THE MATH STICKS TO THE MODEL DEFINED IN THE ARTICLE
 
@@ -45,9 +46,13 @@ k = 2.33 #safety factor [1.28; 1.65; 2.33]
 kernel_size = 3 #for calculating the moving averages
 truck_movement = 1.5 #how much the truck moves at each simulation step
 #cost hyperparameters
-p = 1 #unit stockout penalty
+p = 1 #unit stockout penalty, on the unmet demand that is lost
 h = 0.01 #unit holding cost
 c = 0.01 #unit transport cost
+b = 0.05 #unit backorder cost, per step of waiting
+#backlog of the unmet demand: None means unbounded
+backlog_cap = None #maximum quantity waiting, the excess is lost
+max_backorder_age = None #steps after which a backorder is lost
 
 
 #general global functions used by the agents
@@ -71,6 +76,8 @@ class Factory(mesa.Agent):
         super().__init__(model)
         
         self.warehouse = warehouse #number of stocks in the warehouse
+        self.unshipped = 0 #stocks of the orders taken that did not fit on the
+                           #idle trucks, they leave first on the next days
         #since we do not model any queue upstream, this class is super easy
     
     def step(self):
@@ -109,7 +116,8 @@ class Truck(mesa.Agent):
             if self.position >= L:
                 #arrival and unload
                 customer = self.model.customer
-                customer.warehouse += self.current_load
+                #first the backorders, then the warehouse
+                customer.warehouse += customer.backlog.serve(self.model.steps, self.current_load)
                 self.model.costs["transportation"] += c * self.current_load
                 self.current_load = 0
                 #change the state
@@ -129,18 +137,23 @@ class Customer(mesa.Agent):
     """An agent that requires a stochastic amount of goods based on external
         exogenous demands"""
         
-    def __init__(self, model, warehouse, demand_history, orders_status):
+    def __init__(self, model, warehouse, demand_history, backlog):
         #pass the parameters of the parent class
         super().__init__(model)
         
         self.warehouse = warehouse #number of stocks in the warehouse
         self.demand_history = demand_history #in order to draw statistics  
-        self.orders_status = orders_status #status of all orders
+        self.backlog = backlog #unmet demand, waiting for the next deliveries
+    
+    def position(self):
+        #the stocks in the warehouse and the ones ordered but still waiting
+        #at the factory for a truck
+        return self.warehouse + self.model.factory.unshipped
     
     def frp(self, Q=mu): #decided fixed quantity to order (hyperparameter)        
         ROP = mu*L_0 + k*sigma #*math.sqrt(L)
         
-        if self.warehouse <= ROP:
+        if self.position() <= ROP:
             return Q
     
     def arp(self, Q=mu, n=kernel_size): #decided fixed quantity to rder 
@@ -152,7 +165,7 @@ class Customer(mesa.Agent):
         D = round((np.convolve(self.demand_history, weights, mode='valid'))[-1])
         ROP = D + SS
         
-        if self.warehouse <= ROP:
+        if self.position() <= ROP:
             return Q
     
     def fbr(self, n=kernel_size): #here both D and Q are calculated though 
@@ -165,7 +178,7 @@ class Customer(mesa.Agent):
         ROP = D + SS        
         Q = D
         
-        if self.warehouse <= ROP:
+        if self.position() <= ROP:
             return round(Q)
     
     def place_order(self, quantity):
@@ -175,14 +188,32 @@ class Customer(mesa.Agent):
         if factory.warehouse < quantity:
             return #we stop immmediately the exacution of the function without returning any value
         
+        #the order is taken only if a truck can leave today
+        if not any(truck.available for truck in self.model.trucks):
+            return
+        factory.warehouse -= quantity #we are using stocks from the warehouse
+        factory.unshipped += quantity #they leave with the ones still waiting
+    
+    def ship(self, quantity):
+        """Load the idle trucks with quantity and return what does not fit"""
         #we try to find an available truck to send the stocks
         for truck in self.model.trucks:
             #if a truck is available
             if truck.available and quantity <= truck.maximum_load:
                 truck.assign_load(quantity)
-                factory.warehouse -= quantity #we are using stocks from 
-                                                    #the warehouse
-                break #since the truck has been found we exit the for loop
+                return 0 #since the truck has been found we exit the function
+
+        #no truck can carry the whole order: it is split over the available
+        #trucks, the largest first, and the rest waits at the factory
+        idle = sorted((t for t in self.model.trucks if t.available),
+                      key=lambda t: t.maximum_load, reverse=True)
+        for truck in idle:
+            if quantity <= 0:
+                break
+            load = min(quantity, truck.maximum_load)
+            truck.assign_load(load)
+            quantity -= load
+        return quantity
     
     def step(self):
         # exogenous demand generated
@@ -193,10 +224,11 @@ class Customer(mesa.Agent):
         if self.warehouse < demand:
             #counter of the number of times we stockout
             self.model.costs["times_stockout"] += 1
-            #in this case we must update the cost due to the stockout
-            self.model.costs["stockout_cost"] += p * (demand - self.warehouse)
-            #we generate a delay, with the gravity of the current demand (stock-out)
-            self.orders_status[self.model.steps] = demand
+            #the unmet demand is backordered, it will be served by the next
+            #deliveries: only what does not fit in the backlog is lost and
+            #charged the stockout penalty (the rest pays the backorder cost)
+            lost = self.backlog.add(self.model.steps, demand - self.warehouse)
+            self.model.costs["stockout_cost"] += p * lost
             #in any case we sell what we have, hence we empty the warehouse
             self.warehouse = 0
         #if the warehouse of the Customer is enough 
@@ -213,6 +245,12 @@ class Customer(mesa.Agent):
         if order is not None:
             self.place_order(order)
 
+        #what waits at the factory (today's order included) leaves on the
+        #idle trucks, the rest waits for the next days
+        factory = self.model.factory
+        if factory.unshipped > 0:
+            factory.unshipped = self.ship(factory.unshipped)
+
     
 class SupplyChainModel(mesa.Model):
     """A model for interacting: Factory, Trucks and Customer"""
@@ -226,6 +264,7 @@ class SupplyChainModel(mesa.Model):
             "stockout_cost": 0,
             "hold": 0,
             "transportation": 0,
+            "backorder": 0,
         }
         
         #now we create the agents
@@ -253,7 +292,7 @@ class SupplyChainModel(mesa.Model):
             warehouse = mu + sigma*k,
             demand_history = [[]], #we are dealing with a list of 
                     #agents, so first thing first is to unpack the first list
-            orders_status = [{}]
+            backlog = [Backlog(cap=backlog_cap, max_age=max_backorder_age)]
         )[0] #we extract the single customer agent inside the list
         
         
@@ -267,6 +306,7 @@ class SupplyChainModel(mesa.Model):
         2. Truck(s).step()
         5. Customer.step()
         6. holding cost (in the Model)     
+        7. backlog aging-out and backorder cost (in the Model)
         
         """
         self.agents.do("step") #for all the agents we call their "step()" methods
@@ -274,6 +314,11 @@ class SupplyChainModel(mesa.Model):
         #updating the holding cost
         self.costs["hold"] += h * self.customer.warehouse
         
+        #updating the backlog and its cost
+        lost = self.customer.backlog.update(self.steps) #too old, lost
+        self.costs["stockout_cost"] += p * lost
+        self.costs["backorder"] += b * self.customer.backlog.size
+        
         
 #run the model
 model = SupplyChainModel(seed=42) #model creation
@@ -282,6 +327,8 @@ for _ in range(temporal_horizon): #run
     model.step()
 
 print(model.costs)
+print("unshipped:", model.factory.unshipped)
+print(model.customer.backlog.kpis(model.steps))
         
         
         
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 10:48:02 2026
+
+@author: Francesco
+"""
+
+"""
+Queue of the backorders of the customer, shared by ABM.py and ABM_mesa.py.
+
+The unmet part of the demand waits in a FIFO queue and is served by the next
+deliveries, before they refill the warehouse. Each entry is [step of the
+stockout, quantity still missing], so the queue has one entry per stockout,
+not one per unit; with a cap and/or a maximum age it stays bounded also in
+very long runs.
+
+Costs: a unit is either backordered or lost, never both. A backordered unit
+is charged the backorder cost b for every step it waits; the stockout
+penalty p is charged only on the units that are lost (over the cap or too
+old), which add() and update() return.
+"""
+
+from collections import deque #for the queue of the backorders
+
+class Backlog:
+    """FIFO queue of the unmet demand (backorders), served by the next
+    deliveries"""
+    
+    def __init__(self, cap=None, max_age=None):
+        self.queue = deque() #outstanding backorders, the oldest on the left
+        self.size = 0 #total quantity waiting
+        self.cap = cap #maximum quantity waiting, the excess is lost
+        self.max_age = max_age #steps after which a backorder is lost
+        #streaming kpis, updated without keeping any history
+        self.served = 0 #quantity delivered late
+        self.lost = 0 #quantity lost by the cap or by the aging-out
+        self.total_wait = 0 #sum of quantity*waiting steps of the served one
+        self.size_sum = 0 #sum of the sizes, for the average over the steps
+        self.max_size = 0
+        self.steps = 0
+    
+    def add(self, step, quantity):
+        """Backorder the unmet demand of a step, return the quantity lost
+        because it does not fit under the cap"""
+        lost = 0
+        if self.cap is not None:
+            admitted = min(quantity, max(0, self.cap - self.size))
+            lost = quantity - admitted
+            quantity = admitted
+        if quantity > 0:
+            self.queue.append([step, quantity])
+            self.size += quantity
+        self.lost += lost
+        return lost
+    
+    def serve(self, step, delivered):
+        """Serve the backorders FIFO with a delivery, return what is left
+        for the warehouse"""
+        while self.queue and delivered > 0:
+            entry = self.queue[0]
+            quantity = min(entry[1], delivered)
+            entry[1] -= quantity
+            delivered -= quantity
+            self.size -= quantity
+            self.served += quantity
+            self.total_wait += quantity * (step - entry[0])
+            if entry[1] == 0:
+                self.queue.popleft()
+        return delivered
+    
+    def update(self, step):
+        """End of the step: aging-out and streaming kpis; return the quantity
+        lost by the aging-out"""
+        lost = 0
+        if self.max_age is not None:
+            while self.queue and step - self.queue[0][0] > self.max_age:
+                lost += self.queue.popleft()[1]
+        self.size -= lost
+        self.lost += lost
+        self.size_sum += self.size
+        self.max_size = max(self.max_size, self.size)
+        self.steps += 1
+        return lost
+    
+    def kpis(self, step):
+        return {
+            "backlog_size": self.size,
+            "avg_backlog_size": self.size_sum / self.steps if self.steps > 0 else 0,
+            "max_backlog_size": self.max_size,
+            "oldest_backorder_age": step - self.queue[0][0] if self.queue else 0,
+            "avg_backorder_wait": self.total_wait / self.served if self.served > 0 else 0,
+            "backorders_served": self.served,
+            "backorders_lost": self.lost,
+        }
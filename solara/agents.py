@@ -13,13 +13,22 @@ import math #for the sqrt
 # ======================
 # Utility functions
 # ======================        global variable
-def demand_generator(mu, sigma, demand_type):
+def demand_generator(mu, sigma, demand_type, rng=random):
+    #rng is the generator of the model (model.rng), so that the seed also
+    #governs the demand and every replication draws its own stream
     if demand_type == "Normal":
-        demand = random.normal(loc=mu, scale=sigma)
+        demand = rng.normal(loc=mu, scale=sigma)
     else:
-        demand = random.poisson(lam=mu)
+        demand = rng.poisson(lam=mu)
     return max(0, round(demand)) #make it integer and always non-negative
 
+def moving_average(demand_history, n):
+    weights = np.ones(n)/n #weights of the kernel
+    #we only take the last number of the moving average and we round into 
+    #integer, 'valid' means no padding; only the last n demands are needed,
+    #so the cost does not grow with the length of the history
+    return round((np.convolve(demand_history[-n:], weights, mode='valid'))[-1])
+
 def lead_time_updater(model, traffic):
     L = model.L_0 + model.alpha*traffic
     return L
@@ -37,15 +46,22 @@ class Factory(mesa.Agent):
         #since we do not model any queue upstream, this class is super easy
         
     def step(self):
-        self.warehouse += self.model.mu #average production per step
+        production = self.model.production
+        if production is None:
+            self.warehouse += self.model.mu #average production per step
+        else:
+            #stochastic output, read from the pre-sampled schedule
+            self.warehouse += production.at(self.model.steps)
 
 
 class Truck(mesa.Agent):
     """An agent that delivers goods between factory and customer"""
     
-    def __init__(self,  model, available, position, current_load, state):
+    def __init__(self,  model, available, position, current_load, state, maximum_load=math.inf):
         #pass the parameters of the parent class
         super().__init__(model)
+        self.maximum_load = maximum_load #maximum number of stocks that can be
+                                        #carried
         self.available = available #whether it is available for transportation
         self.position = position #where the truck is (close (i.e.: 0) or far 
                                  #way for delivery)
@@ -64,8 +80,8 @@ class Truck(mesa.Agent):
         if self.state == "going":
             self.position += self.model.truck_movement
             
-            #update the traffic
-            traffic = sum(not t.available for t in self.model.trucks) / len(self.model.trucks)
+            #update the traffic, the trucks away are counted by the dispatcher
+            traffic = self.model.dispatcher.n_busy / len(self.model.trucks)
             L = lead_time_updater(self.model, traffic)
 
             #if we have already reached the customer
@@ -80,6 +96,7 @@ class Truck(mesa.Agent):
                 #change the state
                 self.state = "returning"
                 self.position = L
+                self.model.dispatcher.arrived(self)
 
         # ===== THALES -> ARINOX =====
         elif self.state == "returning":
@@ -91,6 +108,7 @@ class Truck(mesa.Agent):
                 self.position = 0
                 self.available = True
                 self.state = "idle"
+                self.model.dispatcher.release(self)
 
 
 class Customer(mesa.Agent):
@@ -103,40 +121,38 @@ class Customer(mesa.Agent):
         
         self.warehouse = warehouse #number of stocks in the warehouse
         self.demand_history = demand_history #in order to draw statistics
+
+    def position(self):
+        #the stocks in the warehouse and the ones already ordered but still
+        #at the factory as backorders (none with unlimited truck loads)
+        return self.warehouse + self.model.dispatcher.backlog
         
     def frp(self): #decided fixed quantity to order (hyperparameter)    
         Q = self.model.mu    
         ROP = self.model.mu*self.model.L_0 + self.model.k*self.model.sigma
         
-        if self.warehouse <= ROP:
+        if self.position() <= ROP:
             return Q
     
     def arp(self): #decided fixed quantity to reoder 
                     #(hyperparameter), n indicates the convolution kernel size 
         Q = self.model.mu
-        n = self.model.kernel_size
         SS = self.model.k*self.model.sigma*math.sqrt(self.model.L_0)
-        weights = np.ones(n)/n #weights of the kernel
-        #we only take the last number of the moving average and we round into 
-        #integer, 'valid' means no padding
-        D = round((np.convolve(self.demand_history, weights, mode='valid'))[-1])
+        D = self.model.demand_forecast() #moving average of the demand
         ROP = D*self.model.L_0 + SS
         
-        if self.warehouse <= ROP:
+        if self.position() <= ROP:
             return Q
     
     def fbr(self): #here both D and Q are calculated though 
                       #moving averages, n indicates the convolution kernel size
-        n = self.model.kernel_size
         SS = self.model.k*self.model.sigma*math.sqrt(self.model.L_0)
-        weights = np.ones(n)/n #weights of the kernel
-        #we only take the last number of the moving average and we round into 
-        #integer, 'valid' means no padding
-        D = round((np.convolve(self.demand_history, weights, mode='valid'))[-1])        
+        D = self.model.demand_forecast() #moving average of the demand
         ROP = D*self.model.L_0 + SS    
-        Q = 1.33 * ROP - self.warehouse
+        position = self.position()
+        Q = 1.33 * ROP - position
         
-        if self.warehouse <= ROP:
+        if position <= ROP:
             return round(Q)
         
     def place_order(self, quantity):
@@ -146,19 +162,15 @@ class Customer(mesa.Agent):
         if factory.warehouse < quantity:
             return #we stop immmediately the execution of the function without returning any value
         
-        #we try to find an available truck to send the stocks
-        for truck in self.model.trucks:
-            #if a truck is available
-            if truck.available:
-                truck.assign_load(quantity)
-                factory.warehouse -= quantity #we are using stocks from 
-                                                    #the warehouse
-                break #since the truck has been found we exit the for loop
+        #the order is taken if a truck can leave today, and its stocks are
+        #set aside; it leaves with the other orders of the day
+        if self.model.dispatcher.take(quantity):
+            factory.warehouse -= quantity #we are using stocks from the warehouse
     
 
     def step(self):
         # exogenous demand generated
-        demand = demand_generator(self.model.mu, self.model.sigma, self.model.demand_type)
+        demand = self.model.draw_demand()
         self.demand_history.append(demand) #for computing moving averages
 
         #if the warehouse of the Customer is not enough
@@ -186,4 +198,8 @@ class Customer(mesa.Agent):
         #if the Customer made an order and the factory is not empty we try to 
         #find a truck available
         if order is not None:
-            self.place_order(order)
\ No newline at end of file
+            self.place_order(order)
+
+        #the orders of the day (and the backorders) leave at once, split or
+        #consolidated on the idle trucks
+        self.model.dispatcher.dispatch()
\ No newline at end of file
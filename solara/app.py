@@ -5,14 +5,31 @@ Created on Sun Dec 21 11:53:00 2025
 @author: Francesco
 """
 
+import os #for the address of the simulation service
+import uuid #for the id of the sessions
+import asyncio #to wait for the stepping without blocking the page
+import numpy as np #for the statistics of the replications
 import solara #Solara framework for building web apps
 from model import SupplyChainModel #import of the model
+from runner import run_replications, scenario_of #replications of the current scenario
+from surrogate import Surrogate #instant estimates of the costs
+from playback import cached_trajectory #precomputed trajectories
+from matplotlib.figure import Figure #for the plots of the playback
+from params import model_params #interactive parameters, shared with the
+                                #analyses run without the dashboard
+from sessions import ModelPool #one model per session, stepped on worker threads
 
 from mesa.visualization import ( #Mesa modules for visualization
-                                Slider, #to create sliders for parameters
-                                SolaraViz, #special component of Solara, created by Mesa in order to link an ABM with a web interface
                                 make_plot_component, #to create plots
                             )
+from mesa.visualization.solara_viz import ( #building blocks of SolaraViz, a
+                                            #special component of Solara that links an ABM with a web interface
+                                ModelCreator, #sliders of the parameters
+                                ComponentsView, #grid of the components
+                                ShowSteps, #current step
+                                split_model_params,
+                            )
+from mesa.visualization.utils import force_update #redraw the components
 
 # =================================
 # Cost report summary & KPIS & Info
@@ -28,6 +45,16 @@ def get_costs(model: SupplyChainModel):
         f"- **Transportation cost:** {model.transportation:.2f} €\n"
         f"- **Total cost:** {model.hold + model.stockout_cost + model.transportation:.2f} €\n"
     )
+    #steady-state costs per step, after the warm-up period
+    if model.warmup not in (None, "None"):
+        costs = model.compute_costs()
+        text += (
+            f"\n**Steady state** (warm-up: {costs['warmup']} steps)\n"
+            f"- **Stockout cost per step:** {costs['stockout_cost_rate']:.2f} €\n"
+            f"- **Holding cost per step:** {costs['holding_rate']:.2f} €\n"
+            f"- **Transportation cost per step:** {costs['transportation_rate']:.2f} €\n"
+            f"- **Total cost per step:** {costs['total_cost_rate']:.2f} €\n"
+        )
     return solara.Markdown(
         text,
         style={
@@ -63,6 +90,10 @@ def model_info(model: SupplyChainModel):
         f"*Stockout cost:* cumulative cost incurred due to stockouts.\n"
         f"*Holding cost:* cumulative cost of holding inventory.\n"
         f"*Transportation cost:* cumulative cost of transporting goods.  \n"
+        f"The 'Estimate' panel shows immediately the costs predicted by a surrogate model for the current parameters, with a 95% band, before the simulation reaches the horizon.  \n"
+        f"With the *Precomputed playback* the whole run is simulated once and the step slider moves back and forth in it instantly, without re-running the model.  \n"
+        f"The 'Replications' button runs many independent replications of the current scenario (on the simulation service, if available).  \n"
+        f"*Warm-up truncation:* with MSER-5 the initial transient is detected and discarded from the KPIs and the steady-state costs.  \n"
         f"AVG stands for average, CV stands for coefficient of variation (std/mean). [ad] stands for adimensional quantity."
     )
     return solara.Markdown(
@@ -74,43 +105,69 @@ def model_info(model: SupplyChainModel):
         }
     )
 
-# ======================
-# Interactive parameters
-# ======================
-#the following parameters are taken by the model itself
-model_params = {
-    "seed": {
-        "type": "InputText",
-        "value": "42",
-        "label": "Random Seed",
-    },
+# =================================
+# Surrogate estimate
+# =================================
+#surrogate trained with 'python surrogate.py', loaded once for all the sessions
+SURROGATE_PATH = os.environ.get("SUPPLY_CHAIN_SURROGATE", "surrogate")
+try:
+    SURROGATE = Surrogate.load(SURROGATE_PATH)
+except (OSError, ValueError): #not trained yet, or trained on other parameters
+    SURROGATE = None
 
-    "demand_type": {
-                        "type": "Select",
-                        "value": "Normal",
-                        "values": ["Normal", "Poisson"],
-                        "label": "Demand Type",
-                    },
-    "order_policy": {
-                        "type": "Select",
-                        "value": "FRP",
-                        "values": ["FRP", "ARP", "FBR"],
-                        "label": "Ordering Policy",
-                    },
-
-    "mu": Slider("Demand μ [unit]", 10, 1, 50, 1),
-    "sigma": Slider("Demand σ [unit]", 5, 0.1, 15, 0.25),
-    "alpha": Slider("Congestion sensitivity (α) [ad]", 0.75, 0.0, 2.0, 0.01),
-    "beta": Slider("Empty truck speed factor (β) [ad]", 1.1, 1.0, 1.5, 0.005),
-    "L_0": Slider("Free-flow lead time (L0) [unit]", 3, 0.1, 10, 0.25),
-    "k": Slider("Safety factor (k) [ad]", 2.33, 1.0, 3.0, 0.01),
-    "truck_movement": Slider("Truck movement per step [ad]", 1, 0.1, 5.0, 0.1),
-    "p": Slider("Unit stockout penalty [€/unit]", 25.0, 0.0, 100.0, 1),
-    "h": Slider("Unit holding cost [€/unit]", 1.5, 0.0, 50.0, 0.5),
-    "c": Slider("Unit transport cost [€/unit]", 4, 0.0, 50.0, 0.5),
-    "n_trucks": Slider('Number of trucks [ad]', 8, 1, 20, 1),
-}
+def get_estimate(model: SupplyChainModel):
+    if SURROGATE is None:
+        return solara.Markdown("*No surrogate available: train it with 'python surrogate.py'.*")
+    prediction = SURROGATE.predict(scenario_of(model))
+    #95% band of the estimate
+    band = lambda name: (prediction[name][0], 1.96 * prediction[name][1])
+    text = (
+        f"### Estimate ({SURROGATE.meta['n_steps']} steps)\n"
+        f"- **Total cost:** {band('total_cost')[0]:.0f} ± {band('total_cost')[1]:.0f} €\n"
+        f"- **Times stockout [ad]:** {band('times_stockout')[0]:.1f} ± {band('times_stockout')[1]:.1f}\n"
+        f"- **AVG lead time [unit]:** {band('avg_lead_time')[0]:.2f} ± {band('avg_lead_time')[1]:.2f}\n"
+        f"- **AVG traffic [ad]:** {band('avg_traffic')[0]:.1f} ± {band('avg_traffic')[1]:.1f} %\n"
+        f"- **CV warehouse [ad]:** {band('cv_inventory')[0]:.2f} ± {band('cv_inventory')[1]:.2f}\n"
+    )
+    return solara.Markdown(text)
+
+# =================================
+# Replications
+# =================================
+#if the address of a simulation service (see service.py) is set, the
+#replications are submitted to it instead of being computed by this server
+SERVICE_URL = os.environ.get("SUPPLY_CHAIN_SERVICE")
+N_REPLICATIONS = 20 #replications of the current scenario
+HORIZON = 365 #temporal horizon of every replication
 
+@solara.component
+def Replications(model: SupplyChainModel):
+    request, set_request = solara.use_state(0)
+
+    def compute():
+        if request == 0:
+            return None
+        scenario = scenario_of(model)
+        seed = scenario.pop("seed")
+        summaries = run_replications(N_REPLICATIONS, HORIZON, seed=seed, service=SERVICE_URL,
+                                     user="dashboard", **scenario)
+        costs = np.array([s["total_cost"] for s in summaries])
+        stockouts = np.array([s["times_stockout"] for s in summaries])
+        return costs.mean(), costs.std(), stockouts.mean()
+
+    result = solara.use_thread(compute, dependencies=[request])
+
+    with solara.Column():
+        solara.Button(f"Run {N_REPLICATIONS} replications of {HORIZON} steps",
+                      on_click=lambda: set_request(request + 1))
+        if result.state == solara.ResultState.RUNNING:
+            solara.Text("Running...")
+        elif result.value is not None:
+            mean, std, stockouts = result.value
+            solara.Markdown(
+                f"- **Total cost:** {mean:.2f} ± {std:.2f} €\n"
+                f"- **Times stockout [ad]:** {stockouts:.1f}\n"
+            )
 
 # ===========================
 # Cost plot & Lead time plot
@@ -157,20 +214,161 @@ LeadTimePlot = make_plot_component(
     post_process=post_process_lt,
 )
 
+# ======================
+# Playback
+# ======================
+PLAYBACK_HORIZON = 365 #steps precomputed for the playback
+
+@solara.component
+def Playback(model: SupplyChainModel):
+    enabled, set_enabled = solara.use_state(False)
+    t, set_t = solara.use_state(PLAYBACK_HORIZON)
+    scenario = scenario_of(model)
+
+    #the whole trajectory is computed once per scenario, then the slider only
+    #indexes the stored arrays
+    trajectory = solara.use_memo(
+        lambda: cached_trajectory(PLAYBACK_HORIZON, **scenario) if enabled else None,
+        dependencies=[enabled, str(sorted(scenario.items()))],
+    )
+
+    with solara.Column():
+        solara.Checkbox(label=f"Precomputed playback ({PLAYBACK_HORIZON} steps)",
+                        value=enabled, on_value=set_enabled)
+        if trajectory is None:
+            return
+        solara.SliderInt("Step [unit]", value=t, min=1, max=trajectory.n_steps, on_value=set_t)
+
+        steps = np.arange(1, t + 1)
+        series = trajectory.series
+        with solara.Row():
+            fig = Figure()
+            ax = fig.subplots()
+            for name, color in [("stockout", "red"), ("holding", "blue"), ("transportation", "orange")]:
+                ax.plot(steps, series[name][:t], label=name, color=color)
+            ax.legend(loc="best")
+            post_process_lines_cost_plot(ax)
+            solara.FigureMatplotlib(fig, format="png", bbox_inches="tight")
+
+            fig = Figure()
+            ax = fig.subplots()
+            ax.plot(steps, series["lead_time"][:t], color="green")
+            post_process_lt(ax)
+            solara.FigureMatplotlib(fig, format="png", bbox_inches="tight")
+
+        costs = trajectory.costs_at(t)
+        kpis = trajectory.kpis_at(t)
+        solara.Markdown(
+            f"- **Step [unit]:** {t}\n"
+            f"- **Times stockout [ad]:** {costs['times_stockout']}\n"
+            f"- **Stockout cost:** {costs['stockout_cost']:.2f} €\n"
+            f"- **Holding cost:** {costs['holding']:.2f} €\n"
+            f"- **Transportation cost:** {costs['transportation']:.2f} €\n"
+            f"- **Total cost:** {costs['total_cost']:.2f} €\n"
+            f"- **AVG lead time [unit]:** {kpis['avg_lead_time']:.2f}\n"
+            f"- **CV lead time [ad]:** {kpis['cv_lead_time']:.2f}\n"
+            f"- **AVG traffic [ad]:** {kpis['avg_traffic']:.2f} %\n"
+            f"- **CV warehouse [ad]:** {kpis['cv_inventory']:.2f}\n"
+        )
+
+# ======================
+# Sessions
+# ======================
+#every session steps its own model, taken from a bounded pool shared by the
+#sessions of this server (see sessions.py)
+MAX_SESSIONS = int(os.environ.get("SUPPLY_CHAIN_MAX_SESSIONS", 16))
+POOL = ModelPool(max_models=MAX_SESSIONS)
+user_params, fixed_params = split_model_params(model_params)
+#initial parameters of a session, the ones of the sliders
+DEFAULTS = {**fixed_params, **{name: param.value if hasattr(param, "value") else param.get("value")
+                               for name, param in user_params.items()}}
+
+@solara.component
+def SessionController(session_id, model_parameters, play_interval, render_interval):
+    """Reset, play and step of the model of a session: the steps run on the
+    workers of the pool, the page only waits for them"""
+    playing = solara.use_reactive(False)
+
+    async def step():
+        await asyncio.wrap_future(POOL.step(session_id, render_interval.value))
+        force_update()
+
+    async def play():
+        while playing.value:
+            await asyncio.sleep(play_interval.value / 1000)
+            await step()
+
+    async def reset():
+        playing.value = False
+        await asyncio.wrap_future(POOL.reset(session_id, **model_parameters.value))
+        force_update()
+
+    solara.lab.use_task(play, dependencies=[playing.value], prefer_threaded=False)
+    step_task = solara.lab.use_task(step, dependencies=None, prefer_threaded=False)
+    reset_task = solara.lab.use_task(reset, dependencies=None, prefer_threaded=False)
+
+    with solara.Row(justify="space-between"):
+        solara.Button(label="Reset", color="primary", on_click=reset_task)
+        solara.Button(label="▶" if not playing.value else "❚❚", color="primary",
+                      on_click=lambda: playing.set(not playing.value))
+        solara.Button(label="Step", color="primary", on_click=step_task,
+                      disabled=playing.value or step_task.pending)
+
+@solara.component
+def Session(session_id, model: SupplyChainModel):
+    #the layout of SolaraViz, on the model of the session
+    model_parameters = solara.use_reactive({})
+    play_interval = solara.use_reactive(100)
+    render_interval = solara.use_reactive(1)
+
+    with solara.Sidebar(), solara.Column():
+        with solara.Card("Controls"):
+            solara.SliderInt(label="Play Interval (ms)", value=play_interval, min=1, max=500, step=10)
+            solara.SliderInt(label="Render Interval (steps)", value=render_interval, min=1, max=100, step=2)
+            SessionController(session_id, model_parameters, play_interval, render_interval)
+        with solara.Card("Model Parameters"):
+            ModelCreator(solara.use_reactive(model), model_params, model_parameters=model_parameters)
+        with solara.Card("Information"):
+            ShowSteps(model)
+
+    ComponentsView(
+        [
+            CostPlot,
+            LeadTimePlot,
+            get_costs,
+            get_kpi,
+            get_estimate,
+            Replications,
+            Playback,
+            model_info,
+        ],
+        model,
+    )
+
 # ======================
 # Model & visualization
 # ======================
-page = SolaraViz(
-                SupplyChainModel(),
-                components=[
-                    CostPlot,
-                    LeadTimePlot,
-                    get_costs,
-                    get_kpi,
-                    model_info,
-                ],
-                model_params=model_params,
-                name="Supply Chain Model",
-            )
+@solara.component
+def Page():
+    session_id = solara.use_memo(lambda: uuid.uuid4().hex, [])
+    #the model of the session, waiting for a free one if the pool is full;
+    #the thread is not interrupted, it is cancelled through its event
+    acquired = solara.use_thread(lambda cancel: POOL.acquire(session_id, cancel=cancel, **DEFAULTS),
+                                 dependencies=[], intrusive_cancel=False)
+
+    def close():
+        #cancelled first, so that a model acquired meanwhile goes back too
+        acquired.cancel()
+        POOL.release(session_id)
+
+    #back to the pool when the session is closed
+    solara.use_effect(lambda: close, [])
 
-page
\ No newline at end of file
+    with solara.AppBar():
+        solara.AppBarTitle("Supply Chain Model")
+    if acquired.state == solara.ResultState.FINISHED:
+        Session(session_id, acquired.value)
+    elif acquired.state == solara.ResultState.ERROR:
+        solara.Error(f"{acquired.error}")
+    else:
+        solara.Text(f"Waiting for a free model ({MAX_SESSIONS} sessions at most)...")
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 15:40:08 2026
+
+@author: Francesco
+"""
+
+"""
+Columnar replacement of mesa.DataCollector for the model reporters.
+
+mesa.DataCollector appends a deep copy of every reporter to a list at every
+step, so a reporter pointing at a whole history makes each row a copy of a
+growing list. Here the reporters are scalars, stored in preallocated typed
+NumPy columns (their capacity doubles when they are full), together with the
+step of every row. A row is collected only every 'every' steps and, with
+on_change=True, only when some value changed since the last row.
+
+A sampled collector has no row for some steps: series() gives one value per
+step from the last row at or before it (exact when only the unchanged rows
+are skipped), and current() reads a reporter on the model itself, e.g.: at a
+last step that was not sampled.
+
+The rows are written by the thread that steps the model and may be read by
+another one (e.g.: the dashboard renders while a worker steps): the writes
+and the copies (get_model_vars_dataframe, series, value_at) hold a lock.
+
+The interface used by the dashboard plots (get_model_vars_dataframe) is the
+one of mesa.DataCollector.
+"""
+
+import threading #rows written and read by different threads
+import numpy as np #numerical computing library
+import pandas as pd #for the DataFrame
+
+class ColumnarCollector:
+    """Scalar model reporters stored in typed columns"""
+
+    def __init__(
+        self,
+        model_reporters, #{name: attribute of the model or function of the model}
+        every=1, #a row every 'every' steps
+        on_change=False, #skip the rows equal to the previous one
+        dtypes=None, #{name: dtype}, float64 by default
+        capacity=1024, #initial number of rows
+    ):
+        self.model_reporters = dict(model_reporters)
+        self.every = every
+        self.on_change = on_change
+        dtypes = dtypes or {}
+        self._columns = {name: np.empty(capacity, dtype=dtypes.get(name, np.float64))
+                         for name in self.model_reporters}
+        self._steps = np.empty(capacity, dtype=np.int64)
+        self.n_rows = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        #a lock cannot be pickled, the copy gets its own
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _value(self, model, reporter):
+        if isinstance(reporter, str):
+            return getattr(model, reporter)
+        return reporter(model)
+
+    def _reserve(self, n):
+        #double the capacity until n more rows fit
+        capacity = len(self._steps)
+        if self.n_rows + n <= capacity:
+            return
+        while capacity < self.n_rows + n:
+            capacity *= 2
+        self._steps = np.resize(self._steps, capacity)
+        for name, column in self._columns.items():
+            self._columns[name] = np.resize(column, capacity)
+
+    def collect(self, model):
+        """Row of the current step of the model, if it has to be sampled"""
+        if model.steps % self.every != 0:
+            return
+        values = {name: self._value(model, reporter) for name, reporter in self.model_reporters.items()}
+        with self._lock:
+            if self.on_change and self.n_rows > 0 and all(
+                    self._columns[name][self.n_rows - 1] == value for name, value in values.items()):
+                return
+            self._reserve(1)
+            i = self.n_rows
+            self._steps[i] = model.steps
+            for name, value in values.items():
+                self._columns[name][i] = value
+            self.n_rows += 1
+
+    def collect_block(self, model, first_step, n, varying):
+        """Rows of the n steps from first_step (e.g.: advanced at once by the
+        skip-ahead): varying gives an array of values for the reporters that
+        change along the block, the others keep their current value"""
+        if not self.on_change:
+            #every 'every' steps: slices of the arrays, no mask
+            rows = slice((-first_step) % self.every, n, self.every)
+            steps = np.arange(first_step + rows.start, first_step + n, self.every)
+            values = {name: varying[name][rows] if name in varying else self._value(model, reporter)
+                      for name, reporter in self.model_reporters.items()}
+            with self._lock:
+                self._reserve(len(steps))
+                i, j = self.n_rows, self.n_rows + len(steps)
+                self._steps[i:j] = steps
+                for name, column in values.items():
+                    self._columns[name][i:j] = column
+                self.n_rows = j
+            return
+        steps = np.arange(first_step, first_step + n)
+        columns = {name: np.asarray(varying[name]) if name in varying
+                   else np.full(n, self._value(model, reporter))
+                   for name, reporter in self.model_reporters.items()}
+        with self._lock:
+            #every sampled row is compared with the sampled row before it (the
+            #first one with the last row kept): a row equal to the previous
+            #one is equal to the last row kept, as in collect()
+            sampled = np.flatnonzero(steps % self.every == 0)
+            changed = np.zeros(len(sampled), dtype=bool)
+            for name, values in columns.items():
+                values = values[sampled]
+                previous = np.concatenate([self._columns[name][self.n_rows - 1:self.n_rows]
+                                           if self.n_rows > 0 else [np.nan], values[:-1]])
+                changed |= values != previous
+            rows = sampled[changed]
+            self._reserve(len(rows))
+            i = self.n_rows
+            self._steps[i:i + len(rows)] = steps[rows]
+            for name, values in columns.items():
+                self._columns[name][i:i + len(rows)] = values[rows]
+            self.n_rows += len(rows)
+
+    def clear(self):
+        """Drop all the rows, keeping the allocated columns"""
+        with self._lock:
+            self.n_rows = 0
+
+    # ======================
+    # Access
+    # ======================
+    @property
+    def steps(self):
+        """Step of every row"""
+        return self._steps[:self.n_rows]
+
+    def column(self, name):
+        """Values of a reporter, one per row (a view, nothing is copied: for
+        the thread that steps the model)"""
+        return self._columns[name][:self.n_rows]
+
+    @property
+    def model_vars(self):
+        """{name: column}, as in mesa.DataCollector"""
+        return {name: self.column(name) for name in self._columns}
+
+    def value_at(self, name, step):
+        """Value of a reporter at the last row collected at or before step
+        (0 before the first row)"""
+        with self._lock:
+            i = np.searchsorted(self.steps, step, side="right") - 1
+            return self.column(name)[i].item() if i >= 0 else 0
+
+    def series(self, name, n_steps):
+        """One value of a reporter per step, from 1 to n_steps: the one of the
+        last row collected at or before every step (0 before the first row);
+        with every > 1 the steps in between repeat the last sampled one"""
+        with self._lock:
+            rows = np.searchsorted(self.steps, np.arange(1, n_steps + 1), side="right") - 1
+            column = self.column(name)
+            return np.where(rows >= 0, column[np.maximum(rows, 0)], 0) if len(column) else np.zeros(n_steps)
+
+    def current(self, model, name):
+        """Value of a reporter for the current state of the model, whether
+        its step was collected or not"""
+        return self._value(model, self.model_reporters[name])
+
+    def get_model_vars_dataframe(self):
+        """DataFrame of the rows, indexed by step; a copy, which the next
+        rows (or clear) do not change"""
+        with self._lock:
+            return pd.DataFrame(self.model_vars, index=pd.Index(self.steps, name="Step"), copy=True)
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:48:20 2026
+
+@author: Francesco
+"""
+
+"""
+Golden-trace conformance of the fast engines against the SupplyChainModel.
+
+A golden trace is the step by step record of a run of the reference model,
+stepped one step at a time: demand, warehouses, cumulative costs, lead time,
+traffic and the position, load and state of every truck, one row per step
+(see record_trace). It can be saved and reloaded (save_trace/load_trace) to
+freeze the behaviour of a version of the model.
+
+Every faster engine is checked against it:
+    • deterministic modes (same seed, or the same demand replayed): the
+      trace of the engine must match the golden one at every step, on the
+      fields that the engine exposes (compare_traces gives the first step
+      where a field diverges). This covers the skip-ahead run(), the lanes
+      of the ShadowPolicyModel and the vector environment driven by
+      baseline_action on the demand of the reference run;
+    • stochastic modes (the engine draws from other streams, e.g.: the
+      vector environment with its own demand and production): the
+      distributions of the costs and KPIs over many seeds are compared with
+      a two-sample Kolmogorov-Smirnov test (ks_2samp, NumPy only).
+
+The checks run as a quick suite, e.g.: before merging an optimisation
+
+    python conformance.py
+    python conformance.py --golden golden.npz   #also against a frozen trace
+
+and the exit code is 1 if any of them fails.
+"""
+
+import sys #for the exit code
+import argparse #command line of the suite
+import numpy as np #numerical computing library
+from model import SupplyChainModel #reference model
+from shadow import ShadowPolicyModel #lanes on a shared demand
+from runner import replication_seeds, run_model, summarize #replications of the reference
+from vector_env import SupplyChainVectorEnv, baseline_action, IDLE, GOING, RETURNING
+
+#codes of the truck states, the ones of the vector environment
+TRUCK_STATES = {"idle": IDLE, "going": GOING, "returning": RETURNING}
+
+#outputs compared in distribution
+OUTPUTS = ("total_cost", "holding", "stockout_cost", "transportation", "times_stockout")
+
+# ======================
+# Traces
+# ======================
+def trace_of(model):
+    """Trace of the steps run so far by a model, from its histories and the
+    columns of its datacollector (whatever engine advanced it): one value
+    per step, the costs are cumulative"""
+    data = model.datacollector
+    trace = {
+        "demand": np.asarray(model.customer.demand_history, dtype=float),
+        "customer_warehouse": np.asarray(model.customer_warehouse_history, dtype=float),
+        "lead_time": np.asarray(model.lead_time_history, dtype=float),
+        "traffic": np.asarray(model.traffic_history, dtype=float),
+    }
+    for name in ("factory_warehouse", "holding", "stockout", "transportation", "times_stockout"):
+        trace[name] = data.series(name, model.steps)
+    return trace
+
+def truck_row(trucks):
+    #position, load and state of every truck
+    return ([t.position for t in trucks], [t.current_load for t in trucks],
+            [TRUCK_STATES[t.state] for t in trucks])
+
+def record_trace(model, n_steps):
+    """Golden trace of n_steps steps of the reference model, stepped one step
+    at a time, with the trucks (n_steps x n_trucks)"""
+    rows = []
+    for _ in range(n_steps):
+        model.step()
+        rows.append(truck_row(model.trucks))
+    trace = trace_of(model)
+    positions, loads, states = (np.array(x) for x in zip(*rows))
+    trace.update(truck_position=positions, truck_load=loads, truck_state=states.astype(np.int8))
+    return trace
+
+def save_trace(trace, path):
+    """Save a trace (e.g.: the golden one of a release) to a .npz file"""
+    np.savez_compressed(path, **trace)
+
+def load_trace(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+def compare_traces(reference, candidate, atol=1e-9):
+    """First divergence of every field present in both traces:
+    {field: (step, expected, got)}, empty if the candidate conforms. The
+    steps are numbered from 1, as in the model"""
+    mismatches = {}
+    for name in reference.keys() & candidate.keys():
+        expected, got = reference[name], candidate[name]
+        n = min(len(expected), len(got))
+        if len(expected) != len(got):
+            mismatches[name] = (n + 1, len(expected), len(got)) #different lengths
+        close = np.isclose(expected[:n], got[:n], rtol=0, atol=atol)
+        if close.ndim > 1:
+            close = close.all(axis=tuple(range(1, close.ndim)))
+        if not close.all():
+            i = int(np.argmin(close))
+            mismatches[name] = (i + 1, expected[i].tolist(), got[i].tolist())
+    return mismatches
+
+# ======================
+# Engines
+# ======================
+def skip_ahead_trace(n_steps, **params):
+    """Trace of the skip-ahead run() (no per-step trucks, they are advanced
+    in blocks: their final state is checked by the last row)"""
+    model = SupplyChainModel(skip_ahead=True, **params)
+    model.run(n_steps)
+    trace = trace_of(model)
+    return trace, truck_row(model.trucks)
+
+def shadow_traces(n_steps, seed, policies=("FRP", "ARP", "FBR"), **params):
+    """Trace of every lane of a ShadowPolicyModel: {policy: trace}"""
+    model = ShadowPolicyModel(seed=seed, policies=policies, **params)
+    for _ in range(n_steps):
+        model.step()
+    return {policy: trace_of(lane) for policy, lane in model.lanes.items()}
+
+def vector_env_trace(reference, policy, **params):
+    """Trace of the vector environment (one environment) replaying the demand
+    of a reference trace with the orders of baseline_action. The environment
+    serves the demand of the next step within step(), so the warehouses are
+    not comparable, the costs are"""
+    demand = reference["demand"]
+    n_steps = len(demand)
+    env = SupplyChainVectorEnv(1, max_steps=n_steps + 1, **params)
+    _, info = env.reset(options={"demand": demand[:1]})
+    stockout = [info["stockout"][0]]
+    holding, transportation, traffic, lead_time, rows = [], [], [], [], []
+    for t in range(n_steps):
+        #the demand after the last step is never used
+        following = demand[t + 1:t + 2] if t + 1 < n_steps else np.zeros(1)
+        _, _, _, _, info = env.step(baseline_action(env, policy), demand=following)
+        holding.append(info["holding"][0])
+        transportation.append(info["transportation"][0])
+        traffic.append(info["traffic"][0])
+        lead_time.append(env.lead_time[0])
+        stockout.append(info["stockout"][0])
+        rows.append((env.position[0].copy(), env.load[0].copy(), env.state[0].copy()))
+    stockout = np.array(stockout[:n_steps])
+    positions, loads, states = (np.array(x) for x in zip(*rows))
+    return {
+        "demand": demand,
+        #accumulated in the same order as the model
+        "holding": np.add.accumulate(np.concatenate([[0.0], holding]))[1:],
+        "stockout": np.add.accumulate(np.concatenate([[0.0], stockout]))[1:],
+        "times_stockout": np.cumsum(stockout > 0),
+        "transportation": np.add.accumulate(np.concatenate([[0.0], transportation]))[1:],
+        "traffic": np.array(traffic),
+        "lead_time": np.array(lead_time),
+        "truck_position": positions,
+        "truck_load": loads,
+        "truck_state": states,
+    }
+
+def vector_env_summaries(n_envs, n_steps, policy, seed=None, **params):
+    """Final costs of n_envs episodes of the vector environment with its own
+    demand (and production), as columns: {output: array}"""
+    env = SupplyChainVectorEnv(n_envs, max_steps=n_steps + 1, **params)
+    _, info = env.reset(seed=seed)
+    costs = {name: np.zeros(n_envs) for name in OUTPUTS}
+    costs["stockout_cost"] += info["stockout"]
+    costs["times_stockout"] += info["stockout_event"]
+    for t in range(n_steps):
+        _, _, _, _, info = env.step(baseline_action(env, policy))
+        costs["holding"] += info["holding"]
+        costs["transportation"] += info["transportation"]
+        if t + 1 < n_steps: #the stockout of the step after the last one is not counted
+            costs["stockout_cost"] += info["stockout"]
+            costs["times_stockout"] += info["stockout_event"]
+    costs["total_cost"] = costs["holding"] + costs["stockout_cost"] + costs["transportation"]
+    return costs
+
+def model_summaries(n_replications, n_steps, seed=None, **params):
+    """Final costs of n_replications replications of the reference model, as
+    columns: {output: array}"""
+    summaries = [summarize(run_model(n_steps, seed=s, **params))
+                 for s in replication_seeds(seed, n_replications)]
+    return {name: np.array([s[name] for s in summaries], dtype=float) for name in OUTPUTS}
+
+# ======================
+# Distributions
+# ======================
+def ks_2samp(a, b):
+    """Two-sample Kolmogorov-Smirnov test: statistic and asymptotic p-value"""
+    a, b = np.sort(np.asarray(a, dtype=float)), np.sort(np.asarray(b, dtype=float))
+    n, m = len(a), len(b)
+    values = np.concatenate([a, b])
+    d = np.abs(np.searchsorted(a, values, side="right") / n
+               - np.searchsorted(b, values, side="right") / m).max()
+    #Kolmogorov distribution, with the small sample correction
+    en = np.sqrt(n * m / (n + m))
+    lam = (en + 0.12 + 0.11 / en) * d
+    j = np.arange(1, 101)
+    p = 2 * np.sum((-1.0) ** (j - 1) * np.exp(-2 * j**2 * lam**2)) if lam > 0 else 1.0
+    return float(d), float(np.clip(p, 0, 1))
+
+def compare_distributions(reference, candidate, outputs=OUTPUTS, alpha=0.01):
+    """KS test of every output: {output: (statistic, p-value, passed)}; the
+    level is corrected for the number of outputs (Bonferroni)"""
+    level = alpha / len(outputs)
+    results = {}
+    for name in outputs:
+        d, p = ks_2samp(reference[name], candidate[name])
+        results[name] = (d, p, p >= level)
+    return results
+
+# ======================
+# Suite
+# ======================
+#scenarios of the checks, on top of the defaults of the model
+SCENARIOS = {
+    "FRP": {"order_policy": "FRP"},
+    "ARP": {"order_policy": "ARP"},
+    "FBR": {"order_policy": "FBR"},
+    "FBR, small trucks": {"order_policy": "FBR", "truck_capacity": [20, 25, 15, 50]},
+    "ARP, breakdowns": {"order_policy": "ARP", "mtbf": 30, "mttr": 4, "production_cv": 0.2},
+    "FRP, Poisson": {"order_policy": "FRP", "demand_type": "Poisson"},
+    #congested: the fleet is often away and the customer stocks out
+    "FRP, 2 slow trucks": {"order_policy": "FRP", "n_trucks": 2, "truck_movement": 0.3},
+}
+
+#hyperparameters that the vector environment does not model
+NOT_IN_ENV = ("truck_capacity",)
+
+def run_suite(n_steps=365, seeds=(0, 1, 2), n_replications=300, golden=None):
+    """Run all the checks and return their results: [(name, passed, detail)]"""
+    results = []
+    def check(name, mismatches):
+        results.append((name, not mismatches, mismatches))
+
+    for label, scenario in SCENARIOS.items():
+        policy = scenario["order_policy"]
+        for seed in seeds:
+            reference = record_trace(SupplyChainModel(seed=seed, **scenario), n_steps)
+            #skip-ahead: every step, and the trucks at the end
+            trace, trucks = skip_ahead_trace(n_steps, seed=seed, **scenario)
+            last = {"truck_" + k: np.array([v]) for k, v in zip(("position", "load", "state"), trucks)}
+            mismatches = compare_traces(reference, trace)
+            mismatches.update(compare_traces({k: reference[k][-1:] for k in last}, last))
+            check(f"skip-ahead [{label}, seed {seed}]", mismatches)
+            #shadow lanes
+            lane = shadow_traces(n_steps, seed, policies=(policy,),
+                                 **{k: v for k, v in scenario.items() if k != "order_policy"})[policy]
+            check(f"shadow lane [{label}, seed {seed}]", compare_traces(reference, lane))
+            #vector environment on the same demand, when its production is the same
+            if not any(k in scenario for k in NOT_IN_ENV + ("mtbf", "production_cv")):
+                params = {k: v for k, v in scenario.items() if k != "order_policy"}
+                check(f"vector env replay [{label}, seed {seed}]",
+                      compare_traces(reference, vector_env_trace(reference, policy, **params)))
+
+    #stochastic modes: the vector environment draws its own demand and production
+    for label, scenario in SCENARIOS.items():
+        if any(k in scenario for k in NOT_IN_ENV):
+            continue
+        params = {k: v for k, v in scenario.items() if k != "order_policy"}
+        reference = model_summaries(n_replications, n_steps, seed=seeds[0], **scenario)
+        candidate = vector_env_summaries(n_replications, n_steps, scenario["order_policy"],
+                                         seed=seeds[0], **params)
+        tests = compare_distributions(reference, candidate)
+        failed = {name: (round(d, 4), round(p, 4)) for name, (d, p, ok) in tests.items() if not ok}
+        check(f"vector env distribution [{label}]", failed)
+
+    #frozen golden trace of an earlier version
+    if golden is not None:
+        frozen = load_trace(golden)
+        scenario = {k: v.item() for k, v in frozen.items() if k.startswith("param_")}
+        trace = record_trace(SupplyChainModel(**{k[6:]: v for k, v in scenario.items()}),
+                             len(frozen["demand"]))
+        check(f"golden trace [{golden}]", compare_traces(frozen, trace))
+    return results
+
+def freeze(path, n_steps=365, **params):
+    """Record the golden trace of a scenario and save it with its
+    hyperparameters (scalars only), to be checked by later versions"""
+    trace = record_trace(SupplyChainModel(**params), n_steps)
+    trace.update({"param_" + k: np.array(v) for k, v in params.items()})
+    save_trace(trace, path)
+    return trace
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conformance of the engines to the SupplyChainModel")
+    parser.add_argument("--steps", type=int, default=365)
+    parser.add_argument("--replications", type=int, default=300)
+    parser.add_argument("--golden", default=None, help="golden trace (.npz) to check against")
+    parser.add_argument("--freeze", default=None, help="record the golden trace of seed 42 here")
+    args = parser.parse_args()
+    if args.freeze:
+        freeze(args.freeze, args.steps, seed=42, order_policy="FBR")
+    results = run_suite(args.steps, n_replications=args.replications, golden=args.golden)
+    for name, passed, detail in results:
+        print(("ok      " if passed else "FAILED  ") + name + ("" if passed else f"  {detail}"))
+    n_failed = sum(not passed for _, passed, _ in results)
+    print(f"{len(results) - n_failed} passed, {n_failed} failed")
+    sys.exit(1 if n_failed else 0)
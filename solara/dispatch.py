@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:05:44 2026
+
+@author: Francesco
+"""
+
+"""
+Dispatch of the orders on a fleet of trucks with a maximum load each.
+
+The dispatcher keeps the fleet as arrays: the maximum load and whether it is
+idle, for every truck, and the number of trucks away from the factory (the
+traffic). They are updated in O(1) when a truck leaves or comes back, instead
+of being counted by every truck at every step, and the idle trucks of a
+dispatch are read from the array, whatever the size of the fleet.
+
+An order is taken only when a truck can leave the same day (otherwise it is
+refused, and the customer orders again): its stock is set aside at the
+factory. The orders taken in a day are dispatched at once, at the end of the
+day, together with the backorders of the previous days, with first-fit
+decreasing over the idle trucks: the largest order first, each one on the
+first idle truck (in the order of the fleet) with enough room left, so that
+small orders end up consolidated on the same truck. An order larger than the
+room of any truck is split over the trucks with the most room left, and what
+does not fit in the idle fleet waits at the factory as a backorder, first in
+line the next days. With unlimited loads (the default) an order always goes
+on the first idle truck, as before, and there are no backorders.
+"""
+
+import math #for the unlimited load
+import numpy as np #numerical computing library
+
+def fleet_capacities(n_trucks, truck_capacity=None):
+    """Maximum load of every truck: None for unlimited loads, a number for a
+    homogeneous fleet, a sequence (repeated over the fleet) for a
+    heterogeneous one, e.g.: [20, 25, 15, 50, 50, 100, 25, 50]"""
+    if truck_capacity is None:
+        return [math.inf] * n_trucks
+    if np.isscalar(truck_capacity):
+        return [truck_capacity] * n_trucks
+    truck_capacity = list(truck_capacity)
+    return [truck_capacity[i % len(truck_capacity)] for i in range(n_trucks)]
+
+
+def first_fit_decreasing(orders, room):
+    """Orders on the trucks with the given room: the largest order first, on
+    the first truck with enough room left, or split over the trucks with the
+    most room. Returns the load of every truck used, [(index, load)], and
+    what does not fit, [quantity]"""
+    room = np.array(room, dtype=float)
+    loads = np.zeros(len(room))
+    used = np.zeros(len(room), dtype=bool)
+    left_over = []
+    for quantity in sorted(orders, reverse=True):
+        fits = room >= quantity
+        if fits.any():
+            #first fit
+            j = int(fits.argmax())
+            room[j] -= quantity
+            loads[j] += quantity
+            used[j] = True
+            continue
+        #split over the trucks with the most room, as few as possible:
+        #each one takes what the larger ones left, up to its room
+        largest = np.argsort(-room, kind="stable")
+        ahead = np.cumsum(room[largest]) - room[largest]
+        pieces = np.clip(quantity - ahead, 0, room[largest])
+        room[largest] -= pieces
+        loads[largest] += pieces
+        used[largest] |= pieces > 0
+        left = quantity - pieces.sum().item()
+        if left > 0:
+            left_over.append(left)
+    return [(j, loads[j].item()) for j in np.flatnonzero(used).tolist()], left_over
+
+
+class Dispatcher:
+    """Idle capacity of the fleet, orders of the day and backorders"""
+
+    def __init__(self, trucks):
+        self.trucks = trucks
+        self.capacity = np.array([t.maximum_load for t in trucks], dtype=float)
+        self.available = np.array([t.available for t in trucks], dtype=bool) #idle trucks
+        self.n_busy = len(trucks) - int(self.available.sum()) #trucks away from the factory
+        self._index = {truck: i for i, truck in enumerate(trucks)}
+        self.events = 0 #trucks that left, arrived or came back so far
+        self.orders = [] #orders taken today, dispatched at the end of the day
+        self.backorders = [] #taken on earlier days, not shipped yet
+
+    @property
+    def backlog(self):
+        """Quantity taken but not shipped yet, waiting at the factory"""
+        return sum(self.backorders)
+
+    def release(self, truck):
+        """A truck is back at the factory"""
+        self.available[self._index[truck]] = True
+        self.n_busy -= 1
+        self.events += 1
+
+    def arrived(self, truck):
+        """A truck unloaded at the customer"""
+        self.events += 1
+
+    def _assign(self, i, load):
+        self.trucks[i].assign_load(load)
+        self.available[i] = False
+        self.n_busy += 1
+        self.events += 1
+
+    def take(self, quantity):
+        """Take an order of the day, if a truck can leave today; returns
+        whether it was taken"""
+        if self.n_busy == len(self.trucks):
+            return False
+        self.orders.append(quantity)
+        return True
+
+    def dispatch(self):
+        """Assign the backorders and the orders of the day to the idle trucks
+        (first-fit decreasing, splitting the orders that fit on no truck) and
+        return the quantity shipped; what does not fit is backordered"""
+        if not self.orders and not self.backorders:
+            return 0
+        orders = self.backorders + self.orders
+        self.orders = []
+        idle = np.flatnonzero(self.available)
+        shipments, self.backorders = first_fit_decreasing(orders, self.capacity[idle])
+        for j, load in shipments:
+            self._assign(idle[j].item(), load)
+        return sum(load for _, load in shipments)
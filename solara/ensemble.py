@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:03:15 2026
+
+@author: Francesco
+"""
+
+"""
+Ensemble result store backed by a memory-mapped file.
+
+The results of all the replications live in a single array on disk, laid out
+as (replication x step x metric). Every worker opens the same file and writes
+its own rows in place, so nothing is pickled back to the parent process, and
+the aggregations (mean, quantiles, fan charts) read the mapped array in blocks
+without ever loading it all in memory.
+
+A small JSON file next to the data ('<path>.json') keeps the shape, the dtype
+and the names of the metrics, so that the store can be reopened later.
+"""
+
+import os #for the number of cores
+import json #for the metadata of the store
+import numpy as np #numerical computing library
+from concurrent.futures import ProcessPoolExecutor #for the parallel replications
+from model import SupplyChainModel #import of the model
+from runner import replication_seeds #same seeds of the headless runner
+
+#metrics recorded at the end of every step (columns of the datacollector of
+#the model), the costs are cumulative
+METRICS = (
+    "holding",
+    "stockout",
+    "times_stockout",
+    "transportation",
+    "lead_time",
+    "traffic",
+    "customer_warehouse",
+    "factory_warehouse",
+)
+
+# ======================
+# Store
+# ======================
+class EnsembleStore:
+    """Memory-mapped (replication x step x metric) array of results"""
+
+    def __init__(self, path, mode="r"):
+        #open an existing store, 'r' to read, 'r+' to write into it
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        self.path = path
+        self.metrics = tuple(meta["metrics"])
+        self.data = np.memmap(path, dtype=meta["dtype"], mode=mode,
+                              shape=tuple(meta["shape"]))
+
+    @classmethod
+    def create(cls, path, n_replications, n_steps, metrics=METRICS, dtype="float32"):
+        """Create an empty store on disk, NaN marks the rows not written yet"""
+        meta = {
+            "shape": [n_replications, n_steps, len(metrics)],
+            "dtype": dtype,
+            "metrics": list(metrics),
+        }
+        with open(path + ".json", "w") as f:
+            json.dump(meta, f)
+        data = np.memmap(path, dtype=dtype, mode="w+", shape=tuple(meta["shape"]))
+        data[:] = np.nan
+        data.flush()
+        del data
+        return cls(path, mode="r+")
+
+    @property
+    def n_replications(self):
+        return self.data.shape[0]
+
+    @property
+    def n_steps(self):
+        return self.data.shape[1]
+
+    def metric(self, name):
+        """(replication x step) view of a single metric, nothing is loaded"""
+        return self.data[:, :, self.metrics.index(name)]
+
+    def flush(self):
+        self.data.flush()
+
+    # ======================
+    # Aggregations
+    # ======================
+    def mean(self, name, block=256):
+        """Mean over the replications for every step, reading a block of
+        replications at a time"""
+        values = self.metric(name)
+        total = np.zeros(self.n_steps)
+        count = np.zeros(self.n_steps)
+        for r0 in range(0, self.n_replications, block):
+            chunk = np.asarray(values[r0:r0 + block], dtype=np.float64)
+            total += np.nansum(chunk, axis=0)
+            count += np.sum(~np.isnan(chunk), axis=0)
+        with np.errstate(invalid="ignore"):
+            return total / count
+
+    def quantiles(self, name, q, block=64):
+        """Quantiles over the replications for every step, shape (len(q) x
+        step); quantiles need all the replications, so here the blocks are
+        taken along the steps"""
+        values = self.metric(name)
+        q = np.atleast_1d(q)
+        out = np.empty((len(q), self.n_steps))
+        for s0 in range(0, self.n_steps, block):
+            chunk = np.asarray(values[:, s0:s0 + block], dtype=np.float64)
+            out[:, s0:s0 + block] = np.nanquantile(chunk, q, axis=0)
+        return out
+
+    def fan_chart(self, name, levels=(0.5, 0.8, 0.95)):
+        """Median and central bands of a metric, ready to be plotted with
+        'fill_between': {level: (lower, upper)}"""
+        q = [0.5]
+        for level in levels:
+            q += [(1 - level) / 2, (1 + level) / 2]
+        values = self.quantiles(name, q)
+        bands = {level: (values[1 + 2*i], values[2 + 2*i]) for i, level in enumerate(levels)}
+        return values[0], bands
+
+# ======================
+# Parallel replications
+# ======================
+def _simulate_into(job):
+    #each worker opens the store by itself and writes its rows in place,
+    #only the index of the replication goes back to the parent
+    path, replication, n_steps, model_kwargs = job
+    store = EnsembleStore(path, mode="r+")
+    #the store keeps every step, the datacollector must not sample them
+    model = SupplyChainModel(**{**model_kwargs, "collect_every": 1})
+    model.run(n_steps)
+    data = model.datacollector
+    store.data[replication] = np.column_stack([data.series(name, n_steps) for name in store.metrics])
+    store.flush()
+    return replication
+
+def run_ensemble(path, n_replications, n_steps, seed=None, n_workers=None, **model_kwargs):
+    """Run n_replications replications of the same scenario, storing the whole
+    trajectories in a new EnsembleStore at path"""
+    store = EnsembleStore.create(path, n_replications, n_steps)
+    seeds = replication_seeds(seed, n_replications)
+    jobs = [(path, r, n_steps, {**model_kwargs, "seed": s}) for r, s in enumerate(seeds)]
+
+    #with a single worker we avoid the overhead of the processes
+    if n_workers == 1:
+        for job in jobs:
+            _simulate_into(job)
+        return EnsembleStore(path)
+
+    n_workers = n_workers or os.cpu_count()
+    chunksize = max(1, len(jobs) // (4 * n_workers))
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        for _ in pool.map(_simulate_into, jobs, chunksize=chunksize):
+            pass
+    del store
+    return EnsembleStore(path)
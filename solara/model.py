@@ -7,10 +7,18 @@ Created on Sun Dec 21 11:48:00 2025
 
 import mesa #Python agent based modeling library
 import numpy as np #numerical computing library
+from operator import attrgetter #reporters of the warehouses
 from agents import (Factory, # import of the agents
                     Customer, 
                     Truck,
+                    demand_generator, #synthetic demand
+                    moving_average, #demand forecast of ARP and FBR
                     lead_time_updater) #for lead time calculation kpi
+from dispatch import Dispatcher, fleet_capacities #orders on the trucks
+from production import ProductionSchedule #stochastic production of the factory
+from warmup import warmup_length #for the steady-state kpis
+import skip_ahead #adaptive stepping of the quiet periods
+from collector import ColumnarCollector #data collection in typed columns
 
 # ======================
 # Model
@@ -37,6 +45,17 @@ class SupplyChainModel(mesa.Model):
         h = 0.01, #unit holding cost
         c = 0.01, #unit transport cost
         n_trucks=8,#number of trucks initial
+        truck_capacity = None, #maximum load of the trucks: None (unlimited), a number or one per truck
+        #stochastic production
+        mtbf = None, #mean steps between the failures of the factory, None: it never fails
+        mttr = 3, #mean steps of a repair
+        weibull_k = 1.5, #shape of the Weibull distribution of the working periods
+        production_cv = 0.0, #coefficient of variation of the daily output
+        warmup = "None", #warm-up truncation of the kpis: "None", "MSER-5" or steps
+        demand_source = None, #external demand (e.g.: replayed), instead of the synthetic one
+        skip_ahead = False, #run() advances the quiet steps in blocks
+        collect_every = 1, #the datacollector keeps a row every collect_every steps
+        collect_on_change = False, #...and only when a value changed
     ):
         #pass the parameters of the parent class
         super().__init__(seed=seed)
@@ -55,6 +74,25 @@ class SupplyChainModel(mesa.Model):
         self.p = p
         self.h = h
         self.c = c
+        self.warmup = warmup
+        self.truck_capacity = truck_capacity
+        self.mtbf = mtbf
+        self.mttr = mttr
+        self.weibull_k = weibull_k
+        self.production_cv = production_cv
+        #with failures or noise, the output of the factory is sampled in bulk
+        #from its own stream, spawned from the one of the model
+        self.production = None
+        if mtbf is not None or production_cv > 0:
+            self.production = ProductionSchedule(self.rng.spawn(1)[0], mu, mtbf, mttr,
+                                                 weibull_k, production_cv)
+        #a stateful source (e.g.: a trace) is copied, so that every model
+        #replays it from its start, whatever process or order it runs in
+        spawn = getattr(demand_source, "spawn", None)
+        self.demand_source = spawn() if spawn is not None else demand_source
+        self.skip_ahead = skip_ahead
+        self._demands = [] #demands drawn in advance by the skip-ahead
+        self._no_jump = None #dispatcher.events when a jump was last ruled out
        
         #performance variables for DataCollector    
         self.hold = 0.0
@@ -63,6 +101,7 @@ class SupplyChainModel(mesa.Model):
         self.transportation = 0.0
         #added for kpis
         self.lead_time = 0
+        self.traffic = 0
         self.customer_warehouse_history = []
         self.traffic_history = []
         self.lead_time_history = []
@@ -80,33 +119,39 @@ class SupplyChainModel(mesa.Model):
 
         # Trucks: create a list of agents, one per truck
         self.trucks = []
-        for i in range(n_trucks):
+        for maximum_load in fleet_capacities(n_trucks, truck_capacity):
             truck = Truck(
                 model=self,
                 available=True,
                 position=0,
                 current_load=0,
                 state="idle",
+                maximum_load=maximum_load,
             )
             self.trucks.append(truck)
+        self.dispatcher = Dispatcher(self.trucks)
         
         #register all the agents
         for agent in [self.factory, self.customer, *self.trucks]:
             self.agents.add(agent)
 
-        #directly linked and updated by the performance variables
-        self.datacollector = mesa.DataCollector(
+        #directly linked and updated by the performance variables, one value
+        #per row (the histories are kept by the model, not copied at each row)
+        self.datacollector = ColumnarCollector(
             model_reporters = {"holding": "hold",
                                "stockout": "stockout_cost",
                                "times_stockout": "times_stockout",
                                "transportation": "transportation",
                                #added for kpis
                                "lead_time": "lead_time",
-                               "customer_warehouse_history": "customer_warehouse_history",
-                               "traffic_history": "traffic_history",
-                               "lead_time_history" : "lead_time_history",
-                               
-                               }
+                               "traffic": "traffic",
+                               "customer_warehouse": attrgetter("customer.warehouse"),
+                               "factory_warehouse": attrgetter("factory.warehouse"),
+                               "backorder": attrgetter("dispatcher.backlog"),
+                               },
+            every = collect_every,
+            on_change = collect_on_change,
+            dtypes = {"times_stockout": np.int64},
         )
         
     def step(self):
@@ -119,29 +164,134 @@ class SupplyChainModel(mesa.Model):
     
         # collect kpis data
         self.customer_warehouse_history.append(self.customer.warehouse)
-        traffic = (sum(not t.available for t in self.trucks) / len(self.trucks))
+        traffic = self.dispatcher.n_busy / len(self.trucks)
         lead_time = lead_time_updater(self, traffic)
         self.traffic_history.append(traffic)
         self.lead_time_history.append(lead_time)
         self.lead_time = lead_time
+        self.traffic = traffic
 
         # collect data at the end of the step
         self.datacollector.collect(self)
 
-    def compute_kpis(self):
-        """Compute additional KPIs after the simulation ends"""
+    def run(self, n_steps):
+        """Run n_steps steps; with skip_ahead the quiet steps (see
+        skip_ahead.py) are advanced in blocks, with the same result"""
+        end = self.steps + n_steps
+        n_trucks = len(self.trucks)
+        floor = skip_ahead.order_floor(self) if self.skip_ahead else None
+        while self.steps < end:
+            #a jump is tried only when the next event looks far enough: not
+            #with the customer about to order and a truck idle, nor before
+            #a truck leaves, arrives or comes back once ruled out (see
+            #skip_ahead.horizon); the busy steps go straight to step()
+            if (self.skip_ahead and (self.customer.warehouse >= floor or self.dispatcher.n_busy == n_trucks)
+                    and self.dispatcher.events != self._no_jump and skip_ahead.can_skip(self)):
+                horizon = skip_ahead.horizon(self)
+                if horizon >= skip_ahead.MIN_JUMP:
+                    demands = self.draw_demands(int(min(2 * horizon, skip_ahead.MAX_BLOCK, end - self.steps)))
+                    quiet = skip_ahead.jump(self, demands)
+                    del self._demands[:quiet]
+                    if quiet == len(demands):
+                        continue
+                else:
+                    self._no_jump = self.dispatcher.events
+            self.step()
+
+    def reset(self, **params):
+        """Back to step 0 with the given hyperparameters (the defaults for the
+        missing ones), reusing this instance and the columns of its
+        datacollector, e.g.: for a pool of models shared by the sessions of
+        the dashboard; if the hyperparameters are not valid the model is left
+        as it was"""
+        state = dict(self.__dict__)
+        collector = self.datacollector
+        del self.step #mesa.Model.__init__ wraps the step again
+        try:
+            self.__init__(**params)
+        except Exception:
+            #back to the model before the reset (its agents still point at it)
+            self.__dict__.clear()
+            self.__dict__.update(state)
+            raise
+        #the columns keep their capacity, only the rows are dropped
+        collector.every = self.datacollector.every
+        collector.on_change = self.datacollector.on_change
+        collector.clear()
+        self.datacollector = collector
+
+    def draw_demands(self, n):
+        """The next n demands, drawn in advance and kept until they are used"""
+        missing = n - len(self._demands)
+        if missing > 0:
+            if self.demand_source is not None:
+                self._demands += [self.demand_source.draw(self) for _ in range(missing)]
+            elif self.demand_type == "Normal":
+                #the same stream as one draw per step, rounded as demand_generator
+                self._demands += np.maximum(0, np.round(self.rng.normal(self.mu, self.sigma, missing))).astype(int).tolist()
+            else:
+                self._demands += self.rng.poisson(self.mu, missing).tolist()
+        return np.array(self._demands[:n])
+
+    def draw_demand(self):
+        """Exogenous demand of the current step: from the demand source, if
+        any, otherwise from the generator of the model"""
+        if self._demands:
+            return self._demands.pop(0)
+        if self.demand_source is not None:
+            return self.demand_source.draw(self)
+        return demand_generator(self.mu, self.sigma, self.demand_type, self.rng)
+
+    def demand_forecast(self):
+        """Moving average of the demand used by ARP and FBR"""
+        return moving_average(self.customer.demand_history, self.kernel_size)
+
+    def warmup_length(self, warmup=None):
+        """Number of initial steps discarded by the steady-state kpis and
+        costs, with a warm-up rule (by default the 'warmup' parameter); with
+        a sampled datacollector it ends at a sampled step, where the
+        cumulative costs are known"""
+        d = warmup_length(self, self.warmup if warmup is None else warmup)
+        return d - d % self.datacollector.every
+
+    def compute_kpis(self, warmup=None):
+        """Compute additional KPIs after the simulation ends, discarding the
+        warm-up period (by default the one chosen with the 'warmup' parameter)"""
+        d = self.warmup_length(warmup)
+        lead_time_history = self.lead_time_history[d:]
+        customer_warehouse_history = self.customer_warehouse_history[d:]
+        traffic_history = self.traffic_history[d:]
         #lead time avg and coefficient of variation
-        AVG_L = float(np.mean(self.lead_time_history)) if len(self.lead_time_history) > 0 else 0
-        CV_L = float(np.std(self.lead_time_history) / AVG_L) if AVG_L > 0 else 0
+        AVG_L = float(np.mean(lead_time_history)) if len(lead_time_history) > 0 else 0
+        CV_L = float(np.std(lead_time_history) / AVG_L) if AVG_L > 0 else 0
         #warehouse avg and coefficient of variation
-        AVG_S = float(np.mean(self.customer_warehouse_history)) if len(self.customer_warehouse_history) > 0 else 0
-        CV_S = float(np.std(self.customer_warehouse_history) / AVG_S) if AVG_S > 0 else 0
+        AVG_S = float(np.mean(customer_warehouse_history)) if len(customer_warehouse_history) > 0 else 0
+        CV_S = float(np.std(customer_warehouse_history) / AVG_S) if AVG_S > 0 else 0
         #traffic avg
-        AVG_T = float(np.mean(self.traffic_history)) if len(self.traffic_history) > 0 else 0
+        AVG_T = float(np.mean(traffic_history)) if len(traffic_history) > 0 else 0
 
         return {
             "avg_lead_time": AVG_L,
             "cv_lead_time": CV_L,
             "cv_inventory": CV_S,
             "avg_traffic": AVG_T * 100,
-        }
\ No newline at end of file
+        }
+
+    def compute_costs(self, warmup=None):
+        """Costs accumulated after the warm-up period, in total and per step"""
+        #the same warm-up as the kpis; the costs are cumulative, their value
+        #at its end is the one of the last row (the skipped rows are equal)
+        d = self.warmup_length(warmup)
+        data = self.datacollector
+        n = self.steps - d
+        costs = {"warmup": d, "steps": n}
+        for name, key, final in [("times_stockout", "times_stockout", self.times_stockout),
+                                 ("stockout_cost", "stockout", self.stockout_cost),
+                                 ("holding", "holding", self.hold),
+                                 ("transportation", "transportation", self.transportation)]:
+            costs[name] = final - data.value_at(key, d) if n > 0 else 0
+        costs["total_cost"] = costs["stockout_cost"] + costs["holding"] + costs["transportation"]
+        #per step rates, comparable between horizons of different length
+        for name in ["times_stockout", "stockout_cost", "holding", "transportation", "total_cost"]:
+            costs[name + "_rate"] = costs[name] / n if n > 0 else 0
+        return costs
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:20:04 2026
+
+@author: Francesco
+"""
+
+from mesa.visualization import Slider #to create sliders for parameters
+
+# ======================
+# Interactive parameters
+# ======================
+#the following parameters are taken by the model itself
+model_params = {
+    "seed": {
+        "type": "InputText",
+        "value": "42",
+        "label": "Random Seed",
+    },
+
+    "demand_type": {
+                        "type": "Select",
+                        "value": "Normal",
+                        "values": ["Normal", "Poisson"],
+                        "label": "Demand Type",
+                    },
+    "order_policy": {
+                        "type": "Select",
+                        "value": "FRP",
+                        "values": ["FRP", "ARP", "FBR"],
+                        "label": "Ordering Policy",
+                    },
+    "warmup": {
+                        "type": "Select",
+                        "value": "None",
+                        "values": ["None", "MSER-5"],
+                        "label": "Warm-up truncation of the KPIs",
+                    },
+
+    "mu": Slider("Demand μ [unit]", 10, 1, 50, 1),
+    "sigma": Slider("Demand σ [unit]", 5, 0.1, 15, 0.25),
+    "alpha": Slider("Congestion sensitivity (α) [ad]", 0.75, 0.0, 2.0, 0.01),
+    "beta": Slider("Empty truck speed factor (β) [ad]", 1.1, 1.0, 1.5, 0.005),
+    "L_0": Slider("Free-flow lead time (L0) [unit]", 3, 0.1, 10, 0.25),
+    "k": Slider("Safety factor (k) [ad]", 2.33, 1.0, 3.0, 0.01),
+    "truck_movement": Slider("Truck movement per step [ad]", 1, 0.1, 5.0, 0.1),
+    "p": Slider("Unit stockout penalty [€/unit]", 25.0, 0.0, 100.0, 1),
+    "h": Slider("Unit holding cost [€/unit]", 1.5, 0.0, 50.0, 0.5),
+    "c": Slider("Unit transport cost [€/unit]", 4, 0.0, 50.0, 0.5),
+    "n_trucks": Slider('Number of trucks [ad]', 8, 1, 20, 1),
+}
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:26:44 2026
+
+@author: Francesco
+"""
+
+"""
+Precomputed trajectories for the playback in the dashboard.
+
+The whole run is simulated once and stored as compact arrays, one value per
+step; the costs and the KPIs at any step t are then read in O(1) (the KPIs
+from prefix sums), so that moving the time slider back and forth never runs
+the model again. A trajectory can also be taken from an EnsembleStore.
+"""
+
+import json #for the keys of the cache
+from collections import OrderedDict #for the cache of the trajectories
+import numpy as np #numerical computing library
+from model import SupplyChainModel #import of the model
+
+#series of a trajectory, the costs are cumulative
+SERIES = ("holding", "stockout", "transportation", "times_stockout",
+          "lead_time", "traffic", "customer_warehouse")
+
+class Trajectory:
+    """One value per step for every series, with prefix sums for the KPIs"""
+
+    def __init__(self, series):
+        self.series = {name: np.asarray(series[name], dtype=float) for name in SERIES}
+        self.n_steps = len(self.series["holding"])
+        #prefix sums: sum and sum of squares up to every step
+        self.prefix = {}
+        for name in ("lead_time", "customer_warehouse", "traffic"):
+            x = self.series[name]
+            self.prefix[name] = (np.concatenate([[0.0], np.cumsum(x)]),
+                                 np.concatenate([[0.0], np.cumsum(x**2)]))
+
+    @classmethod
+    def record(cls, n_steps, **scenario):
+        """Run the model once, the series are the columns of its datacollector
+        (one row per step, whatever sampling the scenario asks for)"""
+        model = SupplyChainModel(**{**scenario, "collect_every": 1})
+        model.run(n_steps)
+        return cls({name: model.datacollector.series(name, n_steps) for name in SERIES})
+
+    @classmethod
+    def from_store(cls, store, replication):
+        """Trajectory of a replication of an EnsembleStore (see ensemble.py)"""
+        return cls({name: store.metric(name)[replication] for name in SERIES})
+
+    def _mean_std(self, name, t):
+        s1, s2 = self.prefix[name]
+        mean = s1[t] / t
+        return mean, np.sqrt(max(s2[t] / t - mean**2, 0.0))
+
+    def costs_at(self, t):
+        """Cumulative costs at the end of step t (1 <= t <= n_steps)"""
+        i = t - 1
+        hold = self.series["holding"][i]
+        stockout = self.series["stockout"][i]
+        transportation = self.series["transportation"][i]
+        return {
+            "steps": t,
+            "times_stockout": int(self.series["times_stockout"][i]),
+            "stockout_cost": stockout,
+            "holding": hold,
+            "transportation": transportation,
+            "total_cost": hold + stockout + transportation,
+        }
+
+    def kpis_at(self, t):
+        """The KPIs of SupplyChainModel.compute_kpis over the first t steps"""
+        AVG_L, STD_L = self._mean_std("lead_time", t)
+        AVG_S, STD_S = self._mean_std("customer_warehouse", t)
+        AVG_T, _ = self._mean_std("traffic", t)
+        return {
+            "avg_lead_time": AVG_L,
+            "cv_lead_time": STD_L / AVG_L if AVG_L > 0 else 0,
+            "cv_inventory": STD_S / AVG_S if AVG_S > 0 else 0,
+            "avg_traffic": AVG_T * 100,
+        }
+
+
+#the most recent trajectories, shared by all the sessions of the dashboard
+_CACHE = OrderedDict()
+CACHE_SIZE = 16
+
+def cached_trajectory(n_steps, **scenario):
+    """Trajectory of a scenario, simulated only the first time it is asked"""
+    key = json.dumps([n_steps, scenario], sort_keys=True, default=str)
+    if key in _CACHE:
+        _CACHE.move_to_end(key)
+    else:
+        _CACHE[key] = Trajectory.record(n_steps, **scenario)
+        if len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return _CACHE[key]
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 16:21:37 2026
+
+@author: Francesco
+"""
+
+"""
+Stochastic production of the factory: noise on the daily output and machine
+breakdowns.
+
+The factory alternates working periods, whose length follows a Weibull
+distribution (mean mtbf steps, shape weibull_k: >1 means that the failure
+rate grows with the age of the machine), and repair periods, exponential with
+mean mttr steps; both are rounded to whole steps. While it works, the factory
+produces mu per step times a Normal noise with coefficient of variation
+production_cv (never negative); while it is under repair it produces nothing.
+
+The periods are not checked with a draw at every step: the whole renewal
+schedule is sampled in bulk (thousands of steps at a time, for many
+replications at once) and the output of a step is then read from an array in
+O(1). The schedule has its own generator, spawned from the one of the model,
+so that the demand draws are the same with and without failures (common
+random numbers) and the skip-ahead can read whole blocks of output.
+"""
+
+import math #for the scale of the Weibull distribution
+import numpy as np #numerical computing library
+
+def _fresh(rng, up, mtbf, mttr, weibull_k):
+    #new working (up) or repair periods, in whole steps
+    working = np.round(mtbf / math.gamma(1 + 1 / weibull_k) * rng.weibull(weibull_k, up.shape))
+    repair = np.round(rng.exponential(mttr, up.shape))
+    return np.maximum(1, np.where(up, working, repair)).astype(np.int64)
+
+def sample_working(rng, n, n_steps, mtbf, mttr=3, weibull_k=1.5, up=None, left=None):
+    """Working flags (n x n_steps) of n independent renewal schedules. up and
+    left give the state at the first step and the steps left in the current
+    period (0 for a new one), to continue a schedule; the state at the step
+    after the last one is returned with the same meaning"""
+    up = np.ones(n, dtype=bool) if up is None else np.asarray(up, dtype=bool)
+    left = np.zeros(n, dtype=np.int64) if left is None else np.asarray(left, dtype=np.int64)
+    first = np.where(left > 0, left, _fresh(rng, up, mtbf, mttr, weibull_k))
+
+    #periods after the current one, alternating, enough to cover the block
+    n_periods = int(2 * n_steps / (mtbf + mttr)) + 4
+    while True:
+        state = up[:, None] ^ (np.arange(1, n_periods + 1) % 2 == 1)
+        durations = np.column_stack([first, _fresh(rng, state, mtbf, mttr, weibull_k)])
+        ends = np.cumsum(durations, axis=1) #first step after every period
+        if (ends[:, -1] > n_steps).all():
+            break
+        n_periods *= 2
+
+    #the state flips at the end of every period
+    flips = np.zeros((n, n_steps + 1), dtype=np.int64)
+    rows, periods = np.nonzero(ends < n_steps)
+    np.add.at(flips, (rows, ends[rows, periods]), 1)
+    working = up[:, None] ^ (np.cumsum(flips[:, :n_steps], axis=1) % 2 == 1)
+
+    #period in progress at the step after the block
+    done = (ends <= n_steps).sum(axis=1)
+    next_left = ends[np.arange(n), done] - n_steps
+    next_up = up ^ (done % 2 == 1)
+    return working, next_up, next_left
+
+def sample_outputs(rng, n, n_steps, mu, mtbf=None, mttr=3, weibull_k=1.5, production_cv=0.0,
+                   up=None, left=None):
+    """Output of every step (n x n_steps) of n factories, with the state of
+    the schedule after the block (see sample_working)"""
+    output = np.full((n, n_steps), float(mu))
+    if production_cv > 0:
+        output = np.maximum(0, rng.normal(mu, production_cv * mu, (n, n_steps)))
+    if mtbf is None:
+        return output, up, left
+    working, up, left = sample_working(rng, n, n_steps, mtbf, mttr, weibull_k, up, left)
+    return output * working, up, left
+
+
+class ProductionSchedule:
+    """Pre-sampled output of the factory of a model, step by step"""
+
+    def __init__(self, rng, mu, mtbf=None, mttr=3, weibull_k=1.5, production_cv=0.0, block=4096):
+        self.rng = rng
+        self.mu = mu
+        self.mtbf = mtbf
+        self.mttr = mttr
+        self.weibull_k = weibull_k
+        self.production_cv = production_cv
+        self.block = block #steps sampled at a time
+        self.outputs = np.empty(0)
+        self._up = None #state of the schedule after the sampled steps
+        self._left = None
+
+    def _extend(self, n_steps):
+        #sample until n_steps steps are known, continuing the schedule
+        while len(self.outputs) < n_steps:
+            outputs, self._up, self._left = sample_outputs(
+                self.rng, 1, self.block, self.mu, self.mtbf, self.mttr, self.weibull_k,
+                self.production_cv, self._up, self._left)
+            self.outputs = np.concatenate([self.outputs, outputs[0]])
+
+    def at(self, step):
+        """Output of a step (the first one is 1)"""
+        if step > len(self.outputs):
+            self._extend(step)
+        return float(self.outputs[step - 1])
+
+    def outputs_between(self, first, n):
+        """Outputs of the n steps from first, e.g.: for the skip-ahead"""
+        self._extend(first + n - 1)
+        return self.outputs[first - 1:first - 1 + n]
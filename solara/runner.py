@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+
+@author: Francesco
+"""
+
+"""
+Headless runner: it runs the SupplyChainModel without the dashboard, either a
+single time or as many independent replications spread over all the cores of
+the machine.
+"""
+
+import os #for the number of cores
+import inspect #to read the hyperparameters of the model
+import numpy as np #for the seeds of the replications
+from concurrent.futures import ProcessPoolExecutor #for the parallel replications
+from model import SupplyChainModel #import of the model
+
+# ======================
+# Single run
+# ======================
+def total_cost(model):
+    return model.hold + model.stockout_cost + model.transportation
+
+def summarize(model):
+    """Final costs and KPIs of a model, as a flat dictionary; with a warm-up
+    rule the KPIs are the steady-state ones and the steady-state costs are
+    added with the prefix 'steady_'"""
+    summary = {
+        "steps": model.steps,
+        "times_stockout": model.times_stockout,
+        "stockout_cost": model.stockout_cost,
+        "holding": model.hold,
+        "transportation": model.transportation,
+        "total_cost": total_cost(model),
+        #realised mean demand, e.g.: for the control variates
+        "avg_demand": float(np.mean(model.customer.demand_history)) if model.customer.demand_history else 0.0,
+        **model.compute_kpis(),
+    }
+    if model.warmup not in (None, "None"):
+        summary.update({"steady_" + k: v for k, v in model.compute_costs().items()})
+    return summary
+
+def scenario_of(model):
+    """Hyperparameters of an existing model, as a dictionary that builds the
+    same scenario (e.g.: the one set in the dashboard)"""
+    scenario = {}
+    for name in inspect.signature(SupplyChainModel.__init__).parameters:
+        if name == "n_trucks":
+            scenario[name] = len(model.trucks)
+        elif name == "seed":
+            #the dashboard gives the seed as text
+            seed = model._seed
+            scenario[name] = int(seed) if str(seed).isdigit() else seed
+        elif hasattr(model, name):
+            scenario[name] = getattr(model, name)
+    return scenario
+
+def run_model(n_steps, **model_kwargs):
+    """Build a model with the given hyperparameters and run it for n_steps"""
+    model = SupplyChainModel(**model_kwargs)
+    model.run(n_steps)
+    return model
+
+# ======================
+# Replications
+# ======================
+def replication_seeds(seed, n_replications):
+    #independent streams for every replication, derived from a single seed, so
+    #that the whole ensemble is reproducible
+    children = np.random.SeedSequence(seed).spawn(n_replications)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+def run_scenario(scenario, n_steps):
+    """Summary of a single scenario (a dictionary of hyperparameters)"""
+    return summarize(run_model(n_steps, **scenario))
+
+def _run_summary(job):
+    #top level function, so that it can be sent to the worker processes
+    n_steps, scenario = job
+    return run_scenario(scenario, n_steps)
+
+def run_scenarios(scenarios, n_steps, n_workers=None, service=None, user="runner"):
+    """Run every scenario (a dictionary of hyperparameters, seed included) for
+    n_steps and return the list of their summaries, in the same order.
+    With the url of a simulation service (see service.py) the scenarios are
+    submitted to it, instead of being computed in this process"""
+    if service is not None:
+        from service import ServiceClient #only needed with a service
+        return ServiceClient(service).run(scenarios, n_steps, user=user)
+
+    jobs = [(n_steps, scenario) for scenario in scenarios]
+
+    #with a single worker we avoid the overhead of the processes
+    if n_workers == 1:
+        return [_run_summary(job) for job in jobs]
+
+    n_workers = n_workers or os.cpu_count()
+    #scenarios are sent in batches, to reduce the inter-process traffic
+    chunksize = max(1, len(jobs) // (4 * n_workers))
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(_run_summary, jobs, chunksize=chunksize))
+
+def run_replications(n_replications, n_steps, seed=None, n_workers=None, service=None,
+                     user="runner", **model_kwargs):
+    """Run n_replications independent replications of the same scenario and
+    return the list of their summaries"""
+    seeds = replication_seeds(seed, n_replications)
+    return run_scenarios([{**model_kwargs, "seed": s} for s in seeds], n_steps, n_workers,
+                         service=service, user=user)
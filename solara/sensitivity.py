@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 11:34:51 2026
+
+@author: Francesco
+"""
+
+"""
+Global sensitivity analysis of the SupplyChainModel.
+
+The ranges of the hyperparameters are the ones of the sliders of the dashboard
+(params.py), so that the analysis explores exactly the scenarios a user can
+build by hand. Two methods are available:
+    • Morris (elementary effects), cheap, good for screening;
+    • Sobol (Saltelli design), first and total order indices.
+
+Every point of a design is rounded to the step of its slider and the results
+are cached, so that points shared by different designs (or by different runs,
+if a cache file is given) are simulated only once. The new points of a design
+are simulated in a single parallel batch with the headless runner.
+"""
+
+import os #to check the cache file
+import json #for the cache file
+import numpy as np #numerical computing library
+from mesa.visualization import Slider #to recognise the sliders
+from params import model_params #ranges of the hyperparameters
+from runner import run_scenarios, replication_seeds #parallel simulations
+
+#outputs of the summary of the runner that are analysed
+OUTPUTS = ("total_cost", "stockout_cost", "times_stockout")
+
+def parameter_ranges(names=None):
+    """Sliders of the dashboard, i.e.: the ranges of the hyperparameters"""
+    return {
+        name: param for name, param in model_params.items()
+        if isinstance(param, Slider) and (names is None or name in names)
+    }
+
+
+class SensitivityAnalysis:
+    """Morris and Sobol analyses over the ranges of the dashboard sliders,
+    sharing a single cache of simulated points"""
+
+    def __init__(
+        self,
+        names=None, #hyperparameters to analyse, default all the sliders
+        n_steps=365, #temporal horizon of every simulation
+        n_seeds=4, #replications averaged for every point
+        seed=42, #reproducibility, also of the designs
+        n_workers=None, #parallel processes, default all the cores
+        outputs=OUTPUTS,
+        cache_path=None, #file where the simulated points are kept
+        **fixed, #other hyperparameters kept constant (e.g.: order_policy)
+    ):
+        self.sliders = parameter_ranges(names)
+        self.names = list(self.sliders)
+        self.n_steps = n_steps
+        self.n_workers = n_workers
+        self.outputs = tuple(outputs)
+        self.fixed = fixed
+        self.rng = np.random.default_rng(seed)
+        #the same seeds are used for every point (common random numbers), so
+        #that the differences between points are not hidden by the noise
+        self.seeds = replication_seeds(seed, n_seeds)
+        self.cache = {}
+        self.cache_path = cache_path
+        self._load_cache()
+
+    # ======================
+    # Points & cache
+    # ======================
+    def to_values(self, u):
+        """From a point of the unit hypercube to the values of the sliders,
+        rounded to their step"""
+        values = []
+        for name, x in zip(self.names, u):
+            s = self.sliders[name]
+            x = s.min + x * (s.max - s.min)
+            x = s.min + round((x - s.min) / s.step) * s.step
+            x = min(max(x, s.min), s.max)
+            values.append(round(float(x), 10) if s.is_float_slider else int(round(x)))
+        return tuple(values)
+
+    def to_unit(self, values):
+        #inverse of to_values, used for the actual steps of the Morris design
+        return np.array([(x - self.sliders[n].min) / (self.sliders[n].max - self.sliders[n].min)
+                         for n, x in zip(self.names, values)])
+
+    def evaluate(self, points):
+        """Outputs (n_points x n_outputs) for points of the unit hypercube,
+        only the points not in the cache are simulated"""
+        values = [self.to_values(u) for u in points]
+        missing = list(dict.fromkeys(v for v in values if v not in self.cache))
+
+        if missing:
+            scenarios = [{**self.fixed, **dict(zip(self.names, v)), "seed": s}
+                         for v in missing for s in self.seeds]
+            summaries = run_scenarios(scenarios, self.n_steps, self.n_workers)
+            n = len(self.seeds)
+            for i, v in enumerate(missing):
+                block = summaries[i*n:(i + 1)*n]
+                self.cache[v] = [float(np.mean([r[o] for r in block])) for o in self.outputs]
+            self._save_cache()
+
+        return np.array([self.cache[v] for v in values])
+
+    def _signature(self):
+        #a cache is valid only for the same setting of the simulations
+        return json.dumps([self.names, self.n_steps, self.seeds, self.outputs,
+                           sorted(self.fixed.items())], default=str)
+
+    def _load_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path) as f:
+            stored = json.load(f)
+        if stored["signature"] == self._signature():
+            self.cache = {tuple(v): out for v, out in stored["points"]}
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        with open(self.cache_path, "w") as f:
+            json.dump({"signature": self._signature(),
+                       "points": [[list(v), out] for v, out in self.cache.items()]}, f)
+
+    # ======================
+    # Morris
+    # ======================
+    def morris(self, r=20, levels=4, n_bootstrap=1000):
+        """Elementary effects over r trajectories of a grid with the given
+        number of levels. For every output and hyperparameter returns mu,
+        mu_star (mean absolute effect), sigma and the 95% bootstrap interval
+        of mu_star"""
+        d = len(self.names)
+        delta = levels / (2 * (levels - 1))
+        grid = np.arange(levels) / (levels - 1)
+
+        #each trajectory moves one hyperparameter at a time, in random order
+        trajectories = []
+        for _ in range(r):
+            x = self.rng.choice(grid, size=d)
+            path = [x.copy()]
+            for i in self.rng.permutation(d):
+                x[i] = x[i] + delta if x[i] + delta <= 1 else x[i] - delta
+                path.append(x.copy())
+            trajectories.append(path)
+        points = np.array([x for path in trajectories for x in path])
+        y = self.evaluate(points).reshape(r, d + 1, len(self.outputs))
+
+        #elementary effects, divided by the actual (rounded) step
+        effects = np.full((r, d, len(self.outputs)), np.nan)
+        for t, path in enumerate(trajectories):
+            units = [self.to_unit(self.to_values(x)) for x in path]
+            for j in range(d):
+                step = units[j + 1] - units[j]
+                i = int(np.argmax(np.abs(path[j + 1] - path[j])))
+                if step[i] != 0:
+                    effects[t, i] = (y[t, j + 1] - y[t, j]) / step[i]
+
+        mu_star = np.nanmean(np.abs(effects), axis=0)
+        boot = np.empty((n_bootstrap, d, len(self.outputs)))
+        for b in range(n_bootstrap):
+            sample = effects[self.rng.integers(0, r, size=r)]
+            boot[b] = np.nanmean(np.abs(sample), axis=0)
+        low, high = np.nanpercentile(boot, [2.5, 97.5], axis=0)
+
+        return {
+            o: {
+                name: {
+                    "mu": float(np.nanmean(effects[:, i, k])),
+                    "mu_star": float(mu_star[i, k]),
+                    "sigma": float(np.nanstd(effects[:, i, k])),
+                    "mu_star_conf": (float(low[i, k]), float(high[i, k])),
+                }
+                for i, name in enumerate(self.names)
+            }
+            for k, o in enumerate(self.outputs)
+        }
+
+    # ======================
+    # Sobol
+    # ======================
+    def sobol(self, n=128, n_bootstrap=1000):
+        """First (S1) and total (ST) order Sobol indices with a Saltelli
+        design of n*(d+2) points, with the 95% bootstrap intervals"""
+        d = len(self.names)
+        A = self.rng.random((n, d))
+        B = self.rng.random((n, d))
+        AB = np.repeat(A[None], d, axis=0)
+        for i in range(d):
+            AB[i, :, i] = B[:, i]
+
+        #the whole design is simulated in a single batch
+        y = self.evaluate(np.concatenate([A, B, AB.reshape(n * d, d)]))
+        fA, fB = y[:n], y[n:2*n]
+        fAB = y[2*n:].reshape(d, n, len(self.outputs))
+
+        def indices(rows):
+            var = np.var(np.concatenate([fA[rows], fB[rows]]), axis=0)
+            var[var == 0] = np.nan
+            #Saltelli (2010) for S1, Jansen for ST
+            S1 = np.mean(fB[rows] * (fAB[:, rows] - fA[rows]), axis=1) / var
+            ST = 0.5 * np.mean((fA[rows] - fAB[:, rows]) ** 2, axis=1) / var
+            return S1, ST
+
+        S1, ST = indices(np.arange(n))
+        boot_S1 = np.empty((n_bootstrap, d, len(self.outputs)))
+        boot_ST = np.empty((n_bootstrap, d, len(self.outputs)))
+        for b in range(n_bootstrap):
+            boot_S1[b], boot_ST[b] = indices(self.rng.integers(0, n, size=n))
+        S1_low, S1_high = np.nanpercentile(boot_S1, [2.5, 97.5], axis=0)
+        ST_low, ST_high = np.nanpercentile(boot_ST, [2.5, 97.5], axis=0)
+
+        return {
+            o: {
+                name: {
+                    "S1": float(S1[i, k]),
+                    "S1_conf": (float(S1_low[i, k]), float(S1_high[i, k])),
+                    "ST": float(ST[i, k]),
+                    "ST_conf": (float(ST_low[i, k]), float(ST_high[i, k])),
+                }
+                for i, name in enumerate(self.names)
+            }
+            for k, o in enumerate(self.outputs)
+        }
+
+
+def report(results):
+    """Text table of the results of morris() or sobol()"""
+    lines = []
+    for output, table in results.items():
+        lines.append(f"### {output}")
+        for name, values in table.items():
+            cells = []
+            for key, value in values.items():
+                if isinstance(value, tuple):
+                    cells.append(f"{key}=[{value[0]:.3g}, {value[1]:.3g}]")
+                else:
+                    cells.append(f"{key}={value:.3g}")
+            lines.append(f"- {name}: " + ", ".join(cells))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    #screening of all the sliders, then Sobol indices reusing the same cache
+    analysis = SensitivityAnalysis(order_policy="FRP", cache_path="sensitivity_cache.json")
+    print(report(analysis.morris()))
+    print(report(analysis.sobol()))
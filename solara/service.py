@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:41:12 2026
+
+@author: Francesco
+"""
+
+"""
+Local simulation service.
+
+A small asyncio HTTP/JSON server that runs the simulations of several users
+(the dashboards, the notebooks, the headless runner) on a single shared pool
+of processes, instead of each of them competing for the cores.
+
+    • identical jobs are de-duplicated: they get the same id and are computed
+      only once (only the seeded ones, an unseeded scenario is a new random
+      run every time it is submitted);
+    • the scenarios of the jobs are scheduled round-robin between the users,
+      so that a large sweep does not starve the others;
+    • the progress and the results are streamed back as JSON lines.
+
+API:
+    POST /jobs               submit a job, returns {"id": ..., "deduplicated": ...}
+    GET  /jobs               status of all the jobs
+    GET  /jobs/<id>          status (and result, when done) of a job
+    GET  /jobs/<id>/events   stream of the status of a job, one JSON per line
+
+A job is a JSON object with:
+    "user"            who submits it, for the fairness of the scheduling;
+    "kind"            "run" or "sweep", only informative;
+    "n_steps"         temporal horizon of every simulation;
+    "scenarios"       explicit list of dictionaries of hyperparameters, or:
+    "params"          hyperparameters common to all the scenarios,
+    "grid"            {name: [values]} for a sweep (cartesian product),
+    "n_replications"  replications of every point (default 1),
+    "seed"            seed of the replications.
+
+Run it from inside the solara folder with:
+    python service.py --port 8766 --workers 4
+"""
+
+import os #for the number of cores
+import json #for the requests and the responses
+import asyncio #for the server and the scheduling
+import uuid #for the id of the unseeded jobs
+import hashlib #for the id of the jobs
+import argparse #for the command line
+import itertools #for the cartesian product of the sweeps
+from collections import OrderedDict, deque #for the queues of the users
+from concurrent.futures import ProcessPoolExecutor #shared pool of workers
+import numpy as np #for the NumPy values of the scenarios
+from urllib.request import Request, urlopen #for the client
+from runner import run_scenario, replication_seeds #the actual simulations
+
+# ======================
+# Jobs
+# ======================
+def expand(request):
+    """Scenarios of a job: the explicit list, or the cartesian product of the
+    grid replicated n_replications times"""
+    if "scenarios" in request:
+        return [dict(s) for s in request["scenarios"]]
+    params = request.get("params", {})
+    grid = request.get("grid", {})
+    n_replications = request.get("n_replications", 1)
+    seeds = replication_seeds(request.get("seed"), n_replications)
+    points = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    return [{**params, **point, "seed": s} for point in points for s in seeds]
+
+def job_key(n_steps, scenarios):
+    """Id of a job: two requests are the same job if they run the same seeded
+    scenarios; with any unseeded scenario the job is a new one (None)"""
+    if any(s.get("seed") is None for s in scenarios):
+        return None
+    text = json.dumps([n_steps, scenarios], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+def to_json(value):
+    """A scenario (or any payload) with plain JSON values: the NumPy scalars
+    and arrays become numbers and lists, the tuples lists"""
+    if isinstance(value, dict):
+        return {str(k): to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return to_json(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"{type(value).__name__} cannot be sent to the service: {value!r}")
+
+
+class Job:
+    """A list of scenarios to simulate, with its progress and listeners"""
+
+    def __init__(self, job_id, user, kind, n_steps, scenarios):
+        self.id = job_id
+        self.user = user
+        self.kind = kind
+        self.n_steps = n_steps
+        self.scenarios = scenarios
+        self.results = [None] * len(scenarios)
+        self.done = 0
+        self.status = "queued" #'queued', 'running', 'done', 'failed'
+        self.error = None
+        self.listeners = [] #queues of the clients streaming the events
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def snapshot(self, with_result=True):
+        state = {
+            "id": self.id,
+            "user": self.user,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": len(self.scenarios),
+        }
+        if self.error is not None:
+            state["error"] = self.error
+        if with_result and self.status == "done":
+            state["scenarios"] = self.scenarios
+            state["result"] = self.results
+        return state
+
+    def notify(self):
+        for queue in self.listeners:
+            queue.put_nowait(self.snapshot())
+
+
+# ======================
+# Service
+# ======================
+class SimulationService:
+    """Job queue with a shared pool of processes and fair scheduling"""
+
+    def __init__(self, n_workers=None, max_jobs=1000):
+        self.n_workers = n_workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers=self.n_workers)
+        self.max_jobs = max_jobs #finished jobs kept in memory
+        self.jobs = OrderedDict() #id -> Job
+        self.queues = OrderedDict() #user -> deque of (job, index of the scenario)
+        self.in_flight = 0
+        self.wakeup = None
+
+    def submit(self, request):
+        """Register a job, or return the identical one already submitted"""
+        n_steps = int(request["n_steps"])
+        scenarios = expand(request)
+        job_id = job_key(n_steps, scenarios)
+        if job_id is None:
+            #unseeded: never the same as another job
+            job_id = uuid.uuid4().hex[:16]
+
+        job = self.jobs.get(job_id)
+        #a failed job can be submitted again
+        if job is not None and job.status != "failed":
+            return job, True
+
+        job = Job(job_id, request.get("user", "anonymous"), request.get("kind", "run"),
+                  n_steps, scenarios)
+        self.jobs[job_id] = job
+        self.jobs.move_to_end(job_id)
+        queue = self.queues.setdefault(job.user, deque())
+        queue.extend((job, i) for i in range(len(scenarios)))
+        self._evict()
+        self.wakeup.set()
+        return job, False
+
+    def _evict(self):
+        #the oldest finished jobs are forgotten, to bound the memory
+        finished = [j for j in self.jobs.values() if j.finished]
+        for job in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job.id]
+
+    async def _scheduler(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.in_flight < self.n_workers and self.queues:
+                #round-robin: one scenario of the first user, who then goes
+                #at the end of the line
+                user, queue = self.queues.popitem(last=False)
+                job, i = queue.popleft()
+                if queue:
+                    self.queues[user] = queue
+                if job.status == "failed":
+                    continue
+                self.in_flight += 1
+                asyncio.ensure_future(self._run(job, i))
+
+    async def _run(self, job, i):
+        loop = asyncio.get_running_loop()
+        if job.finished:
+            #a sibling scenario failed after this one was scheduled
+            self.in_flight -= 1
+            self.wakeup.set()
+            return
+        if job.status == "queued":
+            job.status = "running"
+        try:
+            result = await loop.run_in_executor(self.pool, run_scenario,
+                                                job.scenarios[i], job.n_steps)
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+        else:
+            if job.status != "failed":
+                job.results[i] = result
+                job.done += 1
+                if job.done == len(job.scenarios):
+                    job.status = "done"
+        finally:
+            self.in_flight -= 1
+            self.wakeup.set()
+            job.notify()
+
+    # ======================
+    # HTTP
+    # ======================
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode()
+            method, path, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, value = line.decode().split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            await self._route(method, path.rstrip("/"), body, writer)
+        except Exception as e:
+            self._send(writer, 400, {"error": f"{type(e).__name__}: {e}"})
+        finally:
+            await writer.drain()
+            writer.close()
+
+    async def _route(self, method, path, body, writer):
+        parts = path.strip("/").split("/")
+        if method == "POST" and parts == ["jobs"]:
+            job, deduplicated = self.submit(json.loads(body))
+            self._send(writer, 200, {"id": job.id, "deduplicated": deduplicated})
+        elif method == "GET" and parts == ["jobs"]:
+            self._send(writer, 200, [j.snapshot(with_result=False) for j in self.jobs.values()])
+        elif method == "GET" and len(parts) >= 2 and parts[0] == "jobs" and parts[1] in self.jobs:
+            job = self.jobs[parts[1]]
+            if len(parts) == 3 and parts[2] == "events":
+                await self._stream(job, writer)
+            else:
+                self._send(writer, 200, job.snapshot())
+        else:
+            self._send(writer, 404, {"error": f"{method} {path} not found"})
+
+    def _send(self, writer, status, payload):
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data
+        )
+
+    async def _stream(self, job, writer):
+        #chunked response, one JSON line for every change of the job
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+
+        def chunk(state):
+            data = (json.dumps(state) + "\n").encode()
+            writer.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+        queue = asyncio.Queue()
+        job.listeners.append(queue)
+        try:
+            state = job.snapshot()
+            chunk(state)
+            while state["status"] not in ("done", "failed"):
+                await writer.drain()
+                state = await queue.get()
+                chunk(state)
+            writer.write(b"0\r\n\r\n")
+        finally:
+            job.listeners.remove(queue)
+
+    async def serve(self, host="127.0.0.1", port=8766):
+        self.wakeup = asyncio.Event()
+        server = await asyncio.start_server(self._handle, host, port)
+        scheduler = asyncio.ensure_future(self._scheduler())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            scheduler.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+# ======================
+# Client
+# ======================
+class ServiceClient:
+    """Client of the simulation service, used by the headless runner and by
+    the dashboard"""
+
+    def __init__(self, url="http://127.0.0.1:8766"):
+        self.url = url.rstrip("/")
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(to_json(payload)).encode()
+        request = Request(self.url + path, data=data,
+                          headers={"Content-Type": "application/json"})
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+    def submit(self, n_steps, user="anonymous", kind="run", **job):
+        """Submit a job (see the API above) and return its id"""
+        return self._request("/jobs", {"n_steps": n_steps, "user": user, "kind": kind, **job})["id"]
+
+    def status(self, job_id):
+        return self._request(f"/jobs/{job_id}")
+
+    def events(self, job_id):
+        """Generator of the states of a job, until it is finished"""
+        with urlopen(f"{self.url}/jobs/{job_id}/events") as response:
+            for line in response:
+                yield json.loads(line)
+
+    def wait(self, job_id, on_progress=None):
+        """Block until the job is finished and return its final state"""
+        for state in self.events(job_id):
+            if on_progress is not None:
+                on_progress(state["done"], state["total"])
+        if state["status"] == "failed":
+            raise RuntimeError(f"job {job_id} failed: {state.get('error')}")
+        return state
+
+    def run(self, scenarios, n_steps, user="anonymous", on_progress=None):
+        """Summaries of a list of scenarios, like runner.run_scenarios"""
+        job_id = self.submit(n_steps, user=user, kind="sweep", scenarios=scenarios)
+        return self.wait(job_id, on_progress)["result"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local simulation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(SimulationService(args.workers).serve(args.host, args.port))
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 14:37:52 2026
+
+@author: Francesco
+"""
+
+"""
+Per-session models of the dashboard, from a bounded pool, and a headless load
+test to size the server.
+
+Every browser session gets its own SupplyChainModel from a ModelPool, so the
+analysts never step or reset each other's model. The pool holds at most
+max_models models: a session that closes gives its model back, and the next
+session reuses it (SupplyChainModel.reset, which keeps the allocated columns
+of the datacollector) instead of building a new one; when all of them are in
+use, a new session waits for one to be released. A session closed before it
+gets its model (the page is closed while it waits, or while its model is
+built) sets the cancel event given to acquire: the model, if any, goes back
+to the pool instead of being lost.
+
+The stepping does not run on the thread that renders the pages: it is
+submitted to a small pool of worker threads shared by all the sessions
+(ModelPool.step returns a future), with a lock per session so that a step
+and a reset of the same model never overlap.
+
+The load test simulates n_sessions analysts, each one in its own thread,
+stepping their model and moving the sliders (a reset with a new value) with
+some think time in between, and reports the percentiles of the latency of
+every action, as seen by the user (waiting time in the queue included):
+
+    python sessions.py --sessions 32 --max-models 16 --duration 30
+"""
+
+import os #for the number of cores
+import time #for the latencies
+import random #for the actions of the simulated users
+import argparse #command line of the load test
+import threading #for the sessions and their locks
+import numpy as np #for the percentiles
+from concurrent.futures import ThreadPoolExecutor #workers for the stepping
+from model import SupplyChainModel #import of the model
+
+#seconds between two checks of the cancellation of a session waiting for a model
+POLL = 0.1
+
+class Session:
+    """Model of a browser session"""
+
+    def __init__(self, session_id, model):
+        self.id = session_id
+        self.model = model
+        self.lock = threading.Lock() #one step or reset at a time
+
+
+class ModelPool:
+    """Bounded pool of reusable models, one per session"""
+
+    def __init__(
+        self,
+        max_models=16, #models in memory at most
+        step_workers=None, #threads for the stepping, by default the cores
+        model_class=SupplyChainModel,
+    ):
+        self.max_models = max_models
+        self.model_class = model_class
+        self.executor = ThreadPoolExecutor(max_workers=step_workers or os.cpu_count())
+        self.sessions = {} #{session id: Session}
+        self._idle = [] #released models, ready to be reused
+        self._created = 0
+        self._available = threading.Condition()
+
+    def _wait(self, timeout, cancel):
+        #wait (holding the lock) for a free model: False if the session is
+        #cancelled in the meantime, TimeoutError after timeout seconds
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not (self._idle or self._created < self.max_models):
+            if cancel is not None and cancel.is_set():
+                return False
+            left = None if deadline is None else deadline - time.monotonic()
+            if left is not None and left <= 0:
+                raise TimeoutError(f"all the {self.max_models} models are in use")
+            #a cancellation does not notify, it is checked every POLL seconds
+            self._available.wait(left if cancel is None else min(POLL, left or POLL))
+        return cancel is None or not cancel.is_set()
+
+    def acquire(self, session_id, timeout=None, cancel=None, **params):
+        """Model of a new session, built with the given hyperparameters; waits
+        up to timeout seconds (forever with None) when all the models are in
+        use, then raises TimeoutError. cancel is an optional threading.Event,
+        set when the session is closed: if it is set before the session gets
+        its model, the model goes back to the pool and None is returned"""
+        with self._available:
+            if not self._wait(timeout, cancel):
+                return None
+            model = self._idle.pop() if self._idle else None
+            if model is None:
+                self._created += 1
+        #built or reset outside the lock, the other sessions do not wait for it
+        try:
+            if model is None:
+                model = self.model_class(**params)
+            else:
+                model.reset(**params)
+        except BaseException:
+            with self._available:
+                if model is None:
+                    self._created -= 1 #not built, its place is free again
+                else:
+                    self._idle.append(model) #a failed reset leaves it as it was
+                self._available.notify()
+            raise
+        with self._available:
+            #under the lock: either the session is registered before release
+            #looks for it, or it was cancelled and the model goes back here
+            if cancel is not None and cancel.is_set():
+                self._idle.append(model)
+                self._available.notify()
+                return None
+            self.sessions[session_id] = Session(session_id, model)
+        return model
+
+    def release(self, session_id):
+        """The session is closed, its model goes back to the pool (a session
+        still acquiring its model is cancelled through its cancel event)"""
+        with self._available:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                return
+            self._idle.append(session.model)
+            self._available.notify()
+
+    def _locked(self, session_id, action, *args, **kwargs):
+        session = self.sessions[session_id]
+        with session.lock:
+            return action(session.model, *args, **kwargs)
+
+    def step(self, session_id, n_steps=1):
+        """Run n_steps steps of the model of a session on a worker thread and
+        return the future of the model"""
+        def run(model):
+            model.run(n_steps)
+            return model
+        return self.executor.submit(self._locked, session_id, run)
+
+    def reset(self, session_id, **params):
+        """Reset the model of a session with new hyperparameters (e.g.: a
+        slider moved), on a worker thread; returns the future of the model"""
+        def reset(model):
+            model.reset(**params)
+            return model
+        return self.executor.submit(self._locked, session_id, reset)
+
+    def stats(self):
+        with self._available:
+            return {"sessions": len(self.sessions), "idle": len(self._idle), "models": self._created}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+# ======================
+# Load test
+# ======================
+def render(model):
+    #what the dashboard reads at every update: the series of the plots, the
+    #costs and the KPIs
+    data = model.datacollector.get_model_vars_dataframe()
+    data[["stockout", "holding", "transportation", "lead_time"]].to_numpy()
+    model.compute_kpis()
+    if model.warmup not in (None, "None"):
+        model.compute_costs()
+
+def slider_values(model_params):
+    """Values of the numeric sliders: {name: array}"""
+    values = {}
+    for name, param in model_params.items():
+        if hasattr(param, "min") and hasattr(param, "max"):
+            dtype = float if getattr(param, "is_float_slider", True) else int
+            values[name] = np.arange(param.min, param.max + param.step / 2, param.step).astype(dtype)
+    return values
+
+def simulated_session(pool, session_id, stop, latencies, sliders, defaults, render_interval,
+                      max_steps, think_time, p_slider, acquire_timeout, seed):
+    #a user: open the dashboard, then step and move the sliders until stop
+    rnd = random.Random(seed)
+    params = dict(defaults)
+    t = time.perf_counter()
+    try:
+        model = pool.acquire(session_id, timeout=acquire_timeout, **params)
+    except TimeoutError:
+        latencies["rejected"].append(time.perf_counter() - t)
+        return
+    latencies["open"].append(time.perf_counter() - t)
+    try:
+        while not stop.is_set():
+            if rnd.random() < p_slider or model.steps >= max_steps:
+                name = rnd.choice(list(sliders))
+                params[name] = sliders[name][rnd.randrange(len(sliders[name]))].item()
+                action, future = "slider", pool.reset(session_id, **params)
+            else:
+                action, future = "step", pool.step(session_id, render_interval)
+            t = time.perf_counter()
+            model = future.result()
+            render(model)
+            latencies[action].append(time.perf_counter() - t)
+            time.sleep(rnd.expovariate(1 / think_time) if think_time > 0 else 0)
+    finally:
+        pool.release(session_id)
+
+def load_test(n_sessions=16, duration=10.0, max_models=16, step_workers=None, render_interval=1,
+              max_steps=365, think_time=0.1, p_slider=0.05, acquire_timeout=None, seed=42,
+              model_params=None, **defaults):
+    """Simulate n_sessions users of the dashboard for duration seconds and
+    return the latencies of every action (open, step, slider, rejected); a
+    pool smaller than n_sessions makes the extra users wait for a model, or
+    rejects them after acquire_timeout seconds"""
+    if model_params is None:
+        from params import model_params #the sliders of the dashboard
+    sliders = slider_values(model_params)
+    defaults = {"seed": 42, **defaults}
+    pool = ModelPool(max_models, step_workers)
+    latencies = {"open": [], "step": [], "slider": [], "rejected": []}
+    stop = threading.Event()
+    threads = [threading.Thread(target=simulated_session, daemon=True, args=(
+                   pool, i, stop, latencies, sliders, defaults, render_interval, max_steps,
+                   think_time, p_slider, acquire_timeout, seed + i))
+               for i in range(n_sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+    return {"elapsed": elapsed, **{name: np.array(values) for name, values in latencies.items()}}
+
+def latency_report(latencies, percentiles=(50, 90, 95, 99)):
+    """Count, rate and percentiles (ms) of the latency of every action"""
+    report = {}
+    for action in ("open", "step", "slider", "rejected"):
+        values = latencies[action]
+        if len(values) == 0:
+            continue
+        report[action] = {"count": len(values), "per_second": len(values) / latencies["elapsed"],
+                          **{f"p{q}": float(np.percentile(values, q)) * 1000 for q in percentiles},
+                          "max": float(values.max()) * 1000}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the sessions of the dashboard")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--max-models", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--render-interval", type=int, default=1, help="steps per click")
+    parser.add_argument("--think-time", type=float, default=0.1, help="mean seconds between actions")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds a new session waits for a model")
+    args = parser.parse_args()
+    latencies = load_test(args.sessions, args.duration, args.max_models, args.workers,
+                          args.render_interval, think_time=args.think_time,
+                          acquire_timeout=args.timeout)
+    print(f"{args.sessions} sessions, {args.max_models} models, {latencies['elapsed']:.1f} s")
+    for action, row in latency_report(latencies).items():
+        print(f"{action:>8}: " + ", ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}"
+                                          for k, v in row.items()))
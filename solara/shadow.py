@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 15:22:08 2026
+
+@author: Francesco
+"""
+
+"""
+Shadow-policy evaluation.
+
+A single demand path drives several independent inventory/fleet states
+('lanes'), one per policy, in the same step loop. The demand is drawn once,
+the moving average forecast and the output of the factory are computed once
+per step, and all the lanes see exactly the same demand: a single run gives
+the costs and the KPIs of every policy, without noise between the runs
+(common random numbers).
+
+The lanes are not models: their state is batched in lists, one item per lane
+(and one per truck), and a step of the ShadowPolicyModel advances all of them
+in one loop, with the dynamics of SupplyChainModel.step in the same order
+(factory, customer, trucks one after the other) and the sums accumulated in
+the same order, so every lane is exactly the stand-alone model of its policy
+with the same seed (conformance.py checks it step by step). Without the agents
+and the datacollector of Mesa, three lanes cost less than a single model. With
+a few lanes and a few trucks, plain floats are faster than NumPy arrays, whose
+cost per call exceeds the arithmetic.
+
+When the run is over, lanes gives a view of every lane with the interface of
+the SupplyChainModel read by runner.summarize and by the conformance traces
+(histories, cumulative costs, datacollector, compute_kpis, compute_costs).
+"""
+
+import math #for the safety stock
+import inspect #for the defaults of the hyperparameters
+import numpy as np #numerical computing library
+import mesa #Python agent based modeling library
+from model import SupplyChainModel #hyperparameters and kpis of the lanes
+from agents import demand_generator, moving_average #shared demand and forecast
+from dispatch import fleet_capacities, first_fit_decreasing #orders on the trucks
+from production import ProductionSchedule #stochastic production of the factory
+from collector import ColumnarCollector #columns of the lanes
+from vector_env import IDLE, GOING, RETURNING #truck states
+from runner import summarize #costs and kpis of the lanes
+
+#values recorded for every lane at the end of every step, the columns of the
+#datacollector of the SupplyChainModel
+FIELDS = ("holding", "stockout", "times_stockout", "transportation", "lead_time", "traffic",
+          "customer_warehouse", "factory_warehouse", "backorder")
+
+#hyperparameters of the SupplyChainModel, with their defaults
+DEFAULTS = {name: parameter.default
+            for name, parameter in inspect.signature(SupplyChainModel.__init__).parameters.items()
+            if parameter.default is not inspect.Parameter.empty}
+
+
+class PolicyLane:
+    """Lane of a policy, once stepped: the attributes and the methods of the
+    SupplyChainModel that read its results"""
+
+    compute_kpis = SupplyChainModel.compute_kpis
+    compute_costs = SupplyChainModel.compute_costs
+    warmup_length = SupplyChainModel.warmup_length
+
+    def __init__(self, shadow, i):
+        self.order_policy = shadow.policies[i]
+        self.warmup = shadow.warmup
+        self.steps = shadow.steps
+        records = np.array(shadow._rows[i], dtype=float).reshape(-1, len(FIELDS))
+        columns = {name: records[:, j] for j, name in enumerate(FIELDS)}
+        self.customer = Stock(shadow.customer_warehouse[i], list(shadow.demand_history))
+        self.factory = Stock(shadow.factory_warehouse[i])
+        self.hold = shadow.hold[i]
+        self.stockout_cost = shadow.stockout_cost[i]
+        self.times_stockout = shadow.times_stockout[i]
+        self.transportation = shadow.transportation[i]
+        self.customer_warehouse_history = columns["customer_warehouse"].tolist()
+        self.traffic_history = columns["traffic"].tolist()
+        self.lead_time_history = columns["lead_time"].tolist()
+        #the rows of the stand-alone model (sampled as in its datacollector)
+        columns["times_stockout"] = columns["times_stockout"].astype(np.int64)
+        self.datacollector = ColumnarCollector({name: name for name in FIELDS}, every=shadow.collect_every,
+                                               on_change=shadow.collect_on_change,
+                                               dtypes={"times_stockout": np.int64})
+        if self.steps > 0:
+            self.datacollector.collect_block(self, 1, self.steps, columns)
+
+
+class Stock:
+    """Warehouse (and demand history) of the customer or the factory of a lane"""
+
+    def __init__(self, warehouse, demand_history=None):
+        self.warehouse = warehouse
+        self.demand_history = demand_history
+
+
+class ShadowPolicyModel(mesa.Model):
+    """One demand path, one lane (batched state) per ordering policy"""
+
+    def __init__(
+        self,
+        seed=None, #reproducibility, the demand is drawn from this model
+        policies=("FRP", "ARP", "FBR"), #one lane per policy
+        demand_source=None, #external demand (e.g.: replayed), instead of the synthetic one
+        **params, #other hyperparameters of the SupplyChainModel, the same for all the lanes
+    ):
+        super().__init__(seed=seed)
+        unknown = params.keys() - DEFAULTS.keys() - {"order_policy"}
+        if unknown:
+            raise TypeError(f"unknown hyperparameters: {', '.join(sorted(unknown))}")
+        params = {**DEFAULTS, **params}
+        for name in ("demand_type", "mu", "sigma", "alpha", "beta", "L_0", "k", "kernel_size",
+                     "truck_movement", "p", "h", "c", "warmup", "collect_every", "collect_on_change"):
+            setattr(self, name, params[name])
+        self.policies = tuple(policies)
+        #a stateful source is copied, as in the SupplyChainModel
+        spawn = getattr(demand_source, "spawn", None)
+        self.demand_source = spawn() if spawn is not None else demand_source
+        self.demand_history = [] #shared by all the lanes
+        #the output of the factory, shared as well, from the same stream as
+        #in the stand-alone models
+        self.production = None
+        if params["mtbf"] is not None or params["production_cv"] > 0:
+            self.production = ProductionSchedule(self.rng.spawn(1)[0], self.mu, params["mtbf"],
+                                                 params["mttr"], params["weibull_k"], params["production_cv"])
+        self._forecast = any(policy != "FRP" for policy in self.policies)
+        self._frp_rop = self.mu*self.L_0 + self.k*self.sigma
+        self._safety_stock = self.k*self.sigma*math.sqrt(self.L_0)
+
+        #state of the lanes, one item each (and one per truck)
+        n = len(self.policies)
+        self.capacity = np.array(fleet_capacities(params["n_trucks"], params["truck_capacity"]), dtype=float)
+        self.n_trucks = len(self.capacity)
+        self._unlimited = bool(np.isinf(self.capacity).all())
+        self.customer_warehouse = [self.mu + self.sigma * self.k] * n
+        self.factory_warehouse = [5] * n
+        self.position = [[0] * self.n_trucks for _ in range(n)]
+        self.load = [[0] * self.n_trucks for _ in range(n)]
+        self.state = [[IDLE] * self.n_trucks for _ in range(n)]
+        self.n_busy = [0] * n
+        self.backorders = [[] for _ in range(n)] #with limited loads
+        self.hold = [0.0] * n
+        self.stockout_cost = [0.0] * n
+        self.times_stockout = [0] * n
+        self.transportation = [0.0] * n
+        self._rows = [[] for _ in range(n)] #FIELDS of every step
+
+    def _demand(self):
+        if self.demand_source is not None:
+            return self.demand_source.draw(self)
+        return demand_generator(self.mu, self.sigma, self.demand_type, self.rng)
+
+    def _dispatch(self, i, orders):
+        #the orders on the idle trucks of a lane, as Dispatcher.dispatch
+        state, load = self.state[i], self.load[i]
+        if self._unlimited:
+            #no backorders: an order goes on the first idle truck
+            j = state.index(IDLE)
+            state[j], load[j] = GOING, orders[0]
+            self.n_busy[i] += 1
+            return
+        idle = [j for j, s in enumerate(state) if s == IDLE]
+        shipments, self.backorders[i] = first_fit_decreasing(orders, self.capacity[idle])
+        for j, quantity in shipments:
+            state[idle[j]], load[idle[j]] = GOING, quantity
+        self.n_busy[i] += len(shipments)
+
+    def step(self):
+        #demand, forecast and output of the factory of the step, once
+        demand = self._demand()
+        self.demand_history.append(demand)
+        output = self.mu if self.production is None else self.production.at(self.steps)
+        if self._forecast:
+            D = moving_average(self.demand_history, self.kernel_size)
+            rop_forecast = D*self.L_0 + self._safety_stock
+        forward, back = self.truck_movement, self.beta * self.truck_movement
+        n_trucks = self.n_trucks
+
+        #every lane, with the dynamics of SupplyChainModel.step
+        for i, policy in enumerate(self.policies):
+            # ---- factory ----
+            self.factory_warehouse[i] += output
+
+            # ---- customer: the demand is served, then the order ----
+            w = self.customer_warehouse[i]
+            if w < demand:
+                self.times_stockout[i] += 1
+                self.stockout_cost[i] += self.p * (demand - w)
+                w = 0
+            else:
+                w -= demand
+            backorders = self.backorders[i]
+            position = w + sum(backorders)
+            if policy == "FRP":
+                rop, quantity = self._frp_rop, self.mu
+            elif policy == "ARP":
+                rop, quantity = rop_forecast, self.mu
+            else:
+                rop = rop_forecast
+                quantity = round(1.33 * rop - position)
+            orders = list(backorders)
+            #an order is taken if the factory has the stock and a truck can leave
+            if (position <= rop and self.factory_warehouse[i] >= quantity
+                    and self.n_busy[i] < n_trucks):
+                self.factory_warehouse[i] -= quantity
+                orders.append(quantity)
+            if orders:
+                self._dispatch(i, orders)
+
+            # ---- trucks, one after the other ----
+            state, position, load = self.state[i], self.position[i], self.load[i]
+            for j in range(n_trucks):
+                if state[j] == GOING:
+                    position[j] += forward
+                    L = self.L_0 + self.alpha*(self.n_busy[i] / n_trucks)
+                    if position[j] >= L:
+                        w += load[j]
+                        self.transportation[i] += self.c * load[j]
+                        load[j] = 0
+                        state[j] = RETURNING
+                        position[j] = L
+                elif state[j] == RETURNING:
+                    position[j] -= back
+                    if position[j] <= 0:
+                        position[j] = 0
+                        state[j] = IDLE
+                        self.n_busy[i] -= 1
+
+            # ---- end of the step: costs and kpis ----
+            self.customer_warehouse[i] = w
+            self.hold[i] += self.h * w
+            traffic = self.n_busy[i] / n_trucks
+            self._rows[i].append((self.hold[i], self.stockout_cost[i], self.times_stockout[i],
+                                  self.transportation[i], self.L_0 + self.alpha*traffic, traffic,
+                                  w, self.factory_warehouse[i], sum(self.backorders[i])))
+
+    @property
+    def lanes(self):
+        """View of every lane at the current step: {policy: PolicyLane}"""
+        return {policy: PolicyLane(self, i) for i, policy in enumerate(self.policies)}
+
+    def results(self):
+        """Costs and KPIs of every policy: {policy: summary}"""
+        return {policy: summarize(lane) for policy, lane in self.lanes.items()}
+
+
+def compare_policies(n_steps, seed=None, policies=("FRP", "ARP", "FBR"), **params):
+    """Run all the policies on the same demand path and return their summaries"""
+    model = ShadowPolicyModel(seed=seed, policies=policies, **params)
+    for _ in range(n_steps):
+        model.step()
+    return model.results()
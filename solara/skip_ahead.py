@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 14:02:39 2026
+
+@author: Francesco
+"""
+
+"""
+Adaptive skip-ahead stepping of the SupplyChainModel.
+
+A step is 'quiet' when no truck leaves, reaches the customer or comes back to
+the factory: the traffic, and so the lead time, stays the same and the state
+changes by simple sums. A truck leaves only when the customer orders (its
+warehouse at the ROP), or a backorder waits, while a truck is idle; with the
+whole fleet away the orders are refused and change nothing, and the
+stockouts are sums too (the unmet demand empties the warehouse, which stays
+empty until a delivery). So the quiet periods include the congested ones,
+when all the trucks are away and the customer runs out of stock.
+
+Given a block of demands drawn in advance with one call to the generator, the
+number of quiet steps before the next event is found with cumulative sums,
+and those steps are advanced at once: the holding and stockout costs, the
+warehouses, the positions of the trucks and the histories in closed form. The
+event step is then run normally, with its demand taken from the block.
+
+Whether a jump is worth a try is decided beforehand from the state alone
+(horizon): the steps before the first truck arrives or comes back and, with
+a truck idle, before the customer reaches its ROP at the average demand. When
+events come at every step (e.g.: the warehouse sits at the ROP) nothing is
+drawn in advance and the model is stepped as usual. Between two events of the
+fleet (a truck leaves, arrives or comes back, counted by the dispatcher) the
+warehouse of the customer only falls and the trucks keep their timing, so a
+jump ruled out stays ruled out until the next one. At every step run() only
+compares the warehouse with a fixed floor (order_floor: below it, with a
+truck idle, the customer is about to order) and the counter with the one of
+the last try, in O(1), and calls horizon when both allow a jump.
+
+The demands are drawn from the same stream and the sums are accumulated in
+the same order as step by step, so the run is exactly the one of the per-step
+model, only with far fewer iterations when little happens; benchmark()
+measures the gain:
+
+    python skip_ahead.py --steps 20000
+"""
+
+import math #for the safety stock
+import time #for the benchmark
+import argparse #command line of the benchmark
+import numpy as np #numerical computing library
+from agents import lead_time_updater #lead time of the quiet steps
+
+#a jump is tried when the next event looks at least MIN_JUMP steps away (a
+#jump costs about as much as a few steps), with blocks of at most MAX_BLOCK
+MIN_JUMP = 8
+MAX_BLOCK = 4096
+
+def can_skip(model):
+    #the moving average needs a full window
+    return len(model.customer.demand_history) + 1 >= model.kernel_size
+
+def mean_rop(model):
+    #ROP of the customer at the average demand
+    if model.order_policy == "FRP":
+        return model.mu*model.L_0 + model.k*model.sigma
+    return model.mu*model.L_0 + model.k*model.sigma*math.sqrt(model.L_0)
+
+def order_floor(model):
+    """Warehouse of the customer under which, with a truck idle, no jump is
+    tried: the horizon is less than MIN_JUMP steps"""
+    return mean_rop(model) + MIN_JUMP * max(model.mu, 1)
+
+def horizon(model):
+    """Rough number of quiet steps ahead, from the current state (nothing is
+    drawn): before the first truck arrives or comes back and, with a truck
+    idle, before the customer reaches its ROP at the average demand. Until
+    the next event of the fleet it can only decrease"""
+    trucks = model.trucks
+    n_busy = model.dispatcher.n_busy
+    steps = math.inf
+    if n_busy < len(trucks):
+        if model.dispatcher.backorders:
+            return 0
+        steps = (model.customer.warehouse - mean_rop(model)) / max(model.mu, 1)
+        if steps < MIN_JUMP:
+            return steps
+    L = lead_time_updater(model, n_busy / len(trucks))
+    back = model.beta * model.truck_movement
+    for truck in trucks:
+        if truck.state == "going":
+            steps = min(steps, (L - truck.position) / model.truck_movement)
+        elif truck.state == "returning":
+            steps = min(steps, truck.position / back)
+    return steps
+
+def reorder_points(model, demands):
+    """ROP of the customer at each step of the block, once the demand of the
+    step is known (the same formulas of Customer.frp/arp/fbr); with FRP it is
+    the same at every step, a scalar"""
+    if model.order_policy == "FRP":
+        return model.mu*model.L_0 + model.k*model.sigma
+    n = model.kernel_size
+    recent = model.customer.demand_history[len(model.customer.demand_history) - (n - 1):] if n > 1 else []
+    D = np.round(np.convolve(np.concatenate([recent, demands]), np.ones(n)/n, mode="valid"))
+    SS = model.k*model.sigma*math.sqrt(model.L_0)
+    return D*model.L_0 + SS
+
+def warehouse_path(warehouse, demands):
+    """Warehouse of the customer before and after the demand of every step,
+    and the steps with a stockout (as in Customer.step: the unmet demand
+    empties the warehouse, which stays empty until a delivery)"""
+    w = np.add.accumulate(np.concatenate([[warehouse], -demands]))
+    before, after = w[:-1], w[1:]
+    short = demands > before
+    if short.any():
+        after = after.copy()
+        after[int(short.argmax()):] = 0
+        before = np.concatenate([[warehouse], after[:-1]])
+        short = demands > before
+    return before, after, short
+
+def jump(model, demands):
+    """Advance the model at once by the quiet steps at the beginning of the
+    block of demands and return their number"""
+    customer, factory, dispatcher = model.customer, model.factory, model.dispatcher
+    traffic = dispatcher.n_busy / len(model.trucks)
+    L = lead_time_updater(model, traffic)
+    quiet = len(demands)
+
+    #trucks: positions up to the step before the first one reaches the
+    #customer or the factory, moved as in Truck.step (a trip is a few steps,
+    #so the exact sums cost less than arrays)
+    forward, back = model.truck_movement, model.beta * model.truck_movement
+    paths = []
+    for truck in model.trucks:
+        if truck.state == "idle":
+            continue
+        position, path = truck.position, []
+        if truck.state == "going":
+            while len(path) < quiet:
+                position += forward
+                if position >= L:
+                    break
+                path.append(position)
+        else:
+            while len(path) < quiet:
+                position -= back
+                if position <= 0:
+                    break
+                path.append(position)
+        quiet = min(quiet, len(path))
+        paths.append((truck, path))
+    if quiet == 0:
+        return 0
+
+    #customer: with a truck idle the backorders leave at once and an order
+    #at the ROP; with the whole fleet away the orders are refused and the
+    #backorders wait
+    demands = demands[:quiet]
+    before, w, short = warehouse_path(customer.warehouse, demands)
+    if dispatcher.n_busy < len(model.trucks):
+        if dispatcher.backorders:
+            return 0
+        events = w <= reorder_points(model, demands)
+        if events.any():
+            quiet = int(events.argmax())
+            if quiet == 0:
+                return 0
+            demands, before, w, short = demands[:quiet], before[:quiet], w[:quiet], short[:quiet]
+
+    #the quiet steps, in closed form
+    varying = {"customer_warehouse": w}
+    varying["holding"] = hold = np.add.accumulate(np.concatenate([[model.hold], model.h * w]))[1:]
+    if short.any():
+        varying["stockout"] = np.add.accumulate(np.concatenate(
+            [[model.stockout_cost], np.where(short, model.p * (demands - before), 0)]))[1:]
+        varying["times_stockout"] = model.times_stockout + np.cumsum(short)
+        model.stockout_cost = varying["stockout"][-1].item()
+        model.times_stockout = int(varying["times_stockout"][-1])
+    if model.production is None:
+        outputs = np.full(quiet, model.mu)
+    else:
+        outputs = model.production.outputs_between(model.steps + 1, quiet)
+    varying["factory_warehouse"] = factory_warehouse = np.add.accumulate(
+        np.concatenate([[factory.warehouse], outputs]))[1:]
+
+    for truck, path in paths:
+        truck.position = path[quiet - 1]
+    customer.demand_history.extend(demands.tolist())
+    customer.warehouse = w[-1].item()
+    factory.warehouse = factory_warehouse[-1].item()
+    model.hold = hold[-1].item()
+    model.customer_warehouse_history.extend(w.tolist())
+    model.traffic_history.extend([traffic] * quiet)
+    model.lead_time_history.extend([L] * quiet)
+    model.lead_time = L
+    model.traffic = traffic
+    model.steps += quiet
+
+    #rows of the datacollector of the quiet steps, at once
+    #(the costs of the stockouts, when there are none, keep their value)
+    model.datacollector.collect_block(model, model.steps - quiet + 1, quiet, varying)
+    return quiet
+
+# ======================
+# Benchmark
+# ======================
+#a busy fleet, FBR with its large orders, low activity (a low demand, long
+#trips) and congested fleets (slow trucks, few trucks) where the customer
+#often waits with the fleet away
+SCENARIOS = {
+    "FRP (default)": {},
+    "FBR": {"order_policy": "FBR"},
+    "FBR, low demand": {"order_policy": "FBR", "demand_type": "Poisson", "mu": 2, "sigma": 1.4},
+    "FBR, long trips": {"order_policy": "FBR", "L_0": 10, "truck_movement": 0.5},
+    "FBR, slow trucks": {"order_policy": "FBR", "truck_movement": 0.2},
+    "FRP, slow trucks": {"truck_movement": 0.2},
+    "FRP, 2 slow trucks": {"n_trucks": 2, "truck_movement": 0.3},
+}
+
+def benchmark(n_steps=20000, repeats=3, seed=42, scenarios=None):
+    """Best time of run(n_steps) per step and with the skip-ahead, on every
+    scenario: {label: {"per_step": s, "skip_ahead": s, "speedup": x,
+    "same": whether the two runs collected the same rows}}"""
+    from model import SupplyChainModel #the model imports this module
+    results = {}
+    for label, params in (scenarios or SCENARIOS).items():
+        times, frames = {}, {}
+        for mode in (False, True):
+            best = math.inf
+            for _ in range(repeats):
+                model = SupplyChainModel(seed=seed, skip_ahead=mode, **params)
+                start = time.perf_counter()
+                model.run(n_steps)
+                best = min(best, time.perf_counter() - start)
+            times[mode], frames[mode] = best, model.datacollector.get_model_vars_dataframe()
+        results[label] = {"per_step": times[False], "skip_ahead": times[True],
+                          "speedup": times[False] / times[True],
+                          "same": frames[False].equals(frames[True])}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the skip-ahead")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    print(f"{args.steps} steps, best of {args.repeats}")
+    for label, row in benchmark(args.steps, args.repeats).items():
+        print(f"{label:>20}: per step {row['per_step']:.3f} s, skip-ahead {row['skip_ahead']:.3f} s, "
+              f"x{row['speedup']:.2f}, same run: {row['same']}")
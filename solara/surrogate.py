@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 15:48:20 2026
+
+@author: Francesco
+"""
+
+"""
+Surrogate of the SupplyChainModel for instant estimates in the dashboard.
+
+A Gaussian process (plain NumPy) learns the final costs and KPIs as a function
+of the dashboard parameters (the sliders, plus the ordering policy and the
+demand type as one-hot features) from the results of a sweep. Its prediction,
+with an uncertainty band, is shown as soon as a slider is moved, while the
+true simulation runs.
+
+The surrogate is saved in two files: '<path>.npz' with the arrays and
+'<path>.json' with the training metadata (horizon, number of points, date,
+hyperparameters, ...). It is trained from inside the solara folder with:
+    python surrogate.py 400
+"""
+
+import sys #for the command line
+import json #for the metadata
+import datetime #for the metadata
+import numpy as np #numerical computing library
+from mesa.visualization import Slider #to recognise the sliders
+from params import model_params #ranges of the parameters
+from runner import run_scenarios #for the training sweep
+
+#outputs learnt by the surrogate: the total cost, the stockouts and the kpis
+OUTPUTS = ("total_cost", "times_stockout", "avg_lead_time", "cv_lead_time",
+           "cv_inventory", "avg_traffic")
+
+def _sliders():
+    return {name: p for name, p in model_params.items() if isinstance(p, Slider)}
+
+def _selects():
+    #categorical parameters, e.g.: order_policy and demand_type
+    return {name: p["values"] for name, p in model_params.items()
+            if isinstance(p, dict) and p.get("type") == "Select" and name != "warmup"}
+
+def features(scenario):
+    """Sliders normalised in [0, 1] and one-hot categorical parameters"""
+    x = [(scenario[name] - s.min) / (s.max - s.min) for name, s in _sliders().items()]
+    for name, values in _selects().items():
+        x += [1.0 if scenario[name] == v else 0.0 for v in values]
+    return np.array(x, dtype=float)
+
+
+class Surrogate:
+    """Gaussian process regression, one for every output, sharing the inputs"""
+
+    def __init__(self, outputs=OUTPUTS):
+        self.outputs = tuple(outputs)
+        self.meta = {}
+
+    # ======================
+    # Gaussian process
+    # ======================
+    @staticmethod
+    def _kernel(A, B, lengthscale):
+        #squared exponential kernel, with unit variance (outputs are standardised)
+        d2 = np.sum(A**2, 1)[:, None] + np.sum(B**2, 1)[None, :] - 2 * A @ B.T
+        return np.exp(-0.5 * np.maximum(d2, 0) / lengthscale**2)
+
+    def _fit_output(self, y):
+        #hyperparameters chosen on a grid by the log marginal likelihood
+        n = len(y)
+        best = None
+        for lengthscale in (0.25, 0.5, 1.0, 2.0):
+            K0 = self._kernel(self.X, self.X, lengthscale)
+            for noise in (1e-3, 1e-2, 1e-1, 0.3):
+                try:
+                    L = np.linalg.cholesky(K0 + noise * np.eye(n))
+                except np.linalg.LinAlgError:
+                    continue
+                alpha = np.linalg.solve(L.T, np.linalg.solve(L, y))
+                loglik = -0.5 * y @ alpha - np.sum(np.log(np.diag(L)))
+                if best is None or loglik > best[0]:
+                    best = (loglik, lengthscale, noise, L, alpha)
+        return best[1:]
+
+    def fit(self, scenarios, summaries, n_steps):
+        """Fit on the results of a sweep: scenarios (dictionaries of
+        parameters) and their summaries (see runner.summarize)"""
+        self.X = np.array([features(s) for s in scenarios])
+        Y = np.array([[r[o] for o in self.outputs] for r in summaries], dtype=float)
+        self.y_mean = Y.mean(axis=0)
+        self.y_std = Y.std(axis=0)
+        self.y_std[self.y_std == 0] = 1.0
+        Ys = (Y - self.y_mean) / self.y_std
+
+        self.lengthscale = np.empty(len(self.outputs))
+        self.noise = np.empty(len(self.outputs))
+        self.L = np.empty((len(self.outputs), len(Y), len(Y)))
+        self.alpha = np.empty((len(self.outputs), len(Y)))
+        for k in range(len(self.outputs)):
+            self.lengthscale[k], self.noise[k], self.L[k], self.alpha[k] = self._fit_output(Ys[:, k])
+
+        self.meta = {
+            "n_steps": n_steps,
+            "n_points": len(Y),
+            "outputs": list(self.outputs),
+            "sliders": list(_sliders()),
+            "selects": _selects(),
+            "lengthscale": self.lengthscale.tolist(),
+            "noise": self.noise.tolist(),
+            "trained": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        return self
+
+    def predict(self, scenario):
+        """Mean and standard deviation of every output for a scenario:
+        {output: (mean, std)}"""
+        x = features(scenario)[None, :]
+        prediction = {}
+        for k, o in enumerate(self.outputs):
+            k_star = self._kernel(x, self.X, self.lengthscale[k])[0]
+            mean = k_star @ self.alpha[k]
+            v = np.linalg.solve(self.L[k], k_star)
+            var = max(1.0 + self.noise[k] - v @ v, 0.0)
+            prediction[o] = (float(self.y_mean[k] + self.y_std[k] * mean),
+                             float(self.y_std[k] * np.sqrt(var)))
+        return prediction
+
+    # ======================
+    # Persistence
+    # ======================
+    def save(self, path):
+        np.savez(path + ".npz", X=self.X, y_mean=self.y_mean, y_std=self.y_std,
+                 lengthscale=self.lengthscale, noise=self.noise, L=self.L, alpha=self.alpha)
+        with open(path + ".json", "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        surrogate = cls(meta["outputs"])
+        surrogate.meta = meta
+        with np.load(path + ".npz") as data:
+            for name in ("X", "y_mean", "y_std", "lengthscale", "noise", "L", "alpha"):
+                setattr(surrogate, name, data[name])
+        #the parameters of the dashboard must not have changed since the training
+        if meta["sliders"] != list(_sliders()) or meta["selects"] != _selects():
+            raise ValueError("the surrogate was trained on different dashboard parameters")
+        return surrogate
+
+
+# ======================
+# Training
+# ======================
+def training_scenarios(n_points, seed=42):
+    """Latin hypercube over the sliders (rounded to their step) and random
+    categorical parameters"""
+    rng = np.random.default_rng(seed)
+    sliders = _sliders()
+    scenarios = [{} for _ in range(n_points)]
+    for name, s in sliders.items():
+        #one point in each of the n_points strata, in random order
+        u = (rng.permutation(n_points) + rng.random(n_points)) / n_points
+        for scenario, ui in zip(scenarios, u):
+            x = s.min + round(ui * (s.max - s.min) / s.step) * s.step
+            x = min(max(x, s.min), s.max)
+            scenario[name] = float(x) if s.is_float_slider else int(round(x))
+    for name, values in _selects().items():
+        for scenario in scenarios:
+            scenario[name] = values[rng.integers(len(values))]
+    for scenario in scenarios:
+        scenario["seed"] = int(rng.integers(2**31))
+    return scenarios
+
+def train(path, n_points=400, n_steps=365, seed=42, n_workers=None, service=None):
+    """Run the training sweep, fit the surrogate and save it at path"""
+    scenarios = training_scenarios(n_points, seed)
+    summaries = run_scenarios(scenarios, n_steps, n_workers, service=service, user="surrogate")
+    surrogate = Surrogate().fit(scenarios, summaries, n_steps)
+    surrogate.save(path)
+    return surrogate
+
+
+if __name__ == "__main__":
+    n_points = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    train("surrogate", n_points=n_points)
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 09:31:12 2026
+
+@author: Francesco
+"""
+
+"""
+Tail-risk metrics of the costs over the replications.
+
+The means and the coefficients of variation of compute_kpis say nothing about
+the bad years. Here the distribution of the total cost, of the stockout cost
+and of the number of stockouts is summarised by streaming quantile sketches
+(t-digest), from which the quantiles (Value at Risk) and the CVaR (Expected
+Shortfall: the mean of the worst (1-level) fraction of the replications) are
+read. A sketch keeps at most a few hundred centroids whatever the number of
+replications, and two sketches are merged by concatenating their centroids:
+every worker process fills its own sketches and only those are sent back.
+
+Besides the final values, the distribution can be followed over time, with one
+sketch per output at given checkpoint steps.
+"""
+
+import os #for the number of cores
+import math #for the scale function of the t-digest
+import numpy as np #numerical computing library
+from concurrent.futures import ProcessPoolExecutor #for the parallel replications
+from model import SupplyChainModel #import of the model
+from runner import replication_seeds #same seeds of the runner
+
+#outputs followed by default
+OUTPUTS = ("total_cost", "stockout_cost", "times_stockout")
+LEVELS = (0.9, 0.95, 0.99)
+
+#columns of the datacollector of the model, or of an EnsembleStore (see
+#ensemble.py), giving every output
+_METRICS = {
+    "total_cost": ("holding", "stockout", "transportation"),
+    "stockout_cost": ("stockout",),
+    "times_stockout": ("times_stockout",),
+    "holding": ("holding",),
+    "transportation": ("transportation",),
+}
+
+# ======================
+# t-digest
+# ======================
+class TDigest:
+    """Mergeable quantile sketch (merging t-digest): the values are summarised
+    by centroids (mean, weight), small in the tails and larger in the middle"""
+
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self._buffer = [] #values not yet merged into the centroids
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self):
+        self._flush()
+        return float(self.weights.sum())
+
+    def add(self, x, w=1.0):
+        x = float(x)
+        self._buffer.append((x, w))
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if len(self._buffer) >= 10 * self.compression:
+            self._flush()
+
+    def update(self, values):
+        """Add many values at once"""
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        self._flush()
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other):
+        """Merge the centroids of another sketch (e.g.: from another worker)"""
+        other._flush()
+        self._flush()
+        if len(other.weights) == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _flush(self):
+        if self._buffer:
+            x, w = np.array(self._buffer).T
+            self._buffer = []
+            self._compress(np.concatenate([self.means, x]), np.concatenate([self.weights, w]))
+
+    def _q_limit(self, q):
+        #largest quantile that a centroid starting at q may reach: with the
+        #arcsine scale function k(q) = compression/(2*pi)*asin(2q - 1) a
+        #centroid spans at most one unit of k, so the centroids near the
+        #quantiles 0 and 1 stay small
+        k = np.arcsin(2 * q - 1) + 2 * math.pi / self.compression
+        return (1 + np.sin(np.minimum(k, math.pi / 2))) / 2
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        #greedy merge, from the left: every centroid takes the following
+        #values while its right edge stays within the limit of its left edge
+        #(one binary search per centroid, not a loop over the values)
+        ends = []
+        first, left = 0, 0.0
+        while first < len(weights):
+            limit = self._q_limit(left / total) * total
+            last = max(first, int(np.searchsorted(cumulative, limit * (1 + 1e-12), side="right")) - 1)
+            ends.append(last + 1)
+            first, left = last + 1, cumulative[last]
+        starts = np.r_[0, ends[:-1]]
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def _knots(self):
+        #piecewise linear quantile function through the centre of every
+        #centroid, from the minimum to the maximum; a centroid of a single
+        #value is that exact value over its whole width
+        self._flush()
+        right = np.cumsum(self.weights)
+        total = right[-1]
+        single = self.weights == 1
+        u = np.where(single[:, None], np.column_stack([right - 1, right]),
+                     (right - self.weights / 2)[:, None]).ravel() / total
+        x = np.repeat(self.means, 2)
+        keep = np.repeat(np.ones(len(single), dtype=bool), 2)
+        keep[1::2] = single #the second knot only for the single values
+        u = np.concatenate([[0.0], u[keep], [1.0]])
+        x = np.concatenate([[self.min], x[keep], [self.max]])
+        return u, x
+
+    def mean(self):
+        self._flush()
+        if len(self.weights) == 0:
+            return math.nan
+        return float(np.sum(self.means * self.weights) / self.weights.sum())
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        u, x = self._knots()
+        return float(np.interp(q, u, x))
+
+    def cdf(self, value):
+        if self.count == 0:
+            return math.nan
+        u, x = self._knots()
+        return float(np.interp(value, x, u))
+
+    def cvar(self, level):
+        """Mean of the values above the quantile 'level' (Expected Shortfall):
+        the centroids entirely in the tail count with their exact mean; the
+        values of the one across the quantile are taken as linear in the
+        quantile, with its exact mean and the slope between its neighbours"""
+        if self.count == 0:
+            return math.nan
+        if level >= 1:
+            return float(self.max)
+        total = self.weights.sum()
+        tail = (1 - level) * total
+        right = np.cumsum(self.weights)
+        #centroids entirely in the tail
+        inside = total - right + self.weights <= tail * (1 + 1e-12)
+        value = np.sum(self.means[inside] * self.weights[inside])
+        j = len(self.weights) - 1 - int(inside.sum()) #centroid across the quantile
+        part = tail - self.weights[inside].sum()
+        if j >= 0 and part > 0:
+            centres = np.concatenate([[0.0], right - self.weights / 2, [total]])
+            x = np.concatenate([[self.min], self.means, [self.max]])
+            #neighbours of the centroid (the extremes at the ends)
+            slope = (x[j + 2] - x[j]) / (centres[j + 2] - centres[j])
+            #mean over its part in the tail, on the right of the centroid
+            value += part * (self.means[j] + slope * (self.weights[j] - part) / 2)
+        return float(value / tail)
+
+
+# ======================
+# Tail risk of the replications
+# ======================
+class TailRisk:
+    """t-digests of the final value of every output and, optionally, of its
+    value at some checkpoint steps"""
+
+    def __init__(self, outputs=OUTPUTS, checkpoints=(), compression=200):
+        self.outputs = tuple(outputs)
+        self.checkpoints = tuple(int(t) for t in checkpoints)
+        self.compression = compression
+        self.final = {o: TDigest(compression) for o in self.outputs}
+        self.over_time = {o: [TDigest(compression) for _ in self.checkpoints]
+                          for o in self.outputs}
+
+    def add(self, summary):
+        """Add the final values of a replication, e.g.: a summary of
+        runner.summarize"""
+        for o in self.outputs:
+            self.final[o].add(summary[o])
+
+    def add_run(self, model):
+        """Add the values of a model at every checkpoint (from its
+        datacollector, which must have sampled them) and at its last step"""
+        data = model.datacollector
+        missed = [t for t in self.checkpoints if t % data.every != 0]
+        if missed:
+            raise ValueError(f"the datacollector keeps a row every {data.every} steps, "
+                             f"not at the checkpoints {missed}")
+        for o in self.outputs:
+            for digest, t in zip(self.over_time[o], self.checkpoints):
+                digest.add(sum(data.value_at(m, t) for m in _METRICS[o]))
+            #the last step may not be sampled, its values are the current ones
+            self.final[o].add(sum(data.current(model, m) for m in _METRICS[o]))
+
+    def merge(self, other):
+        """Merge the sketches of another TailRisk (e.g.: from another worker)"""
+        if other.outputs != self.outputs or other.checkpoints != self.checkpoints:
+            raise ValueError("only TailRisk with the same outputs and checkpoints can be merged")
+        for o in self.outputs:
+            self.final[o].merge(other.final[o])
+            for mine, theirs in zip(self.over_time[o], other.over_time[o]):
+                mine.merge(theirs)
+        return self
+
+    @classmethod
+    def from_summaries(cls, summaries, outputs=OUTPUTS, compression=200):
+        """Sketches of the final values of a list of summaries"""
+        tail_risk = cls(outputs, compression=compression)
+        for o in tail_risk.outputs:
+            tail_risk.final[o].update([s[o] for s in summaries])
+        return tail_risk
+
+    @classmethod
+    def from_store(cls, store, checkpoints=None, outputs=OUTPUTS, compression=200, block=256):
+        """Sketches of the trajectories of an EnsembleStore (see ensemble.py),
+        read a block of replications at a time; by default the checkpoints
+        are 10 steps evenly spaced"""
+        if checkpoints is None:
+            checkpoints = np.linspace(1, store.n_steps, 10).round().astype(int)
+        tail_risk = cls(outputs, checkpoints, compression)
+        columns = [t - 1 for t in tail_risk.checkpoints] + [store.n_steps - 1]
+        for r0 in range(0, store.n_replications, block):
+            chunk = np.asarray(store.data[r0:r0 + block][:, columns], dtype=np.float64)
+            for o in tail_risk.outputs:
+                values = sum(chunk[:, :, store.metrics.index(m)] for m in _METRICS[o])
+                values = values[~np.isnan(values).any(axis=1)] #rows not written yet
+                for i, digest in enumerate(tail_risk.over_time[o]):
+                    digest.update(values[:, i])
+                tail_risk.final[o].update(values[:, -1])
+        return tail_risk
+
+    @staticmethod
+    def _metrics(digest, levels):
+        metrics = {"n": digest.count, "mean": digest.mean()}
+        for level in levels:
+            metrics[f"quantile_{level}"] = digest.quantile(level)
+            metrics[f"cvar_{level}"] = digest.cvar(level)
+        return metrics
+
+    def report(self, levels=LEVELS):
+        """Mean, quantiles and CVaR of the final value of every output:
+        {output: {'mean': .., 'quantile_0.95': .., 'cvar_0.95': .., ...}}"""
+        return {o: self._metrics(self.final[o], levels) for o in self.outputs}
+
+    def report_over_time(self, output, levels=LEVELS):
+        """Mean, quantiles and CVaR of an output at every checkpoint, as
+        arrays: {'steps': .., 'mean': .., 'quantile_0.95': .., ...}"""
+        rows = [self._metrics(digest, levels) for digest in self.over_time[output]]
+        report = {"steps": np.array(self.checkpoints)}
+        for name in rows[0] if rows else ():
+            report[name] = np.array([row[name] for row in rows])
+        return report
+
+
+# ======================
+# Parallel replications
+# ======================
+def _tail_risk_job(job):
+    #a batch of replications in a worker: only its sketches go back
+    seeds, n_steps, model_kwargs, outputs, checkpoints, compression = job
+    tail_risk = TailRisk(outputs, checkpoints, compression)
+    for s in seeds:
+        #every step collected, so that any checkpoint can be read
+        model = SupplyChainModel(**{**model_kwargs, "seed": s, "collect_every": 1})
+        model.run(n_steps)
+        tail_risk.add_run(model)
+    return tail_risk
+
+def run_tail_risk(n_replications, n_steps, seed=None, n_workers=None, outputs=OUTPUTS,
+                  checkpoints=(), compression=200, **model_kwargs):
+    """Tail risk of n_replications replications of the same scenario (the
+    same seeds as runner.run_replications), without keeping their results"""
+    seeds = replication_seeds(seed, n_replications)
+    n_workers = n_workers or os.cpu_count()
+    #a few batches per worker, each one merged as soon as it is done
+    n_batches = min(len(seeds), 4 * n_workers)
+    jobs = [(seeds[i::n_batches], n_steps, model_kwargs, tuple(outputs), tuple(checkpoints), compression)
+            for i in range(n_batches)]
+    tail_risk = TailRisk(outputs, checkpoints, compression)
+
+    #with a single worker we avoid the overhead of the processes
+    if n_workers == 1:
+        for job in jobs:
+            tail_risk.merge(_tail_risk_job(job))
+        return tail_risk
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        for partial in pool.map(_tail_risk_job, jobs):
+            tail_risk.merge(partial)
+    return tail_risk
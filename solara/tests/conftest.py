@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 09:05:11 2026
+
+@author: Francesco
+"""
+
+"""
+The modules of the model are imported as in the dashboard, from inside the
+solara folder, and the ones shared by the scripts (e.g.: backlog.py) from the
+folder above:
+
+    python -m pytest tests
+"""
+
+import os #for the path of the modules
+import sys #for the path of the modules
+
+SOLARA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SOLARA)
+sys.path.insert(1, os.path.dirname(SOLARA))
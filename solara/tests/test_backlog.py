@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 11:06:19 2026
+
+@author: Francesco
+"""
+
+from backlog import Backlog
+
+def test_deliveries_serve_the_oldest_backorders_first():
+    backlog = Backlog()
+    assert backlog.add(1, 5) == 0
+    assert backlog.add(2, 3) == 0
+    assert backlog.serve(4, 6) == 0 #all to the backorders
+    assert [list(e) for e in backlog.queue] == [[2, 2]]
+    assert backlog.serve(5, 10) == 8 #the rest to the warehouse
+    assert backlog.size == 0 and backlog.served == 8
+    assert backlog.total_wait == 5 * 3 + 1 * 2 + 2 * 3
+
+def test_the_cap_returns_the_lost_quantity():
+    backlog = Backlog(cap=6)
+    assert backlog.add(1, 4) == 0
+    assert backlog.add(2, 5) == 3
+    assert backlog.size == 6 and backlog.lost == 3
+
+def test_the_aging_out_returns_the_lost_quantity():
+    backlog = Backlog(max_age=2)
+    backlog.add(1, 4)
+    backlog.add(2, 1)
+    assert backlog.update(3) == 0
+    assert backlog.update(4) == 4
+    assert backlog.size == 1 and backlog.lost == 4
+
+def test_every_unit_is_either_backordered_or_lost():
+    #so that the backorder cost and the stockout penalty are never charged
+    #on the same unit
+    backlog = Backlog(cap=10, max_age=3)
+    added = lost = 0
+    for step, (unmet, delivered) in enumerate([(6, 0), (7, 0), (0, 4), (5, 0), (0, 0), (0, 0),
+                                               (3, 20), (0, 0)]):
+        added += unmet
+        lost += backlog.add(step, unmet)
+        backlog.serve(step, delivered)
+        lost += backlog.update(step)
+    assert lost == backlog.lost
+    assert added == backlog.served + backlog.lost + backlog.size
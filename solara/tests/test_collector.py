@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 17:48:31 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+from model import SupplyChainModel
+from collector import ColumnarCollector
+from ensemble import run_ensemble
+from playback import Trajectory
+from runner import summarize
+from tail_risk import TailRisk, run_tail_risk
+
+def run(n_steps=100, **params):
+    model = SupplyChainModel(seed=5, **params)
+    model.run(n_steps)
+    return model
+
+def test_rows_are_sampled_every_and_on_change():
+    full = run().datacollector
+    sampled = run(collect_every=7).datacollector
+    assert sampled.steps.tolist() == list(range(7, 101, 7))
+    assert sampled.get_model_vars_dataframe().equals(full.get_model_vars_dataframe().loc[sampled.steps])
+    changed = run(collect_on_change=True).datacollector
+    #the skipped rows are the ones equal to the previous, so filling them is exact
+    for name in full.model_reporters:
+        assert np.array_equal(changed.series(name, 100), full.column(name))
+
+def test_dataframe_is_not_changed_by_later_rows():
+    model = run()
+    data = model.datacollector.get_model_vars_dataframe()
+    expected = data.copy()
+    model.reset(seed=6, order_policy="FBR")
+    model.run(50)
+    assert data.equals(expected)
+
+def test_value_at_the_last_step_that_is_not_sampled():
+    model = run(365, collect_every=7)
+    assert model.datacollector.steps[-1] == 364
+    assert model.datacollector.current(model, "stockout") == model.stockout_cost
+
+def test_ensemble_keeps_every_step_whatever_the_sampling(tmp_path):
+    stores = [run_ensemble(str(tmp_path / name), 3, 60, seed=1, n_workers=1, **params)
+              for name, params in (("full", {}), ("sampled", {"collect_every": 7}),
+                                   ("changed", {"collect_on_change": True}))]
+    for store in stores[1:]:
+        assert np.array_equal(store.data, stores[0].data)
+
+def test_tail_risk_final_values_whatever_the_sampling():
+    model = run(365, collect_every=7)
+    tail_risk = TailRisk(outputs=("total_cost", "times_stockout"))
+    tail_risk.add_run(model)
+    summary = summarize(model)
+    assert tail_risk.final["total_cost"].max == pytest.approx(summary["total_cost"])
+    assert tail_risk.final["times_stockout"].max == summary["times_stockout"]
+    with pytest.raises(ValueError):
+        TailRisk(checkpoints=(30,)).add_run(model)
+    reports = [run_tail_risk(8, 100, seed=2, n_workers=1, checkpoints=(30, 100), **params).report_over_time("total_cost")
+               for params in ({}, {"collect_every": 7})]
+    assert reports[0].keys() == reports[1].keys()
+    for name, values in reports[0].items():
+        assert np.array_equal(values, reports[1][name])
+
+def test_playback_has_one_value_per_step_whatever_the_sampling():
+    full = Trajectory.record(100, seed=5)
+    sampled = Trajectory.record(100, seed=5, collect_every=7, collect_on_change=True)
+    assert sampled.n_steps == 100
+    for name, values in full.series.items():
+        assert np.array_equal(sampled.series[name], values)
+
+def test_block_rows_are_the_rows_of_collect():
+    #sampled every 2 steps and only on change: 1,1,2,2,2,3,3,3 keeps the
+    #steps 2, 4 and 6, whether collected step by step or as a block
+    values = [1, 1, 2, 2, 2, 3, 3, 3]
+    class Model:
+        steps = 0
+        value = 0
+    stepped = ColumnarCollector({"value": "value"}, every=2, on_change=True)
+    model = Model()
+    for model.steps, model.value in enumerate(values, start=1):
+        stepped.collect(model)
+    block = ColumnarCollector({"value": "value"}, every=2, on_change=True)
+    block.collect_block(model, 1, len(values), {"value": np.array(values)})
+    assert stepped.steps.tolist() == block.steps.tolist() == [2, 4, 6]
+    assert block.column("value").tolist() == [1, 2, 3]
+
+def test_sampled_kpis_and_costs_share_the_warmup():
+    full = run(200, warmup="MSER-5")
+    sampled = run(200, warmup="MSER-5", collect_every=7)
+    d = sampled.warmup_length()
+    assert d % 7 == 0 and d <= full.warmup_length() < d + 7
+    assert sampled.compute_costs()["warmup"] == d
+    #the kpis and the costs of the same window as the full collector
+    assert sampled.compute_kpis() == full.compute_kpis(warmup=d)
+    assert sampled.compute_costs() == full.compute_costs(warmup=d)
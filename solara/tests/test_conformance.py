@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 11:37:05 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+from model import SupplyChainModel
+from conformance import (SCENARIOS, record_trace, compare_traces, skip_ahead_trace, shadow_traces,
+                         vector_env_trace, save_trace, load_trace, freeze, ks_2samp)
+
+#a short run of the suite: every engine on the scenarios it models
+@pytest.mark.parametrize("label", list(SCENARIOS))
+def test_engines_follow_the_golden_trace(label):
+    scenario = SCENARIOS[label]
+    policy = scenario["order_policy"]
+    params = {k: v for k, v in scenario.items() if k != "order_policy"}
+    reference = record_trace(SupplyChainModel(seed=7, **scenario), 120)
+    trace, _ = skip_ahead_trace(120, seed=7, **scenario)
+    assert compare_traces(reference, trace) == {}
+    assert compare_traces(reference, shadow_traces(120, 7, policies=(policy,), **params)[policy]) == {}
+    if not any(k in scenario for k in ("truck_capacity", "mtbf", "production_cv")):
+        assert compare_traces(reference, vector_env_trace(reference, policy, **params)) == {}
+
+def test_the_first_divergence_is_reported():
+    reference = record_trace(SupplyChainModel(seed=1), 50)
+    candidate = {name: values.copy() for name, values in reference.items()}
+    candidate["holding"][30:] += 0.5
+    candidate["truck_state"][12, 3] = 0
+    candidate["demand"] = candidate["demand"][:40]
+    mismatches = compare_traces(reference, candidate)
+    assert mismatches.keys() == {"holding", "truck_state", "demand"}
+    assert mismatches["holding"][0] == 31 and mismatches["truck_state"][0] == 13
+    assert mismatches["demand"] == (41, 50, 40)
+
+def test_frozen_trace_checks_a_later_run(tmp_path):
+    path = str(tmp_path / "golden.npz")
+    freeze(path, 60, seed=42, order_policy="FBR")
+    frozen = load_trace(path)
+    assert frozen["param_order_policy"].item() == "FBR"
+    again = record_trace(SupplyChainModel(seed=42, order_policy="FBR"), 60)
+    assert compare_traces(frozen, again) == {}
+    #another seed is a different trace
+    save_trace(record_trace(SupplyChainModel(seed=43, order_policy="FBR"), 60), path)
+    assert compare_traces(frozen, load_trace(path)) != {}
+
+def test_ks_2samp():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(0, 1, 500), rng.normal(0, 1, 400)
+    d, p = ks_2samp(a, a)
+    assert d == 0 and p == 1
+    assert ks_2samp(a, b)[1] > 0.01
+    assert ks_2samp(a, b + 0.5)[1] < 1e-6
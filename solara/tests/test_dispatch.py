@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 19:12:05 2026
+
+@author: Francesco
+"""
+
+from model import SupplyChainModel
+
+def fleet(capacity):
+    model = SupplyChainModel(seed=1, n_trucks=len(capacity), truck_capacity=capacity)
+    return model, model.dispatcher
+
+def loads(model):
+    return [truck.current_load for truck in model.trucks]
+
+def test_orders_of_the_day_are_consolidated():
+    model, dispatcher = fleet([10, 10])
+    for quantity in (5, 7, 3):
+        assert dispatcher.take(quantity)
+    assert dispatcher.dispatch() == 15
+    #first-fit decreasing: 7 and 3 on the first truck, 5 on the second
+    assert loads(model) == [10, 5]
+    assert dispatcher.n_busy == 2 and dispatcher.backlog == 0
+
+def test_large_order_is_split_over_the_largest_trucks():
+    model, dispatcher = fleet([20, 25, 15, 50])
+    dispatcher.take(60)
+    assert dispatcher.dispatch() == 60
+    assert loads(model) == [0, 10, 0, 50]
+    assert [truck.available for truck in model.trucks] == [True, False, True, False]
+
+def test_remainder_is_backordered_and_leaves_first():
+    model, dispatcher = fleet([20, 25, 15, 50])
+    dispatcher.take(120)
+    assert dispatcher.dispatch() == 110
+    assert dispatcher.backlog == 10
+    #the whole fleet is away: new orders are refused, the backorder waits
+    assert not dispatcher.take(5)
+    assert dispatcher.dispatch() == 0 and dispatcher.backlog == 10
+    truck = model.trucks[2]
+    truck.state, truck.available, truck.current_load = "idle", True, 0
+    dispatcher.release(truck)
+    assert dispatcher.take(5)
+    assert dispatcher.dispatch() == 15
+    assert truck.current_load == 15 and dispatcher.backlog == 0
+
+def test_everything_taken_is_shipped_or_backordered():
+    model = SupplyChainModel(seed=2, order_policy="FBR", n_trucks=2, truck_capacity=[15, 20])
+    taken, shipped = [], []
+    take, assign = model.dispatcher.take, model.dispatcher._assign
+    model.dispatcher.take = lambda quantity: take(quantity) and (taken.append(quantity) or True)
+    model.dispatcher._assign = lambda i, load: (shipped.append(load), assign(i, load))
+    for _ in range(365):
+        model.step()
+        #the trucks away are the ones that are not available
+        assert model.dispatcher.n_busy == sum(not truck.available for truck in model.trucks)
+        assert model.dispatcher.available.tolist() == [truck.available for truck in model.trucks]
+    assert model.datacollector.column("backorder").max() > 0
+    assert sum(taken) == sum(shipped) + model.dispatcher.backlog
+
+def test_unlimited_loads_have_no_backorders():
+    model = SupplyChainModel(seed=2, order_policy="FBR")
+    model.run(365)
+    assert (model.datacollector.column("backorder") == 0).all()
+
+def test_backorders_count_in_the_position_of_the_customer():
+    #the customer does not order again what waits at the factory
+    model = SupplyChainModel(seed=2, order_policy="FBR", n_trucks=2, truck_capacity=[15, 20])
+    model.run(365)
+    assert 0 < model.datacollector.column("backorder").max() < 100
+
+def test_idle_trucks_of_a_large_fleet():
+    model, dispatcher = fleet([20, 25, 15, 50] * 2500)
+    for _ in range(3):
+        dispatcher.take(2000)
+        dispatcher.dispatch()
+    #the largest idle trucks first, the array follows every departure
+    assert dispatcher.n_busy == 120 and dispatcher.backlog == 0
+    assert dispatcher.available.tolist() == [truck.available for truck in model.trucks]
+    assert {truck.maximum_load for truck in model.trucks if not truck.available} == {50}
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:52:30 2026
+
+@author: Francesco
+"""
+
+import pytest
+from runner import run_model
+from playback import Trajectory, cached_trajectory
+
+SCENARIO = {"seed": 3, "order_policy": "ARP", "collect_every": 5}
+
+@pytest.mark.parametrize("t", [1, 37, 120, 300])
+def test_playback_is_the_run_stopped_at_t(t):
+    trajectory = Trajectory.record(300, **SCENARIO)
+    model = run_model(t, **SCENARIO)
+    assert trajectory.kpis_at(t) == pytest.approx(model.compute_kpis(warmup=0))
+    costs = trajectory.costs_at(t)
+    assert costs["times_stockout"] == model.times_stockout
+    assert costs["holding"] == pytest.approx(model.hold)
+    assert costs["stockout_cost"] == pytest.approx(model.stockout_cost)
+    assert costs["transportation"] == pytest.approx(model.transportation)
+
+def test_trajectories_are_cached():
+    assert cached_trajectory(50, **SCENARIO) is cached_trajectory(50, **SCENARIO)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 10:12:44 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+from model import SupplyChainModel
+from production import ProductionSchedule, sample_working
+
+def periods(working):
+    #lengths of the working and repair periods of a schedule, the last one
+    #(cut by the end of the block) excluded
+    edges = np.flatnonzero(np.diff(working.astype(np.int8))) + 1
+    lengths = np.diff(edges)
+    return lengths[working[edges[:-1]]], lengths[~working[edges[:-1]]]
+
+def test_breakdowns_follow_mtbf_and_mttr():
+    rng = np.random.default_rng(0)
+    working, _, _ = sample_working(rng, 200, 5000, mtbf=30, mttr=4)
+    up, down = zip(*(periods(row) for row in working))
+    up, down = np.concatenate(up), np.concatenate(down)
+    assert abs(up.mean() - 30) < 1 and abs(down.mean() - 4) < 0.2
+    assert up.min() >= 1 and down.min() >= 1
+    #availability mtbf / (mtbf + mttr), rounding of the periods aside
+    assert abs(working.mean() - 30 / 34) < 0.01
+
+def test_schedule_continues_across_blocks():
+    #small blocks give the same process as one large block: no period is
+    #cut or restarted at the end of a block
+    working = np.array([ProductionSchedule(np.random.default_rng(seed), 10, mtbf=30, mttr=4,
+                                           block=7).outputs_between(1, 10000) > 0
+                        for seed in range(20)])
+    up, down = zip(*(periods(row) for row in working))
+    up, down = np.concatenate(up), np.concatenate(down)
+    assert abs(up.mean() - 30) < 1 and abs(down.mean() - 4) < 0.2
+    assert abs(working.mean() - 30 / 34) < 0.01
+
+def test_schedule_reads_are_consistent_and_seeded():
+    first = ProductionSchedule(np.random.default_rng(2), 10, mtbf=20, mttr=3, production_cv=0.2, block=64)
+    second = ProductionSchedule(np.random.default_rng(2), 10, mtbf=20, mttr=3, production_cv=0.2, block=64)
+    outputs = first.outputs_between(1, 1000).copy()
+    assert np.array_equal(outputs, [second.at(t) for t in range(1, 1001)])
+    assert np.array_equal(first.outputs_between(501, 100), outputs[500:600])
+    assert outputs.min() == 0 and (outputs >= 0).all()
+    noise = ProductionSchedule(np.random.default_rng(3), 10, production_cv=0.2).outputs_between(1, 100000)
+    assert abs(noise.mean() - 10) < 0.05 and abs(noise.std() / 10 - 0.2) < 0.01
+
+def test_breakdowns_keep_the_demand_of_the_model():
+    #the schedule has its own stream: same demand with and without failures
+    steady = SupplyChainModel(seed=4)
+    failing = SupplyChainModel(seed=4, mtbf=15, mttr=5)
+    steady.run(365)
+    failing.run(365)
+    assert steady.customer.demand_history == failing.customer.demand_history
+    produced = [failing.production.at(t) for t in range(1, 366)]
+    assert 0 in produced and failing.stockout_cost >= steady.stockout_cost
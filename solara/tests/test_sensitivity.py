@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:06:48 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+from sensitivity import SensitivityAnalysis
+
+class Linear(SensitivityAnalysis):
+    """Known outputs instead of the simulations: 4*mu + h (on the unit
+    scale, centred) at the rounded points of the design, nothing from k"""
+
+    def evaluate(self, points):
+        u = np.array([self.to_unit(self.to_values(x)) for x in points]) - 0.5
+        mu, h = self.names.index("mu"), self.names.index("h")
+        return (4 * u[:, mu] + u[:, h])[:, None]
+
+def linear(**kwargs):
+    return Linear(names=["mu", "h", "k"], outputs=("total_cost",), **kwargs)
+
+def test_morris_effects_are_the_slopes():
+    results = linear().morris(r=10, n_bootstrap=100)["total_cost"]
+    assert results["mu"]["mu_star"] == pytest.approx(4)
+    assert results["h"]["mu_star"] == pytest.approx(1)
+    assert results["k"]["mu_star"] == pytest.approx(0)
+    assert results["mu"]["sigma"] == pytest.approx(0, abs=1e-9)
+    low, high = results["mu"]["mu_star_conf"]
+    assert low <= 4 + 1e-9 and high >= 4 - 1e-9
+
+def test_sobol_indices_split_the_variance():
+    results = linear().sobol(n=1024, n_bootstrap=100)["total_cost"]
+    #variance shares 16/17 and 1/17, no interactions
+    assert results["mu"]["S1"] == pytest.approx(16 / 17, abs=0.05)
+    assert results["h"]["S1"] == pytest.approx(1 / 17, abs=0.05)
+    assert results["k"]["ST"] == pytest.approx(0, abs=1e-9)
+    for name in ("mu", "h"):
+        assert results[name]["ST"] == pytest.approx(results[name]["S1"], abs=0.05)
+        low, high = results[name]["S1_conf"]
+        assert low <= results[name]["S1"] <= high
+
+def test_points_are_simulated_once(tmp_path):
+    cache = str(tmp_path / "cache.json")
+    analysis = SensitivityAnalysis(names=["mu", "h"], n_steps=30, n_seeds=1, n_workers=1,
+                                   cache_path=cache)
+    points = np.array([[0.5, 0.5], [0.5, 0.5001], [1.0, 0.0]])
+    y = analysis.evaluate(points)
+    #the first two points round to the same values of the sliders
+    assert len(analysis.cache) == 2 and (y[0] == y[1]).all()
+    #another analysis with the same setting reads them from the file
+    again = SensitivityAnalysis(names=["mu", "h"], n_steps=30, n_seeds=1, n_workers=1,
+                                cache_path=cache)
+    assert len(again.cache) == 2 and (again.evaluate(points) == y).all()
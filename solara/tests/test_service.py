@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 09:12:48 2026
+
+@author: Francesco
+"""
+
+import json
+import asyncio
+import numpy as np
+import pytest
+from service import SimulationService, job_key, to_json
+
+def service():
+    simulation_service = SimulationService(n_workers=1)
+    simulation_service.wakeup = asyncio.Event()
+    return simulation_service
+
+def test_seeded_jobs_are_deduplicated():
+    s = service()
+    request = {"n_steps": 10, "scenarios": [{"seed": 1}, {"seed": 2, "order_policy": "ARP"}]}
+    first, deduplicated = s.submit(request)
+    assert not deduplicated
+    second, deduplicated = s.submit(json.loads(json.dumps(request)))
+    assert deduplicated and second is first
+    s.pool.shutdown()
+
+def test_unseeded_jobs_are_never_deduplicated():
+    s = service()
+    request = {"n_steps": 10, "scenarios": [{"seed": None}, {"mu": 12}]}
+    assert job_key(10, request["scenarios"]) is None
+    first, deduplicated = s.submit(request)
+    second, deduplicated_again = s.submit(request)
+    assert not deduplicated and not deduplicated_again
+    assert first.id != second.id
+    s.pool.shutdown()
+
+def test_to_json_converts_numpy_and_tuples():
+    scenario = {"seed": np.int64(3), "mu": np.float32(10.5), "skip_ahead": np.bool_(True),
+                "truck_capacity": (20, np.int32(25)), "weights": np.arange(3)}
+    converted = json.loads(json.dumps(to_json(scenario)))
+    assert converted == {"seed": 3, "mu": 10.5, "skip_ahead": True,
+                         "truck_capacity": [20, 25], "weights": [0, 1, 2]}
+
+def test_to_json_rejects_objects():
+    with pytest.raises(TypeError):
+        to_json({"demand_source": object()})
+
+def test_scenario_scheduled_after_a_failure_keeps_the_job_failed():
+    s = service()
+    job, _ = s.submit({"n_steps": 10, "scenarios": [{"seed": 1}, {"seed": 2}]})
+    #the first scenario failed, the second one was already scheduled
+    job.status, job.error = "failed", "ValueError: x"
+    s.in_flight = 1
+    asyncio.run(s._run(job, 1))
+    assert job.status == "failed" and job.finished and s.in_flight == 0
+    assert job.done == 0 and job.results[1] is None
+    s.pool.shutdown()
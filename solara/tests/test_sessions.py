@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 21:03:27 2026
+
+@author: Francesco
+"""
+
+import threading
+import pytest
+from model import SupplyChainModel
+from sessions import ModelPool
+
+class SlowModel(SupplyChainModel):
+    #a model built only once 'go' is set
+    go = threading.Event()
+
+    def __init__(self, **params):
+        SlowModel.go.wait(5)
+        super().__init__(**params)
+
+def acquire_in_thread(pool, session_id, cancel, **params):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(
+        model=pool.acquire(session_id, cancel=cancel, **params)))
+    thread.start()
+    return thread, result
+
+def test_session_closed_while_its_model_is_built():
+    pool = ModelPool(max_models=1, step_workers=1, model_class=SlowModel)
+    SlowModel.go.clear()
+    cancel = threading.Event()
+    thread, result = acquire_in_thread(pool, "a", cancel, seed=1)
+    #the page is closed before acquire returns
+    cancel.set()
+    pool.release("a")
+    SlowModel.go.set()
+    thread.join(5)
+    assert result["model"] is None
+    assert pool.stats() == {"sessions": 0, "idle": 1, "models": 1}
+    #the only model of the pool is not lost
+    assert pool.acquire("b", timeout=1, seed=2) is not None
+    pool.shutdown()
+
+def test_session_closed_while_waiting_for_a_model():
+    pool = ModelPool(max_models=1, step_workers=1)
+    pool.acquire("a", seed=1)
+    cancel = threading.Event()
+    thread, result = acquire_in_thread(pool, "b", cancel, seed=2)
+    cancel.set()
+    pool.release("b")
+    thread.join(5)
+    assert not thread.is_alive() and result["model"] is None
+    pool.release("a")
+    assert pool.stats() == {"sessions": 0, "idle": 1, "models": 1}
+    pool.shutdown()
+
+def test_failed_reset_keeps_the_model():
+    pool = ModelPool(max_models=1, step_workers=1)
+    model = pool.acquire("a", seed=1)
+    pool.step("a", 20).result()
+    pool.release("a")
+    with pytest.raises(ValueError):
+        pool.acquire("b", seed=2, truck_capacity="large")
+    #the model was not reset, it is back in the pool and still works
+    assert pool.stats() == {"sessions": 0, "idle": 1, "models": 1}
+    assert model.steps == 20 and model.datacollector.n_rows == 20
+    assert pool.acquire("c", timeout=1, seed=3) is model
+    pool.step("c", 5).result()
+    assert model.steps == 5
+    pool.shutdown()
+
+def test_render_reads_while_a_worker_steps():
+    pool = ModelPool(max_models=1, step_workers=1)
+    model = pool.acquire("a", seed=1)
+    futures = [pool.step("a", 50) if i % 5 else pool.reset("a", seed=i) for i in range(100)]
+    while not all(future.done() for future in futures):
+        data = model.datacollector.get_model_vars_dataframe()
+        #a consistent copy: one row per step from 1, whatever is being written
+        assert data.index.tolist() == list(range(1, len(data) + 1))
+    for future in futures:
+        future.result()
+    pool.shutdown()
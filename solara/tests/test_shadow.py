@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:05:41 2026
+
+@author: Francesco
+"""
+
+import time
+import pytest
+from runner import run_model, summarize
+from shadow import ShadowPolicyModel, compare_policies
+
+POLICIES = ("FRP", "ARP", "FBR")
+
+#all the lanes at once, with limited loads and a stochastic factory too
+@pytest.mark.parametrize("params", [
+    {},
+    {"n_trucks": 2, "truck_capacity": [15, 20]},
+    {"mtbf": 30, "mttr": 5, "truck_movement": 0.5},
+    {"warmup": "MSER-5", "collect_every": 5},
+])
+def test_every_lane_is_the_stand_alone_model(params):
+    results = compare_policies(400, seed=3, policies=POLICIES, **params)
+    for policy in POLICIES:
+        assert results[policy] == summarize(run_model(400, seed=3, order_policy=policy, **params))
+
+def test_lanes_cost_less_than_separate_models():
+    start = time.perf_counter()
+    compare_policies(3000, seed=1)
+    shadow = time.perf_counter() - start
+    start = time.perf_counter()
+    for policy in POLICIES:
+        run_model(3000, seed=1, order_policy=policy)
+    assert shadow < time.perf_counter() - start
+
+def test_unknown_hyperparameters_are_refused():
+    with pytest.raises(TypeError):
+        ShadowPolicyModel(seed=1, n_truck=3)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 16:05:12 2026
+
+@author: Francesco
+"""
+
+import pytest
+import skip_ahead
+from model import SupplyChainModel
+
+SCENARIOS = [
+    {},
+    {"order_policy": "FBR", "truck_movement": 0.2},
+    {"n_trucks": 2, "truck_movement": 0.3},
+    {"order_policy": "ARP", "mtbf": 30, "mttr": 4, "production_cv": 0.2, "truck_movement": 0.2},
+    {"order_policy": "FBR", "truck_capacity": [20, 25, 15, 50]},
+    {"order_policy": "FBR", "n_trucks": 2, "truck_capacity": [15, 20], "truck_movement": 0.3},
+    {"demand_type": "Poisson", "n_trucks": 1, "truck_movement": 0.1, "collect_every": 7},
+    {"n_trucks": 2, "truck_movement": 0.2, "collect_on_change": True},
+    #free costs and a factory mostly under repair, so that the rows repeat
+    {"demand_type": "Poisson", "mu": 1, "h": 0, "p": 0, "c": 0, "n_trucks": 2, "truck_movement": 0.2,
+     "mtbf": 5, "mttr": 20, "collect_every": 2, "collect_on_change": True},
+]
+
+@pytest.mark.parametrize("params", SCENARIOS)
+def test_skip_ahead_is_the_per_step_run(params):
+    reference = SupplyChainModel(seed=3, **params)
+    for _ in range(600):
+        reference.step()
+    model = SupplyChainModel(seed=3, skip_ahead=True, **params)
+    model.run(250)
+    model.run(350)
+    assert model.datacollector.get_model_vars_dataframe().equals(
+        reference.datacollector.get_model_vars_dataframe())
+    assert model.customer_warehouse_history == reference.customer_warehouse_history
+    assert model.lead_time_history == reference.lead_time_history
+    assert [t.position for t in model.trucks] == [t.position for t in reference.trucks]
+    assert (model.stockout_cost, model.times_stockout) == (reference.stockout_cost, reference.times_stockout)
+
+def test_congested_runs_are_mostly_jumped(monkeypatch):
+    jumped = []
+    jump = skip_ahead.jump
+    monkeypatch.setattr(skip_ahead, "jump", lambda model, demands: jumped.append(jump(model, demands)) or jumped[-1])
+    SupplyChainModel(seed=3, skip_ahead=True, n_trucks=2, truck_movement=0.3).run(2000)
+    assert sum(jumped) > 0.6 * 2000
+
+def test_busy_runs_are_stepped(monkeypatch):
+    #the customer orders at every step: a jump is hardly ever tried
+    attempts = []
+    jump = skip_ahead.jump
+    monkeypatch.setattr(skip_ahead, "jump", lambda model, demands: attempts.append(len(demands)) or jump(model, demands))
+    SupplyChainModel(seed=3, skip_ahead=True).run(2000)
+    assert len(attempts) < 20
+
+def test_busy_steps_are_checked_in_constant_time(monkeypatch):
+    #the horizon (a loop over the fleet) is computed only when the customer
+    #is far from its ROP or the fleet is away, and once per event of the fleet
+    calls = []
+    horizon = skip_ahead.horizon
+    monkeypatch.setattr(skip_ahead, "horizon", lambda model: calls.append(model.dispatcher.events) or horizon(model))
+    SupplyChainModel(seed=3, skip_ahead=True).run(2000)
+    assert calls == []
+    model = SupplyChainModel(seed=3, skip_ahead=True, order_policy="FBR")
+    model.run(2000)
+    assert len(calls) < 0.05 * 2000
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:24:03 2026
+
+@author: Francesco
+"""
+
+import json
+import numpy as np
+import pytest
+from runner import run_scenarios
+from surrogate import Surrogate, training_scenarios, features
+
+@pytest.fixture(scope="module")
+def sweep():
+    scenarios = training_scenarios(40, seed=1)
+    return scenarios, run_scenarios(scenarios, 60, n_workers=1)
+
+def test_training_points_are_on_the_sliders():
+    scenarios = training_scenarios(20, seed=3)
+    X = np.array([features(s) for s in scenarios])
+    assert ((X >= 0) & (X <= 1)).all()
+    assert scenarios == training_scenarios(20, seed=3)
+
+def test_prediction_follows_the_training_data(sweep):
+    scenarios, summaries = sweep
+    surrogate = Surrogate().fit(scenarios, summaries, 60)
+    for scenario, summary in zip(scenarios[:5], summaries):
+        prediction = surrogate.predict(scenario)
+        for output, (mean, std) in prediction.items():
+            assert std >= 0
+            #within the noise learnt on the training points
+            spread = np.std([s[output] for s in summaries])
+            assert abs(mean - summary[output]) <= 3 * std + 0.5 * spread
+
+def test_saved_surrogate_predicts_the_same(sweep, tmp_path):
+    scenarios, summaries = sweep
+    surrogate = Surrogate().fit(scenarios, summaries, 60)
+    path = str(tmp_path / "surrogate")
+    surrogate.save(path)
+    loaded = Surrogate.load(path)
+    assert loaded.meta == surrogate.meta and loaded.meta["n_points"] == 40
+    assert loaded.predict(scenarios[7]) == surrogate.predict(scenarios[7])
+    #a surrogate of other dashboard parameters is refused
+    with open(path + ".json") as f:
+        meta = json.load(f)
+    meta["sliders"] = meta["sliders"][:-1]
+    with open(path + ".json", "w") as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError):
+        Surrogate.load(path)
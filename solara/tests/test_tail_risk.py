@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 12:20:44 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+from tail_risk import TDigest, TailRisk, run_tail_risk
+
+def exact_cvar(values, level):
+    values = np.sort(values)
+    n = len(values)
+    tail = (1 - level) * n
+    whole = int(np.floor(tail))
+    return (values[n - whole:].sum() + (tail - whole) * values[n - whole - 1]) / tail
+
+def digest(values, mode, compression):
+    d = TDigest(compression)
+    if mode == "add":
+        for v in values:
+            d.add(v)
+    elif mode == "update":
+        d.update(values)
+    else: #sketches of many workers, merged
+        for chunk in np.array_split(values, 50):
+            part = TDigest(compression)
+            part.update(chunk)
+            d.merge(part)
+    return d
+
+@pytest.mark.parametrize("mode", ["add", "update", "merge"])
+@pytest.mark.parametrize("distribution", ["lognormal", "pareto", "normal"])
+def test_quantiles_and_cvar_against_the_exact_ones(mode, distribution):
+    rng = np.random.default_rng(7)
+    values = {"lognormal": lambda: rng.lognormal(0, 1, 50_000),
+              "pareto": lambda: rng.pareto(3, 50_000),
+              "normal": lambda: rng.normal(100, 10, 50_000)}[distribution]()
+    d = digest(values, mode, compression=100)
+    assert len(d.weights) <= 100
+    ordered = np.sort(values)
+    for q in (0.001, 0.01, 0.1, 0.5, 0.9, 0.99, 0.999):
+        #rank of the estimated quantile among the exact values
+        rank = np.searchsorted(ordered, d.quantile(q)) / len(values)
+        assert abs(rank - q) < 2e-3
+    for level, tolerance in ((0.9, 0.005), (0.99, 0.02), (0.999, 0.08)):
+        assert d.cvar(level) == pytest.approx(exact_cvar(values, level), rel=tolerance)
+    assert d.mean() == pytest.approx(values.mean(), rel=1e-9)
+    assert (d.min, d.max) == (values.min(), values.max())
+
+def test_larger_compression_is_more_accurate_in_the_tail():
+    values = np.random.default_rng(3).lognormal(0, 1, 100_000)
+    errors = [abs(digest(values, "add", c).cvar(0.999) / exact_cvar(values, 0.999) - 1)
+              for c in (100, 400)]
+    assert errors[1] < errors[0] and errors[1] < 0.01
+
+def test_run_tail_risk_matches_the_summaries():
+    risk = run_tail_risk(40, 60, seed=1, n_workers=1, checkpoints=(30, 60))
+    report = risk.report(levels=(0.9,))
+    assert report["total_cost"]["quantile_0.9"] <= risk.final["total_cost"].max
+    assert isinstance(risk, TailRisk) and set(risk.over_time) == set(risk.outputs)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 10:02:37 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+import pandas as pd
+from traces import TraceDemand
+from model import SupplyChainModel
+from runner import run_model, run_replications
+from shadow import compare_policies
+
+@pytest.fixture
+def trace(tmp_path):
+    path = str(tmp_path / "demand.npy")
+    np.save(path, np.random.default_rng(0).gamma(4, 2.5, (200, 2)).astype("float32"))
+    return path
+
+@pytest.mark.parametrize("mode", ["sequential", "bootstrap"])
+def test_replications_do_not_depend_on_the_workers(trace, mode):
+    source = TraceDemand(trace, column=1, mode=mode, block_size=7)
+    serial = run_replications(6, 40, seed=3, n_workers=1, demand_source=source)
+    parallel = run_replications(6, 40, seed=3, n_workers=2, demand_source=source)
+    assert [s["total_cost"] for s in serial] == [s["total_cost"] for s in parallel]
+
+def test_every_model_replays_the_trace_from_its_start(trace):
+    source = TraceDemand(trace, column=1)
+    first = run_model(30, seed=1, demand_source=source)
+    second = run_model(30, seed=2, demand_source=source)
+    expected = np.maximum(0, np.round(np.load(trace)[:30, 1].astype(float))).tolist()
+    assert first.customer.demand_history == expected
+    assert second.customer.demand_history == expected
+    #the source given by the caller is never consumed
+    assert source._position == 0 and source._values is None
+
+def test_shadow_lanes_replay_the_trace(trace):
+    source = TraceDemand(trace, column=0)
+    assert compare_policies(30, seed=1, demand_source=source) == \
+        compare_policies(30, seed=1, demand_source=source)
+
+@pytest.mark.parametrize("column", [0, 1, "SKU_2"])
+def test_csv_trace_by_name_or_position(trace, tmp_path, column):
+    path = str(tmp_path / "demand.csv")
+    values = np.load(trace)
+    pd.DataFrame(values, columns=["SKU_1", "SKU_2"]).to_csv(path, index=False)
+    model = SupplyChainModel(seed=1, demand_source=TraceDemand(path, column=column, chunksize=7, start=5))
+    model.run(250) #across the chunks and back to the start of the trace
+    j = 0 if column == 0 else 1
+    expected = np.maximum(0, np.round(np.concatenate([values[5:], values])[:250, j].astype(float)))
+    assert model.customer.demand_history == expected.tolist()
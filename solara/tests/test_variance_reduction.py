@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:41:16 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+from model import SupplyChainModel
+from variance_reduction import AntitheticDemand, expected_demand, estimate, compare, _estimate
+
+def path(source, n, **params):
+    model = SupplyChainModel(seed=0, **params)
+    return np.array([source.draw(model) for _ in range(n)], dtype=float)
+
+@pytest.mark.parametrize("demand_type", ["Normal", "Poisson"])
+def test_antithetic_paths(demand_type):
+    plain = path(AntitheticDemand(5), 4000, demand_type=demand_type)
+    #the same seed gives the same path, the antithetic one moves the other way
+    assert (path(AntitheticDemand(5), 4000, demand_type=demand_type) == plain).all()
+    antithetic = path(AntitheticDemand(5, antithetic=True), 4000, demand_type=demand_type)
+    assert np.corrcoef(plain, antithetic)[0, 1] < -0.9
+    assert plain.mean() == pytest.approx(expected_demand(10, 5, demand_type), rel=0.03)
+
+def test_expected_demand_of_the_rounded_normal():
+    rng = np.random.default_rng(1)
+    x = np.maximum(0, np.round(rng.normal(3, 5, 1_000_000)))
+    assert expected_demand(3, 5, "Normal") == pytest.approx(x.mean(), rel=0.01)
+    assert expected_demand(3, 5, "Poisson") == 3
+
+def test_control_variate_removes_the_linear_noise():
+    rng = np.random.default_rng(2)
+    C = rng.normal(10, 1, 200)
+    Y = 3 * C + rng.normal(0, 0.1, 200)
+    result = _estimate(Y, C, 10, antithetic=False, control_variate=True)
+    assert result["beta"] == pytest.approx(3, rel=0.02)
+    assert result["variance_reduction"] > 100
+    assert result["mean"] == pytest.approx(30, abs=4 * result["std_error"])
+
+def test_estimate_is_tighter_than_the_plain_average():
+    result = estimate(20, 120, seed=1, n_workers=1)
+    assert result["n_runs"] == 20 and result["n_steps_simulated"] == 20 * 120
+    assert result["std_error"] < result["crude_std_error"]
+    low, high = result["ci_95"]
+    assert low < result["mean"] < high
+
+def test_common_random_numbers_of_a_comparison():
+    result = compare({"FRP": {"order_policy": "FRP"}, "FBR": {"order_policy": "FBR"}},
+                     10, 120, seed=1, n_workers=1)
+    assert result["FBR"]["difference"] == pytest.approx(result["FBR"]["mean"] - result["FRP"]["mean"])
+    #the same demand paths: the difference is less noisy than the two runs
+    assert result["FBR"]["variance_reduction"] > 1
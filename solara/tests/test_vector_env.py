@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 09:41:18 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+from vector_env import SupplyChainVectorEnv, baseline_action
+
+def test_replayed_demand_survives_the_auto_reset():
+    demand = np.array([[7, 9], [4, 12], [15, 3], [7, 7], [6, 8], [10, 2]], dtype=float)
+    env = SupplyChainVectorEnv(2, max_steps=3)
+    _, info = env.reset(seed=0, options={"demand": demand[0]})
+    served = [info["demand"]]
+    truncated = []
+    for t in range(1, len(demand)):
+        _, _, _, done, info = env.step(baseline_action(env, "FBR"), demand=demand[t])
+        served.append(info["demand"])
+        truncated.append(done.copy())
+    #every step serves the given demand, the first one of an episode too
+    assert np.array_equal(served, demand)
+    assert [d.all() for d in truncated] == [False, False, True, False, False]
+    #the new episode (from the step after the truncation) is the one of a
+    #reset with the same demand
+    fresh = SupplyChainVectorEnv(2, max_steps=3)
+    fresh.reset(options={"demand": demand[4]})
+    fresh.step(baseline_action(fresh, "FBR"), demand=demand[5])
+    assert env.steps.tolist() == fresh.steps.tolist() == [1, 1]
+    assert np.array_equal(env.customer_warehouse, fresh.customer_warehouse)
+    assert np.array_equal(env.position, fresh.position)
+
+def test_the_auto_reset_does_not_draw_for_the_old_episode():
+    #the rows that restart draw only the demand of their new episode: an
+    #environment that restarts at every step draws once per step
+    env = SupplyChainVectorEnv(3, max_steps=1)
+    env.reset(seed=5)
+    draws = [env.step(np.zeros(3))[4]["demand"] for _ in range(4)]
+    rng = np.random.default_rng(5)
+    expected = [np.maximum(0, np.round(rng.normal(10, 5, 3))) for _ in range(5)]
+    #step 1 ends the first episodes, the next steps restart them
+    assert np.array_equal(draws[1:], expected[2:])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:40:12 2026
+
+@author: Francesco
+"""
+
+import numpy as np
+import pytest
+from model import SupplyChainModel
+from warmup import mser, warmup_length
+
+def test_mser_truncates_the_transient():
+    rng = np.random.default_rng(1)
+    #a decaying transient of 60 steps, then a stationary noise
+    series = np.concatenate([np.linspace(50, 0, 60), rng.normal(0, 1, 940)])
+    d = mser(series)
+    assert d % 5 == 0 and 45 <= d <= 70
+
+def test_mser_of_a_stationary_or_short_series():
+    rng = np.random.default_rng(2)
+    assert mser(rng.normal(0, 1, 1000)) < 100
+    assert mser([1, 2, 3, 4, 5, 6, 7]) == 0 #less than two batches
+
+def test_warmup_rules():
+    model = SupplyChainModel(seed=1)
+    model.run(100)
+    assert warmup_length(model, None) == warmup_length(model, "None") == 0
+    assert warmup_length(model, 30) == 30
+    assert warmup_length(model, 500) == 100 #never longer than the run
+    assert warmup_length(model, "MSER-5") == max(mser(model.customer_warehouse_history),
+                                                  mser(model.lead_time_history))
+
+def test_costs_after_the_warmup():
+    model = SupplyChainModel(seed=4, order_policy="FBR")
+    totals = []
+    for _ in range(200):
+        model.step()
+        totals.append((model.times_stockout, model.stockout_cost, model.hold, model.transportation))
+    #without a warm-up, the whole run
+    costs = model.compute_costs(warmup=0)
+    assert (costs["times_stockout"], costs["stockout_cost"], costs["holding"],
+            costs["transportation"]) == totals[-1]
+    #with a warm-up of 50 steps, what was accumulated from step 51 on
+    costs = model.compute_costs(warmup=50)
+    assert costs["warmup"] == 50 and costs["steps"] == 150
+    for name, i in [("times_stockout", 0), ("stockout_cost", 1), ("holding", 2), ("transportation", 3)]:
+        assert costs[name] == pytest.approx(totals[-1][i] - totals[49][i])
+        assert costs[name + "_rate"] == pytest.approx(costs[name] / 150)
+    assert costs["total_cost"] == pytest.approx(costs["stockout_cost"] + costs["holding"]
+                                                + costs["transportation"])
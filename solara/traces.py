@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 10:17:36 2026
+
+@author: Francesco
+"""
+
+"""
+Replay of historical demand traces (e.g.: the daily demand exported from the
+ERP), as a demand source of the SupplyChainModel:
+
+    model = SupplyChainModel(demand_source=TraceDemand("demand.npy", column="SKU_42"))
+
+The trace is never loaded in memory:
+    • a CSV file is streamed in chunks, reading only the selected column;
+    • a .npy file (steps x SKUs) is memory-mapped, as is a raw binary file
+      (e.g.: .bin, .dat) given its dtype and number of columns.
+
+Besides the sequential replay, the memory-mapped traces can be resampled with
+a moving-block bootstrap, drawn from the generator of the model, so that every
+replication sees a different demand path with the same statistics. Large CSV
+exports can be converted once to .npy with csv_to_npy, streaming them as well.
+"""
+
+import os #for the sidecar files
+import json #for the names of the columns of the .npy files
+import numpy as np #numerical computing library
+import pandas as pd #for streaming the CSV files
+
+def csv_to_npy(csv_path, npy_path, columns, chunksize=100_000, dtype="float32"):
+    """Convert the given columns of a CSV export into a (steps x columns) .npy
+    file, streaming it in chunks; the names of the columns are kept in
+    '<npy_path>.json'"""
+    columns = list(columns)
+    #first pass: number of rows, without keeping them
+    n_rows = sum(len(chunk) for chunk in pd.read_csv(csv_path, usecols=[columns[0]],
+                                                      chunksize=chunksize))
+    data = np.lib.format.open_memmap(npy_path, mode="w+", dtype=dtype,
+                                     shape=(n_rows, len(columns)))
+    #second pass: rows written in place
+    row = 0
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+        data[row:row + len(chunk)] = chunk[columns].to_numpy(dtype=dtype)
+        row += len(chunk)
+    data.flush()
+    with open(npy_path + ".json", "w") as f:
+        json.dump(columns, f)
+    return npy_path
+
+
+class TraceDemand:
+    """Demand source replaying a historical trace, with constant memory"""
+
+    def __init__(
+        self,
+        path, #.csv, .npy or raw binary file
+        column=0, #name (CSV, or .npy converted with csv_to_npy) or index of the SKU
+        mode="sequential", #'sequential' replay or moving-block 'bootstrap'
+        block_size=28, #length of the blocks of the bootstrap, in steps
+        start=0, #first step replayed in sequential mode
+        loop=True, #restart from the beginning at the end of the trace
+        chunksize=10_000, #rows read at a time from a CSV file
+        dtype="float32", #dtype of a raw binary file
+        n_columns=1, #number of columns of a raw binary file
+    ):
+        self.path = path
+        self.column = column
+        self.mode = mode
+        self.block_size = block_size
+        self.start = start
+        self.loop = loop
+        self.chunksize = chunksize
+        self.dtype = dtype
+        self.n_columns = n_columns
+        self.is_csv = path.lower().endswith(".csv")
+        if self.is_csv and mode == "bootstrap":
+            raise ValueError("the bootstrap needs random access, convert the CSV "
+                             "file with csv_to_npy first")
+        self._reset()
+
+    def _reset(self):
+        #the file is opened lazily, so that the source can be sent to other
+        #processes (parallel replications) before being used
+        self._values = None #memory-mapped column, or the current CSV chunk
+        self._chunks = None #iterator over the CSV chunks
+        self._chunk_position = 0 #next row of the current CSV chunk
+        self._position = self.start #next step in sequential mode
+        self._block = None #current block of the bootstrap
+        self._block_position = 0
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(_values=None, _chunks=None, _block=None)
+        return state
+
+    def spawn(self):
+        """A fresh copy, with its own position: one source per model"""
+        return TraceDemand(self.path, self.column, self.mode, self.block_size, self.start,
+                           self.loop, self.chunksize, self.dtype, self.n_columns)
+
+    # ======================
+    # Memory-mapped traces
+    # ======================
+    def _column_index(self):
+        if isinstance(self.column, str):
+            with open(self.path + ".json") as f:
+                return json.load(f).index(self.column)
+        return self.column
+
+    def _open(self):
+        if self.path.lower().endswith(".npy"):
+            data = np.load(self.path, mmap_mode="r")
+        else:
+            data = np.memmap(self.path, dtype=self.dtype, mode="r")
+            data = data.reshape(-1, self.n_columns)
+        #a view on a single column: still nothing is loaded
+        self._values = data if data.ndim == 1 else data[:, self._column_index()]
+
+    def _draw_mapped(self, model):
+        if self._values is None:
+            self._open()
+        n = len(self._values)
+        if self.mode == "bootstrap":
+            #new block starting at a random step of the trace
+            if self._block is None or self._block_position >= len(self._block):
+                size = min(self.block_size, n)
+                first = int(model.rng.integers(0, n - size + 1))
+                self._block = np.asarray(self._values[first:first + size])
+                self._block_position = 0
+            value = self._block[self._block_position]
+            self._block_position += 1
+            return value
+        if self._position >= n:
+            if not self.loop:
+                raise EOFError("the demand trace is over")
+            self._position = 0
+        value = self._values[self._position]
+        self._position += 1
+        return value
+
+    # ======================
+    # CSV traces
+    # ======================
+    def _next_chunk(self):
+        #only the selected column is read, whether given by name or position
+        self._values = next(self._chunks).iloc[:, 0].to_numpy()
+        self._chunk_position = 0
+
+    def _draw_csv(self):
+        if self._chunks is None:
+            self._chunks = iter(pd.read_csv(self.path, usecols=[self.column],
+                                            chunksize=self.chunksize))
+            self._next_chunk()
+            #skip the rows before the start
+            to_skip = self.start
+            while to_skip >= len(self._values):
+                to_skip -= len(self._values)
+                self._next_chunk()
+            self._chunk_position = to_skip
+        while self._chunk_position >= len(self._values):
+            try:
+                self._next_chunk()
+            except StopIteration:
+                if not self.loop:
+                    raise EOFError("the demand trace is over")
+                self._chunks = iter(pd.read_csv(self.path, usecols=[self.column],
+                                                chunksize=self.chunksize))
+                self._next_chunk()
+        value = self._values[self._chunk_position]
+        self._chunk_position += 1
+        return value
+
+    def draw(self, model):
+        """Demand of the current step"""
+        value = self._draw_csv() if self.is_csv else self._draw_mapped(model)
+        if not np.isfinite(value):
+            value = 0 #missing days of the export
+        return max(0, round(float(value))) #integer and never negative, as the synthetic demand
+
+
+def trace_length(path, dtype="float32", n_columns=1):
+    """Number of steps of a memory-mapped trace"""
+    if path.lower().endswith(".npy"):
+        return len(np.load(path, mmap_mode="r"))
+    return os.path.getsize(path) // (np.dtype(dtype).itemsize * n_columns)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:10:53 2026
+
+@author: Francesco
+"""
+
+"""
+Variance reduction for the replications of the SupplyChainModel.
+
+The stockout cost is driven by rare events, so the plain average over the
+replications converges slowly. Three techniques are available:
+    • antithetic demand: replications go in pairs, the second one sees the
+      demand at the opposite quantiles (1-U instead of U) of the first one,
+      for both Normal and Poisson demand;
+    • common random numbers: the compared configurations see the same demand
+      paths, so their differences are not hidden by the noise;
+    • control variates: the estimate is corrected with the realised mean
+      demand of every replication, whose expected value is known.
+
+Every estimate reports the variance reduction with respect to the plain
+average of the same number of replications.
+"""
+
+import math #for the number of replications
+import inspect #for the default hyperparameters of the model
+from statistics import NormalDist #inverse CDF of the Normal distribution
+import numpy as np #numerical computing library
+from model import SupplyChainModel #for the default hyperparameters
+from runner import run_scenarios, replication_seeds #parallel replications
+
+# ======================
+# Antithetic demand
+# ======================
+class AntitheticDemand:
+    """Demand source drawing the demand by inversion of uniform numbers from
+    its own generator: the same seed gives the same path to every
+    configuration (common random numbers) and antithetic=True gives the
+    antithetic path (1-U)"""
+
+    def __init__(self, seed, antithetic=False, block=1024):
+        self.seed = seed
+        self.antithetic = antithetic
+        self.block = block #uniforms drawn at a time
+        self._rng = np.random.default_rng(seed)
+        self._u = np.empty(0)
+        self._i = 0
+        self._table = None #inverse CDF of the demand, computed at the first draw
+
+    def _inverse_cdf(self, model):
+        if model.demand_type == "Normal":
+            normal = NormalDist(model.mu, model.sigma)
+            #the quantiles are rounded and clipped as the synthetic demand
+            return lambda u: np.maximum(0, np.round([normal.inv_cdf(x) for x in u]))
+        #Poisson: quantile by search in the cumulative distribution
+        cdf = poisson_cdf(model.mu)
+        return lambda u: np.minimum(np.searchsorted(cdf, u), len(cdf) - 1)
+
+    def draw(self, model):
+        if self._i >= len(self._u):
+            if self._table is None:
+                self._table = self._inverse_cdf(model)
+            u = self._rng.random(self.block)
+            #u is never exactly 0, the quantiles stay finite
+            u = np.clip(1 - u if self.antithetic else u, 1e-12, 1 - 1e-12)
+            self._u = self._table(u)
+            self._i = 0
+        value = self._u[self._i]
+        self._i += 1
+        return int(value)
+
+
+def poisson_cdf(lam):
+    #cumulative distribution up to far in the right tail
+    k_max = int(lam + 12 * math.sqrt(lam) + 12)
+    pmf = np.empty(k_max + 1)
+    pmf[0] = math.exp(-lam)
+    for k in range(1, k_max + 1):
+        pmf[k] = pmf[k - 1] * lam / k
+    return np.cumsum(pmf)
+
+def expected_demand(mu, sigma, demand_type):
+    """Exact expected value of the demand of the model, i.e. of
+    max(0, round(X)): the mean of the control variate"""
+    if demand_type != "Normal":
+        return float(mu)
+    normal = NormalDist(mu, sigma)
+    k = np.arange(1, int(mu + 12 * sigma) + 2)
+    p = np.array([normal.cdf(x + 0.5) - normal.cdf(x - 0.5) for x in k])
+    return float(np.sum(k * p))
+
+
+# ======================
+# Estimators
+# ======================
+def _scenarios(seeds, antithetic, params):
+    scenarios = []
+    for s in seeds:
+        scenarios.append({**params, "seed": s, "demand_source": AntitheticDemand(s)})
+        if antithetic:
+            scenarios.append({**params, "seed": s, "demand_source": AntitheticDemand(s, True)})
+    return scenarios
+
+def _estimate(Y, C, expected_C, antithetic, control_variate):
+    """Point estimate and standard error from the outputs Y (one per
+    replication) and the realised mean demand C"""
+    Y = np.asarray(Y, dtype=float)
+    C = np.asarray(C, dtype=float)
+    n_runs = len(Y)
+    #plain average, as if the replications were independent
+    crude_var = np.var(Y, ddof=1) / n_runs
+
+    #the antithetic pairs are averaged into one observation
+    if antithetic:
+        Y = Y.reshape(-1, 2).mean(axis=1)
+        C = C.reshape(-1, 2).mean(axis=1)
+
+    beta = 0.0
+    if control_variate and np.var(C) > 0:
+        beta = float(np.cov(Y, C)[0, 1] / np.var(C, ddof=1))
+        Y = Y - beta * (C - expected_C)
+
+    var = np.var(Y, ddof=1) / len(Y)
+    return {
+        "mean": float(np.mean(Y)),
+        "std_error": float(np.sqrt(var)),
+        "ci_95": (float(np.mean(Y) - 1.96*np.sqrt(var)), float(np.mean(Y) + 1.96*np.sqrt(var))),
+        "crude_std_error": float(np.sqrt(crude_var)),
+        #how many times fewer replications than the plain average are needed
+        "variance_reduction": float(crude_var / var) if var > 0 else float("inf"),
+        "beta": beta,
+        "n_runs": n_runs,
+    }
+
+def _summaries(seeds, n_steps, antithetic, n_workers, params):
+    return run_scenarios(_scenarios(seeds, antithetic, params), n_steps, n_workers)
+
+def _from_summaries(summaries, n_steps, output, antithetic, control_variate, params):
+    mu, sigma, demand_type = _demand_params(params)
+    result = _estimate([s[output] for s in summaries], [s["avg_demand"] for s in summaries],
+                       expected_demand(mu, sigma, demand_type), antithetic, control_variate)
+    result["n_steps_simulated"] = n_steps * len(summaries)
+    return result
+
+def estimate(n_replications, n_steps, output="total_cost", seed=None, antithetic=True,
+             control_variate=True, n_workers=None, **params):
+    """Mean of an output of the summary (see runner.summarize) over
+    n_replications runs (antithetic pairs count as two runs)"""
+    n_seeds = n_replications // 2 if antithetic else n_replications
+    seeds = replication_seeds(seed, n_seeds)
+    summaries = _summaries(seeds, n_steps, antithetic, n_workers, params)
+    return _from_summaries(summaries, n_steps, output, antithetic, control_variate, params)
+
+def estimate_to_precision(half_width, n_steps, output="total_cost", seed=None, pilot=20,
+                          antithetic=True, control_variate=True, n_workers=None, **params):
+    """Replications until the 95% interval is narrower than ±half_width: a
+    pilot run gives the standard deviation, then only the missing
+    replications are simulated"""
+    per_seed = 2 if antithetic else 1
+    n_pilot = max(2, pilot // per_seed)
+    summaries = _summaries(replication_seeds(seed, n_pilot), n_steps, antithetic, n_workers, params)
+    result = _from_summaries(summaries, n_steps, output, antithetic, control_variate, params)
+
+    #seeds needed for the target, from the variance of one seed (or pair)
+    seed_var = result["std_error"]**2 * n_pilot
+    n_seeds = math.ceil(seed_var * (1.96 / half_width)**2)
+    if n_seeds > n_pilot:
+        #the first seeds of a longer list are the ones of the pilot
+        seeds = replication_seeds(seed, n_seeds)[n_pilot:]
+        summaries += _summaries(seeds, n_steps, antithetic, n_workers, params)
+        result = _from_summaries(summaries, n_steps, output, antithetic, control_variate, params)
+    return result
+
+def _demand_params(params):
+    #demand hyperparameters, with the defaults of the model
+    defaults = {name: p.default for name, p in
+                inspect.signature(SupplyChainModel.__init__).parameters.items()}
+    return (params.get("mu", defaults["mu"]), params.get("sigma", defaults["sigma"]),
+            params.get("demand_type", defaults["demand_type"]))
+
+
+# ======================
+# Common random numbers
+# ======================
+def compare(configurations, n_replications, n_steps, output="total_cost", seed=None,
+            n_workers=None, **params):
+    """Compare configurations ({name: hyperparameters}) on the same demand
+    paths: mean of every configuration and the differences with the first one,
+    with the variance reduction of the differences with respect to
+    independent replications"""
+    seeds = replication_seeds(seed, n_replications)
+    names = list(configurations)
+    scenarios = []
+    for name in names:
+        scenarios += _scenarios(seeds, False, {**params, **configurations[name]})
+    summaries = run_scenarios(scenarios, n_steps, n_workers)
+    Y = np.array([s[output] for s in summaries]).reshape(len(names), n_replications)
+
+    result = {name: {"mean": float(Y[i].mean()),
+                     "std_error": float(Y[i].std(ddof=1) / np.sqrt(n_replications))}
+              for i, name in enumerate(names)}
+    for i, name in enumerate(names[1:], start=1):
+        difference = Y[i] - Y[0]
+        var = np.var(difference, ddof=1) / n_replications
+        #with independent replications the variances would add up
+        independent_var = (np.var(Y[i], ddof=1) + np.var(Y[0], ddof=1)) / n_replications
+        result[name]["difference"] = float(difference.mean())
+        result[name]["difference_std_error"] = float(np.sqrt(var))
+        result[name]["variance_reduction"] = float(independent_var / var) if var > 0 else float("inf")
+    return result
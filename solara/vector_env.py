@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 10:12:56 2026
+
+@author: Francesco
+"""
+
+"""
+Vectorised environment for training learned reorder policies.
+
+The SupplyChainModel is reimplemented on batched NumPy state: every array has
+one row per environment (and one column per truck), so a call to step()
+advances thousands of environments at once. The dynamics are the ones of the
+model, in the same order (factory, customer, trucks), and a step of the
+environment goes from one order of the customer to the next one, so that the
+policy sees what FRP/ARP/FBR see:
+    • observation: customer and factory warehouses, trucks going and
+      returning, quantity in transit, lead time and the last kernel_size
+      demands, once the demand of the step has been served;
+    • action: order quantity of every environment (0 means no order);
+    • reward: minus the holding and transport cost of the step and the
+      stockout cost of the next demand, the consequence of the order.
+
+The interface is the one of gymnasium.vector.VectorEnv (with the next-step
+auto-reset); gymnasium is optional, it is only used for the spaces. The
+orders of the baseline policies are given by baseline_action, to benchmark
+the learned policies against them:
+
+    env = SupplyChainVectorEnv(4096, max_steps=365)
+    obs, info = env.reset(seed=42)
+    obs, reward, terminated, truncated, info = env.step(baseline_action(env, "ARP"))
+"""
+
+import math #for the safety stock
+import numpy as np #numerical computing library
+from production import sample_outputs #stochastic production
+
+try:
+    import gymnasium as gym #optional, for the spaces and the VectorEnv interface
+except ImportError:
+    gym = None
+
+#truck states
+IDLE, GOING, RETURNING = 0, 1, 2
+
+class SupplyChainVectorEnv(gym.vector.VectorEnv if gym is not None else object):
+    """num_envs independent copies of the supply chain, stepped together"""
+
+    metadata = {"autoreset_mode": "NextStep"}
+
+    def __init__(
+        self,
+        num_envs,
+        max_steps=365, #length of an episode, then it is truncated
+        demand_type="Normal",
+        mu=10,
+        sigma=5,
+        alpha=0.75,
+        beta=1.01,
+        L_0=3,
+        k=2.33,
+        kernel_size=3, #demands in the observation, window of the moving average
+        truck_movement=1.5,
+        p=1,
+        h=0.01,
+        c=0.01,
+        n_trucks=8,
+        mtbf=None, #stochastic production, as in the SupplyChainModel
+        mttr=3,
+        weibull_k=1.5,
+        production_cv=0.0,
+        max_order=None, #upper bound of the action space, by default 10*mu
+    ):
+        #the same hyperparameters of the SupplyChainModel
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.demand_type = demand_type
+        self.mu = mu
+        self.sigma = sigma
+        self.alpha = alpha
+        self.beta = beta
+        self.L_0 = L_0
+        self.k = k
+        self.kernel_size = kernel_size
+        self.truck_movement = truck_movement
+        self.p = p
+        self.h = h
+        self.c = c
+        self.n_trucks = n_trucks
+        self.mtbf = mtbf
+        self.mttr = mttr
+        self.weibull_k = weibull_k
+        self.production_cv = production_cv
+        self.max_order = 10 * mu if max_order is None else max_order
+        self.rng = np.random.default_rng()
+
+        n_obs = 6 + kernel_size
+        if gym is not None:
+            self.single_observation_space = gym.spaces.Box(0, np.inf, (n_obs,), np.float32)
+            self.single_action_space = gym.spaces.Box(0, self.max_order, (), np.float32)
+            self.observation_space = gym.vector.utils.batch_space(self.single_observation_space, num_envs)
+            self.action_space = gym.vector.utils.batch_space(self.single_action_space, num_envs)
+
+        #state, one row per environment (and one column per truck)
+        shape = (num_envs, n_trucks)
+        self.customer_warehouse = np.zeros(num_envs)
+        self.factory_warehouse = np.zeros(num_envs)
+        self.position = np.zeros(shape)
+        self.load = np.zeros(shape)
+        self.state = np.zeros(shape, dtype=np.int8)
+        self.recent_demand = np.zeros((num_envs, kernel_size))
+        self.lead_time = np.zeros(num_envs)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        #output of the factory at every step of the episode (None: always mu)
+        self.production = None
+        #environments whose episode ended at the previous step
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+
+    # ======================
+    # Reset
+    # ======================
+    def _reset_envs(self, mask):
+        #initial state of the SupplyChainModel
+        self.customer_warehouse[mask] = self.mu + self.sigma * self.k
+        self.factory_warehouse[mask] = 5
+        self.position[mask] = 0
+        self.load[mask] = 0
+        self.state[mask] = IDLE
+        self.recent_demand[mask] = 0 #a short history is averaged as zeros, as in moving_average
+        self.lead_time[mask] = self.L_0
+        self.steps[mask] = 0
+        #the production of the whole episode is sampled at once
+        if self.mtbf is not None or self.production_cv > 0:
+            if self.production is None:
+                self.production = np.empty((self.num_envs, self.max_steps + 1))
+            self.production[mask] = sample_outputs(
+                self.rng, int(mask.sum()), self.max_steps + 1, self.mu, self.mtbf, self.mttr,
+                self.weibull_k, self.production_cv)[0]
+
+    def reset(self, seed=None, options=None):
+        """Reset all the environments and serve the demand of their first
+        step; the seed makes the whole batch reproducible. options may give
+        the first 'demand' of every environment"""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        everyone = np.ones(self.num_envs, dtype=bool)
+        self._reset_envs(everyone)
+        self._autoreset[:] = False
+        stockout_cost, stockout, demand = self._serve(everyone, (options or {}).get("demand"))
+        return self._observation(), {"stockout": stockout_cost, "stockout_event": stockout, "demand": demand}
+
+    # ======================
+    # Step
+    # ======================
+    def _serve(self, mask, demand=None):
+        #beginning of a step of the model, up to the order of the customer:
+        #production of the factory, then the demand is served
+        n = int(mask.sum())
+        if demand is None:
+            if self.demand_type == "Normal":
+                demand = self.rng.normal(self.mu, self.sigma, n)
+            else:
+                demand = self.rng.poisson(self.mu, n)
+            demand = np.maximum(0, np.round(demand)) #integer and never negative
+        else:
+            demand = np.asarray(demand, dtype=float).reshape(self.num_envs)[mask]
+        if self.production is None:
+            self.factory_warehouse[mask] += self.mu
+        else:
+            #the environments past the end are reset right after, any column will do
+            step = np.minimum(self.steps[mask], self.max_steps)
+            self.factory_warehouse[mask] += self.production[mask, step]
+        recent = self.recent_demand[mask]
+        self.recent_demand[mask] = np.column_stack([recent[:, 1:], demand])
+
+        w = self.customer_warehouse[mask]
+        stockout = np.zeros(self.num_envs, dtype=bool)
+        stockout_cost = np.zeros(self.num_envs)
+        served = np.zeros(self.num_envs)
+        stockout[mask] = w < demand
+        stockout_cost[mask] = np.where(w < demand, self.p * (demand - w), 0)
+        served[mask] = demand
+        self.customer_warehouse[mask] = np.where(w < demand, 0, w - demand)
+        return stockout_cost, stockout, served
+
+    def _observation(self):
+        going = self.state == GOING
+        return np.column_stack([
+            self.customer_warehouse,
+            self.factory_warehouse,
+            going.sum(axis=1),
+            (self.state == RETURNING).sum(axis=1),
+            (self.load * going).sum(axis=1), #quantity in transit
+            self.lead_time,
+            self.recent_demand,
+        ]).astype(np.float32)
+
+    def step(self, actions, demand=None):
+        """Place the orders (the actions), move the trucks and serve the
+        demand of the next step. A given demand (one per environment)
+        replaces the synthetic one, e.g.: to replay a reference run"""
+        quantity = np.maximum(0, np.asarray(actions, dtype=float).reshape(self.num_envs))
+        rows = np.arange(self.num_envs)
+        restart = self._autoreset.copy()
+
+        # ---- customer: the order goes on the first idle truck, if the
+        # factory has the stock ----
+        idle = self.state == IDLE
+        first = idle.argmax(axis=1)
+        placed = (quantity > 0) & idle.any(axis=1) & (self.factory_warehouse >= quantity)
+        self.state[rows[placed], first[placed]] = GOING
+        self.load[rows[placed], first[placed]] = quantity[placed]
+        self.factory_warehouse -= np.where(placed, quantity, 0)
+
+        # ---- trucks, in the order of the model ----
+        going = self.state == GOING
+        returning = self.state == RETURNING
+        back = self.position - self.beta * self.truck_movement
+        comes_back = returning & (back <= 0)
+        #a truck sees the traffic left by the trucks before it in the same
+        #step: the ones back at the factory are no longer counted
+        busy = (self.state != IDLE).sum(axis=1, keepdims=True)
+        earlier = np.cumsum(comes_back, axis=1) - comes_back
+        L = self.L_0 + self.alpha * ((busy - earlier) / self.n_trucks)
+        forward = self.position + self.truck_movement
+        arrives = going & (forward >= L)
+
+        delivered = (self.load * arrives).sum(axis=1)
+        self.customer_warehouse += delivered
+        self.position = np.where(going, np.where(arrives, L, forward),
+                                 np.where(returning, np.where(comes_back, 0, back), self.position))
+        self.load[arrives] = 0
+        self.state[arrives] = RETURNING
+        self.state[comes_back] = IDLE
+
+        # ---- end of the step: costs and kpis ----
+        holding = self.h * self.customer_warehouse
+        transportation = self.c * delivered
+        traffic = (self.state != IDLE).sum(axis=1) / self.n_trucks
+        self.lead_time = self.L_0 + self.alpha * traffic
+        self.steps += 1
+        truncated = self.steps >= self.max_steps
+
+        # ---- next step, up to the next order ----
+        stockout_cost, stockout, served = self._serve(~restart, demand)
+        reward = -(holding + transportation + stockout_cost)
+
+        #next-step auto-reset: the environments that ended at the previous
+        #step start again, their action is ignored, and they serve the first
+        #demand of the new episode (the given one, if any)
+        if restart.any():
+            self._reset_envs(restart)
+            first_stockout, first_event, first_demand = self._serve(restart, demand)
+            for values in (reward, holding, transportation, traffic):
+                values[restart] = 0
+            stockout_cost[restart] = first_stockout[restart]
+            stockout[restart] = first_event[restart]
+            served[restart] = first_demand[restart]
+            truncated[restart] = False
+        self._autoreset = truncated.copy()
+        info = {"holding": holding, "transportation": transportation, "traffic": traffic,
+                "stockout": stockout_cost, "stockout_event": stockout, "demand": served}
+        return self._observation(), reward, np.zeros(self.num_envs, dtype=bool), truncated, info
+
+    def close(self, **kwargs):
+        pass
+
+
+def baseline_action(env, policy):
+    """Orders of FRP, ARP or FBR for every environment (0 means no order),
+    as Customer.frp/arp/fbr"""
+    w = env.customer_warehouse
+    if policy == "FRP":
+        ROP = env.mu * env.L_0 + env.k * env.sigma
+        return np.where(w <= ROP, env.mu, 0.0)
+    SS = env.k * env.sigma * math.sqrt(env.L_0)
+    D = np.round(env.recent_demand.sum(axis=1) / env.kernel_size) #moving average
+    ROP = D * env.L_0 + SS
+    if policy == "ARP":
+        return np.where(w <= ROP, env.mu, 0.0)
+    return np.where(w <= ROP, np.round(1.33 * ROP - w), 0.0) #FBR
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:05:27 2026
+
+@author: Francesco
+"""
+
+"""
+Detection of the warm-up period.
+
+Every run starts from an artificial state (the customer warehouse at
+mu + sigma*k, the factory one at 5), so the first steps are a transient that
+biases the averages. The MSER rule (Marginal Standard Error Rule) truncates the
+series where the standard error of the mean of the remaining observations is
+the smallest; MSER-5 applies it to the means of batches of 5 observations.
+"""
+
+import numpy as np #numerical computing library
+
+def mser(series, batch_size=5):
+    """Number of initial observations to discard, according to MSER-m with
+    m = batch_size (MSER-5 by default)"""
+    x = np.asarray(series, dtype=float)
+    n_batches = len(x) // batch_size
+    if n_batches < 2:
+        return 0
+
+    #batch means, the last incomplete batch is ignored
+    z = x[:n_batches * batch_size].reshape(n_batches, batch_size).mean(axis=1)
+
+    #sums over the remaining batches for every truncation point d, computed
+    #all at once with reversed cumulative sums
+    remaining = np.arange(n_batches, 0, -1)
+    s1 = np.cumsum(z[::-1])[::-1]
+    s2 = np.cumsum((z**2)[::-1])[::-1]
+    sse = s2 - s1**2 / remaining
+    statistic = sse / remaining**2
+
+    #truncation points in the second half of the run are not reliable
+    d = int(np.argmin(statistic[:n_batches // 2 + 1]))
+    return d * batch_size
+
+def warmup_length(model, rule):
+    """Warm-up length in steps of a model: rule is 'None', 'MSER-5' or an
+    integer number of steps"""
+    if rule in (None, "None"):
+        return 0
+    if rule == "MSER-5":
+        #the longest transient between the warehouse and the lead time
+        return max(mser(model.customer_warehouse_history),
+                   mser(model.lead_time_history))
+    return min(int(rule), model.steps)